@@ -0,0 +1,61 @@
+"""
+Benchmark updating the same control config.yaml on many branches.
+
+Run with:
+    python benchmarks/bench_config_updater.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.config_updater import ConfigUpdater
+
+N_SUBMODELS = 20
+N_BRANCHES = 50
+REPEAT = 3
+
+
+def _make_config(path: Path) -> None:
+    lines = ["# PBS configuration\n", "queue: normal\n", "walltime: 3:00:00\n", "jobname: ctrl\n\n", "submodels:\n"]
+    for s in range(N_SUBMODELS):
+        lines.append(f"    - name: submodel_{s}  # component {s}\n")
+        lines.append("      model: mom\n")
+        lines.append(f'      exe: "/g/data/inputs/bin/model_{s}.x"\n')
+        lines.append("      input:\n")
+        lines.extend(f"            - /g/data/inputs/input_{s}/dir_{i}\n" for i in range(5))
+        lines.append(f"      ncpus: {s + 1}\n\n")
+    lines.append("# Misc\nrunlog: true\nrestart_freq: 1  # use tidy_restarts.py instead\n")
+    path.write_text("".join(lines))
+
+
+def _best(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "ctrl"
+        directory.mkdir()
+        path = directory / "config.yaml"
+
+        def _update_branches(shared: bool) -> None:
+            updater = ConfigUpdater(directory)
+            for b in range(N_BRANCHES):
+                _make_config(path)
+                if not shared:
+                    updater = ConfigUpdater(directory)
+                updater.update_config_params({"queue": "express", "walltime": f"{b}:00:00"}, Path("config.yaml"), {})
+
+        for shared, label in ((False, "parsed on every branch"), (True, "parsed once, cloned per branch")):
+            best = _best(lambda: _update_branches(shared))
+            print(f"update_config_params, {N_BRANCHES} branches, {label}: {best * 1e3:.0f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
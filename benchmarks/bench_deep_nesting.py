@@ -0,0 +1,52 @@
+"""
+Benchmark update_config_entries on deeply nested and on wide, shallow documents.
+
+The merge walks nested containers with an explicit stack, so depth is bounded by
+memory rather than by the interpreter recursion limit.
+
+Run with:
+    python benchmarks/bench_deep_nesting.py
+"""
+
+import sys
+import time
+
+from experiment_generator.common_var import PRESERVED, REMOVED
+from experiment_generator.utils import update_config_entries
+
+DEPTH = 5 * sys.getrecursionlimit()
+WIDTH = 20_000
+REPEAT = 5
+
+
+def _nested(depth: int, leaf: dict) -> dict:
+    root = node = {}
+    for _ in range(depth - 1):
+        node["a"] = {}
+        node = node["a"]
+    node["a"] = leaf
+    return root
+
+
+def _best(build, run) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        args = build()
+        start = time.perf_counter()
+        run(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    change = _nested(DEPTH, {"x": REMOVED, "y": [PRESERVED, 3]})
+    t = _best(lambda: (_nested(DEPTH, {"x": 1, "y": [1, 2]}), change), update_config_entries)
+    print(f"update_config_entries, depth {DEPTH}: {t * 1e3:.1f} ms (best of {REPEAT})")
+
+    wide_change = {f"k{i}": {"v": i, "w": PRESERVED} for i in range(WIDTH)}
+    t = _best(lambda: ({f"k{i}": {"v": 0, "w": 1} for i in range(WIDTH)}, wide_change), update_config_entries)
+    print(f"update_config_entries, {WIDTH} shallow keys: {t * 1e3:.1f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark reading and updating a large, tracer-heavy field_table (e.g. a WOMBAT/BGC configuration).
+
+Run with:
+    python benchmarks/bench_field_table.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.common_var import PRESERVED
+from experiment_generator.field_table_updater import FieldTableUpdater
+from experiment_generator.tmp_parser.field_table import read_field_table
+
+N_TRACERS = 500
+N_BRANCHES = 20
+REPEAT = 5
+
+
+def _make_field_table(path: Path) -> None:
+    lines = []
+    for t in range(N_TRACERS):
+        lines.append(f"# BGC tracer {t}\n")
+        lines.append(f'"prog_tracers", "ocean_mod", "tracer_{t}"\n')
+        lines.append(f'    "longname", "tracer {t} concentration"\n')
+        lines.append('    "units", "mol/kg"\n')
+        lines.append("    horizontal-advection-scheme = mdppm\n")
+        lines.append("    vertical-advection-scheme = mdppm\n")
+        lines.append(f"    restart_file = ocean_bgc_{t}.res.nc\n")
+        lines.append('    "profile_type", "fixed", "surface_value=0.0, bottom_value=1.e-6" /\n')
+        lines.append("\n")
+    path.write_text("".join(lines))
+
+
+def _best(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "field_table"
+        _make_field_table(path)
+        best = _best(lambda: read_field_table(path))
+        print(f"read_field_table, {N_TRACERS} tracers: {best * 1e3:.1f} ms (best of {REPEAT})")
+
+        def _update_branches() -> None:
+            # one updater per run, as for one experiment plan
+            updater = FieldTableUpdater(Path(tmp))
+            for b in range(N_BRANCHES):
+                _make_field_table(path)
+                methods = [PRESERVED] * 5 + [{"key": "profile_type", "value": "fixed", "params": {"surface_value": b}}]
+                params = {"tracer_0": {"ocean_mod": {"prog_tracers": {"methods": methods}}}}
+                updater.update_field_table_params(params, path.name, {})
+
+        best = _best(_update_branches)
+        print(f"update_field_table_params, {N_BRANCHES} branches: {best * 1e3:.1f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark positional and keyed list merging on long lists of nested mappings.
+
+Run with:
+    python benchmarks/bench_list_merge.py
+"""
+
+import time
+
+from experiment_generator.common_var import MATCH_BY, PRESERVED, REMOVED
+from experiment_generator.utils import update_config_entries
+
+N_ITEMS = 10_000
+REPEAT = 5
+
+
+def _make_base(n: int) -> dict:
+    return {
+        "submodels": [
+            {
+                "name": f"model_{i}",
+                "ncpus": 4,
+                "input": [f"INPUT/file_{i}_{j}.nc" for j in range(4)],
+                "metadata": {"enable": True, "tags": {"a": i, "b": [i, i + 1]}},
+            }
+            for i in range(n)
+        ]
+    }
+
+
+def _make_change(n: int) -> dict:
+    # touch a handful of slots and preserve everything else
+    change = [PRESERVED] * n
+    change[0] = {"ncpus": 8}
+    change[n // 2] = {"metadata": {"enable": False}}
+    change[n - 1] = REMOVED
+    return {"submodels": change}
+
+
+def _make_keyed_change(n: int) -> dict:
+    # the same edits, addressed by name
+    return {
+        "submodels": {
+            MATCH_BY: "name",
+            "model_0": {"ncpus": 8},
+            f"model_{n // 2}": {"metadata": {"enable": False}},
+            f"model_{n - 1}": REMOVED,
+        }
+    }
+
+
+def _best(change: dict) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        base = _make_base(N_ITEMS)
+        start = time.perf_counter()
+        update_config_entries(base, change, path="config.yaml", state={})
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    t = _best(_make_change(N_ITEMS))
+    print(f"positional merge of {N_ITEMS} slots: {t * 1e3:.1f} ms (best of {REPEAT})")
+    t = _best(_make_keyed_change(N_ITEMS))
+    print(f"keyed merge into {N_ITEMS} slots: {t * 1e3:.1f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
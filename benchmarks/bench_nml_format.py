@@ -0,0 +1,46 @@
+"""
+Benchmark format_nml_params on a large namelist where most groups share variable names.
+
+Run with:
+    python benchmarks/bench_nml_format.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.f90nml_updater import format_nml_params
+
+N_GROUPS = 100
+N_VARS = 50
+REPEAT = 5
+
+
+def _make_namelist(path: Path) -> None:
+    lines = []
+    for g in range(N_GROUPS):
+        lines.append(f"&group_{g}\n")
+        lines.extend(f"    var_{v} = {v}\n" for v in range(N_VARS))
+        lines.append("/\n")
+    path.write_text("".join(lines))
+
+
+def main() -> None:
+    # touch every variable of every group
+    params = {f"group_{g}": {f"var_{v}": v + 1 for v in range(N_VARS)} for g in range(N_GROUPS)}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "input.nml"
+        timings = []
+        for _ in range(REPEAT):
+            _make_namelist(path)
+            start = time.perf_counter()
+            format_nml_params(path.as_posix(), params)
+            timings.append(time.perf_counter() - start)
+    n = N_GROUPS * N_VARS
+    print(
+        f"format_nml_params, {n} params over {n + 2 * N_GROUPS} lines: {min(timings) * 1e3:.1f} ms (best of {REPEAT})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark F90NamelistUpdater.update_nml_params on a large namelist.
+
+A handful of variables is changed per call, as a perturbation branch typically does.
+
+Run with:
+    python benchmarks/bench_nml_update.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.f90nml_updater import F90NamelistUpdater
+
+N_GROUPS = 100
+N_VARS = 50
+REPEAT = 5
+
+
+def _make_namelist(path: Path) -> None:
+    lines = []
+    for g in range(N_GROUPS):
+        lines.append(f"&group_{g}\n")
+        lines.extend(f"    var_{v} = {v}   ! comment {v}\n" for v in range(N_VARS))
+        lines.append("/\n\n")
+    path.write_text("".join(lines))
+
+
+def main() -> None:
+    params = {
+        "group_0": {"var_0": 10, "var_1": "REMOVE"},
+        f"group_{N_GROUPS // 2}": {"var_3": [1, 2, 3], "new_var": True},
+        f"group_{N_GROUPS - 1}": {"var_7": 0.5},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "input.nml"
+        updater = F90NamelistUpdater(Path(tmp))
+        timings = []
+        for _ in range(REPEAT):
+            _make_namelist(path)
+            start = time.perf_counter()
+            updater.update_nml_params(params, path.name)
+            timings.append(time.perf_counter() - start)
+    n = N_GROUPS * (N_VARS + 3)
+    print(f"update_nml_params, 5 edits in {n} lines: {min(timings) * 1e3:.1f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark reading a large nuopc.runconfig, as done once per branch per file.
+
+Run with:
+    python benchmarks/bench_nuopc_config.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.tmp_parser.nuopc_config import read_nuopc_config
+from experiment_generator.tmp_parser.tmp_utils import convert_from_string
+
+N_TABLES = 100
+N_LABELS = 50
+REPEAT = 5
+
+VALUES = ["-1", "1800", ".true.", ".false.", "-1.000000D-08", "0.5", "cesm", "1:10:19:26:30", "ocn.log"]
+
+
+def _make_runconfig(path: Path) -> None:
+    lines = []
+    for t in range(N_TABLES):
+        lines.append(f"TABLE_{t}_attributes::\n")
+        lines.extend(f"  label_{v} = {VALUES[v % len(VALUES)]}  # comment\n" for v in range(N_LABELS))
+        lines.append("::\n\n")
+    lines.extend(f"label_{v}: {' '.join(VALUES)}\n" for v in range(N_LABELS))
+    path.write_text("".join(lines))
+
+
+def _best(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "nuopc.runconfig"
+        _make_runconfig(path)
+        best = _best(lambda: read_nuopc_config(path.as_posix()))
+    n = N_TABLES * N_LABELS + N_LABELS
+    print(f"read_nuopc_config, {n} entries: {best * 1e3:.1f} ms (best of {REPEAT})")
+
+    literals = VALUES * 10000
+    best = _best(lambda: [convert_from_string(v) for v in literals])
+    print(f"convert_from_string, {len(literals)} literals: {best * 1e3:.1f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark loading a large experiment plan, round-trip (`read_yaml`) against pure data (`read_plan`).
+
+Run with:
+    python benchmarks/bench_plan_load.py
+"""
+
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from experiment_generator.tmp_parser.yaml_config import read_plan, read_yaml
+
+N_BLOCKS = 200
+N_BRANCHES = 10
+N_PARAMS = 10
+REPEAT = 3
+
+
+def _make_plan(path: Path) -> None:
+    lines = [
+        "# generated plan\n",
+        "model_type: access-om3\n",
+        'start_point: "52bf0b6"  # control commit\n',
+        "Perturbation_Experiment:\n",
+    ]
+    for b in range(N_BLOCKS):
+        lines.append(f"  Parameter_block{b}:\n")
+        lines.append("    branches:\n")
+        lines.extend(f"      - perturb_{b}_{i}\n" for i in range(N_BRANCHES))
+        lines.append("    ocean/input.nml:\n")
+        lines.append("      ocean_nphysics_util_nml:  # GM closure\n")
+        for p in range(N_PARAMS):
+            lines.append(f"        param_{p}:\n")
+            lines.extend(f"          - {p + i * 0.5:.3e}\n" for i in range(N_BRANCHES))
+        lines.append("    config.yaml:\n")
+        lines.append(f'      walltime: "{b % 24}:00:00"\n')
+        lines.append("      queue: [normal, express]\n")
+    path.write_text("".join(lines))
+
+
+def _best(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _peak_memory(func) -> int:
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "plan.yaml"
+        _make_plan(path)
+        size = path.stat().st_size
+        for reader in (read_yaml, read_plan):
+            best = _best(lambda: reader(path))
+            peak = _peak_memory(lambda: reader(path))
+            print(
+                f"{reader.__name__}, {size / 1e6:.1f} MB plan: {best * 1e3:.0f} ms (best of {REPEAT}), "
+                f"peak {peak / 1e6:.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark writing a large YAML file with blank lines between keys (e.g. a diag_table source).
+
+Run with:
+    python benchmarks/bench_write_yaml.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+from experiment_generator.tmp_parser.yaml_config import read_yaml, write_yaml
+
+N_FILES = 200
+N_FIELDS = 20
+REPEAT = 3
+
+
+def _make_yaml(path: Path) -> None:
+    lines = ["diag_table:\n"]
+    for f in range(N_FILES):
+        lines.append(f"  ocean_file_{f}:  # output file {f}\n")
+        lines.append("    freq: 1\n\n")
+        lines.append("    freq_units: days\n\n")
+        lines.append("    fields:\n")
+        for v in range(N_FIELDS):
+            lines.append(f"      field_{v}:\n")
+            lines.append("        module: ocean_model\n\n")
+            lines.append(f'        output_name: "field_{v}"\n\n')
+            lines.append("        reduction_method: mean\n")
+        lines.append("\n")
+    path.write_text("".join(lines))
+
+
+def _best(func) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "diag_table_source.yaml"
+        _make_yaml(path)
+        data = read_yaml(path)
+        out = Path(tmp) / "out.yaml"
+        best = _best(lambda: write_yaml(data, out))
+        print(f"write_yaml, {N_FILES * N_FIELDS} fields: {best * 1e3:.0f} ms (best of {REPEAT})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,39 @@
-from collections.abc import Sequence
+from collections.abc import Mapping, Sequence
 
 # Experiment specific attributes
 BRANCH_KEY = "branches"
 REMOVED = "REMOVE"
 PRESERVED = "PRESERVE"
+# Reserved key that switches a list-of-mappings update from positional to keyed matching
+MATCH_BY = "MATCH_BY"
+# Plan key listing the files merged into a plan, or into a perturbation block
+INCLUDE_KEY = "include"
 # Directory name to store REMOVE state files
 REMOVE_STATE_DIR = ".expt_remove_states"
 
 
+class Marker(str):
+    """
+    Sentinel for a resolved REMOVE / PRESERVE marker.
+
+    It compares equal to the plain marker string, so sentinels and strings read from
+    YAML are interchangeable, but a normalised tree can be checked by identity.
+    """
+
+    __slots__ = ()
+
+
+REMOVE_MARKER = Marker(REMOVED)
+PRESERVE_MARKER = Marker(PRESERVED)
+
+
 def _is_removed_str(x) -> bool:
     """
     Check if a value is the explicit delete marker ("REMOVE").
 
     Returns True if `x` is a string equal to REMOVED, otherwise False.
     """
-    return isinstance(x, str) and x == REMOVED
+    return x is REMOVE_MARKER or (isinstance(x, str) and x == REMOVED)
 
 
 def _is_preserved_str(x) -> bool:
@@ -23,7 +42,20 @@ def _is_preserved_str(x) -> bool:
 
     Returns True if `x` is a string equal to PRESERVED, otherwise False.
     """
-    return isinstance(x, str) and x == PRESERVED
+    return x is PRESERVE_MARKER or (isinstance(x, str) and x == PRESERVED)
+
+
+def _as_marker(x):
+    """
+    Return the `Marker` sentinel for a REMOVE / PRESERVE string, otherwise `x` unchanged.
+    """
+    if type(x) is Marker:
+        return x
+    if _is_removed_str(x):
+        return REMOVE_MARKER
+    if _is_preserved_str(x):
+        return PRESERVE_MARKER
+    return x
 
 
 def _is_seq(x) -> bool:
@@ -33,3 +65,35 @@ def _is_seq(x) -> bool:
     Returns True if `x` is a sequence and not a string, otherwise False.
     """
     return isinstance(x, Sequence) and not isinstance(x, str)
+
+
+def _value_kind(value) -> type:
+    """
+    Builtin type a value is written as, so e.g. a plan's ScalarFloat counts as a float.
+    """
+    for kind in (bool, int, float, str):
+        if isinstance(value, kind):
+            return kind
+    return type(value)
+
+
+def _same_value(old, new) -> bool:
+    """
+    Equality that also tells 1, 1.0 and True apart, so a change of type alone is a change.
+
+    Nested mappings and sequences are compared element by element with an explicit stack.
+    """
+    stack = [(old, new)]
+    while stack:
+        a, b = stack.pop()
+        if isinstance(a, Mapping) and isinstance(b, Mapping):
+            if a.keys() != b.keys():
+                return False
+            stack.extend((a[k], b[k]) for k in a)
+        elif _is_seq(a) and _is_seq(b):
+            if len(a) != len(b):
+                return False
+            stack.extend(zip(a, b))
+        elif _value_kind(a) is not _value_kind(b) or a != b:
+            return False
+    return True
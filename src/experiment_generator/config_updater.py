@@ -5,10 +5,11 @@ This module provides utilities to update `config.yaml` for experiments.
 It includes methods for modifying parameters in both control and perturbation experiments.
 """
 
+import copy
 import warnings
 from pathlib import Path
-from .utils import update_config_entries
-from .tmp_parser.yaml_config import read_yaml, write_yaml
+from .utils import update_config_entries, ChangeSet
+from .tmp_parser.yaml_config import ryaml, write_yaml
 
 
 class ConfigUpdater:
@@ -21,20 +22,27 @@ class ConfigUpdater:
         Initialise the ConfigUpdater with a working directory.
         """
         self.directory = directory
+        # config.yaml file -> (text, round-trip document) of the last version read
+        self._documents: dict[Path, tuple[str, dict]] = {}
 
-    def update_config_params(self, param_dict: dict, target_file: Path, state: dict) -> None:
+    def update_config_params(self, param_dict: dict, target_file: Path, state: dict) -> ChangeSet:
         """
         Update `config.yaml` parameters using values from the input dictionary.
 
         - Ensures the 'jobname' matches the directory name for consistency.
-        - Overwrites the target YAML file in-place.
+        - Overwrites the target YAML file in-place, only if anything changed.
+        - A file whose text was already parsed (e.g. the control config.yaml on another branch)
+          is not parsed again, a copy of the parsed document (comments and quotes included) is updated.
 
         Args:
             param_dict (dict): Dictionary of parameters to update in config.yaml.
             target_file (Path): Relative path to the config.yaml file within the directory.
+
+        Returns:
+            ChangeSet: Paths added, modified and removed in config.yaml.
         """
         nml_path = self.directory / target_file
-        file_read = read_yaml(nml_path.as_posix())
+        file_read = self._load_document(nml_path)
 
         # Enforce jobname consistency
         if "jobname" in param_dict:
@@ -48,7 +56,20 @@ class ConfigUpdater:
         param_dict["jobname"] = self.directory.name
 
         # Apply updates to the config.yaml file
-        update_config_entries(file_read, param_dict, pop_key=True, path=str(target_file), state=state)
+        changes = update_config_entries(file_read, param_dict, pop_key=True, path=str(target_file), state=state)
 
         # write to the config.yaml file
-        write_yaml(file_read, nml_path.as_posix())
+        if changes:
+            write_yaml(file_read, nml_path.as_posix())
+        return changes
+
+    def _load_document(self, nml_path: Path) -> dict:
+        """
+        Return a fresh round-trip document for `nml_path`, reusing the parsed one if the text is unchanged.
+        """
+        text = nml_path.read_text(encoding="utf-8")
+        cached = self._documents.get(nml_path)
+        if cached is None or cached[0] != text:
+            cached = (text, ryaml.load(text))
+            self._documents[nml_path] = cached
+        return copy.deepcopy(cached[1])
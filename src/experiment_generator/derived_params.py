@@ -0,0 +1,164 @@
+"""
+Derived parameters.
+
+Some model parameters are not set directly in the experiment plan but derived from another
+plan value, e.g. CICE's `cosw` / `sinw` from `turning_angle`. Each derivation is declared as
+a `DerivedRule` in a registry; rules are evaluated with NumPy across all branches of a
+perturbation block in one vectorised call while the experiment definitions are collected
+(`derive_for_branches`), and per group by the namelist updater for direct callers
+(`derive_for_group`).
+
+For a source value:
+ - a number         -> the targets are computed and the source is consumed,
+ - "REMOVE"         -> the targets are removed and the source is consumed,
+ - "PRESERVE" / None -> the existing targets are kept; they must exist in the file.
+Targets are only managed in files matching `DerivedRule.files`; in other files the source
+is consumed without effect.
+"""
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+import numpy as np
+from .common_var import _is_removed_str, _is_preserved_str
+
+
+@dataclass(frozen=True)
+class DerivedRule:
+    """
+    Declarative derivation of namelist variables from a plan value.
+
+    Attributes:
+        group (str): Namelist group holding both the source and the targets.
+        source (str): Plan variable the targets are derived from.
+        targets (tuple[str, ...]): Derived variables, in the order `compute` returns them.
+        compute (Callable): Vectorised function mapping an array of source values to one array per target.
+        files (tuple[str, ...]): File name suffixes whose targets are managed; empty means every file.
+    """
+
+    group: str
+    source: str
+    targets: tuple[str, ...]
+    compute: Callable[[np.ndarray], tuple[np.ndarray, ...]]
+    files: tuple[str, ...] = ()
+
+    def manages(self, filename: str) -> bool:
+        return not self.files or str(filename).endswith(self.files)
+
+
+DERIVED_RULES: list[DerivedRule] = []
+
+
+def register_rule(rule: DerivedRule) -> DerivedRule:
+    """
+    Add `rule` to the registry used by `derive_for_branches` and `derive_for_group`.
+    """
+    DERIVED_RULES.append(rule)
+    return rule
+
+
+def _turning_angle(degrees: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # ref: https://github.com/aekiss/ensemble/blob/b27e4b7992683e4308bf630aa16da21730ccb11a/ensemble.py#L63C77-L63C89
+    radians = np.radians(degrees)
+    return np.cos(radians), np.sin(radians)
+
+
+# Only CICE namelists manage cosw/sinw
+register_rule(
+    DerivedRule(
+        group="dynamics_nml",
+        source="turning_angle",
+        targets=("cosw", "sinw"),
+        compute=_turning_angle,
+        files=("cice_in.nml", "ice_in"),
+    )
+)
+
+
+def _keeps_existing(value) -> bool:
+    return _is_preserved_str(value) or value is None
+
+
+def _evaluate(rule: DerivedRule, filename: str, values: list) -> list[dict | None]:
+    """
+    Resolve the source `values` of several branches in one vectorised `rule.compute` call.
+
+    Returns, per value, the target assignments to make ({} if the file does not manage the
+    targets), or None if the existing targets are to be kept.
+    """
+    results: list[dict | None] = [None if _keeps_existing(v) else {} for v in values]
+    if not rule.manages(filename):
+        return results
+
+    numeric = []
+    for i, value in enumerate(values):
+        if _is_removed_str(value):
+            results[i] = {target: value for target in rule.targets}
+        elif not _keeps_existing(value):
+            numeric.append(i)
+
+    if numeric:
+        try:
+            sources = np.asarray([values[i] for i in numeric], dtype=float)
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"{filename}: `{rule.group}.{rule.source}` must be numeric, got {[values[i] for i in numeric]}"
+            ) from e
+        outputs = rule.compute(sources)
+        for j, i in enumerate(numeric):
+            results[i] = {target: float(out[j]) for target, out in zip(rule.targets, outputs)}
+
+    return results
+
+
+def derive_for_branches(filename: str, branch_params: list[dict]) -> None:
+    """
+    Apply every registered rule to the parameters of all branches of a block, in place.
+
+    `branch_params` holds one `{group: {variable: value}}` mapping per branch for `filename`.
+    Sources resolved here are replaced by their targets; "PRESERVE" / None sources are left
+    for the updater, which checks the existing targets against the file.
+    """
+    for rule in DERIVED_RULES:
+        groups = [
+            params.get(rule.group)
+            for params in branch_params
+            if isinstance(params, Mapping)
+            and isinstance(params.get(rule.group), Mapping)
+            and rule.source in params[rule.group]
+        ]
+        if not groups:
+            continue
+
+        results = _evaluate(rule, filename, [group[rule.source] for group in groups])
+        for group, assignments in zip(groups, results):
+            if assignments is None:
+                continue
+            group.pop(rule.source)
+            group.update(assignments)
+
+
+def derive_for_group(
+    filename: str, group_name: str, group_value: Mapping, has_variable: Callable[[str], bool]
+) -> tuple[set[str], dict]:
+    """
+    Apply the registered rules of `group_name` to a single group of parameters.
+
+    `has_variable(name)` tells whether the file already holds `name` in this group.
+
+    Returns the consumed source names and the target assignments to make. Raises ValueError
+    if a source asks to keep targets that do not exist.
+    """
+    consumed: set[str] = set()
+    assignments: dict = {}
+    for rule in DERIVED_RULES:
+        if rule.group != group_name or rule.source not in group_value:
+            continue
+        consumed.add(rule.source)
+        (result,) = _evaluate(rule, filename, [group_value[rule.source]])
+        if result is not None:
+            assignments.update(result)
+        elif rule.manages(filename) and not any(has_variable(target) for target in rule.targets):
+            raise ValueError(
+                f"Cannot preserve {rule.source}: no existing {' and '.join(rule.targets)} found in `{rule.group}`"
+            )
+    return consumed, assignments
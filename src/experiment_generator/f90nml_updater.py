@@ -3,15 +3,28 @@ Fortran Namelist Updater.
 
 This module provides functionality for updating F90namelist
 files (`*.nml` or `*_in`) based on values defined in a YAML configuration.
-It supports parameter additions, updates, deletions, and specific logic
-(e.g. calculating cos/sin of a turning angle for CICE models).
+It supports parameter additions, updates, deletions, element-wise array updates
+(`var(3)`, `var(2:4)`) and derived parameters (e.g. calculating cos/sin of a turning
+angle for CICE models, see `derived_params`).
 """
 
+import io
+import numbers
+import re
 from pathlib import Path
-import numpy as np
 import f90nml
-import re
 from .common_var import _is_removed_str, _is_preserved_str
+from .derived_params import derive_for_group
+from .tmp_parser.namelist import index_namelist, patch_namelist, patch_array_lines
+
+# `name(i)` or `name(i:j)` plan keys, 1-based as in Fortran
+_SUBSCRIPT = re.compile(r"^\s*([A-Za-z_]\w*)\s*\(\s*(\d+)\s*(?::\s*(\d+)\s*)?\)\s*$")
+
+
+class ArrayElements(dict):
+    """
+    Element-wise update of a namelist array: 1-based element position -> new value.
+    """
 
 
 class F90NamelistUpdater:
@@ -34,78 +47,266 @@ class F90NamelistUpdater:
             param_dict (dict[str, dict[str, any]]):
                 1. Mapping from namelist section names to parameter-value pairs.
                 2. Use value=None or "REMOVE" to delete a variable.
-                3. Special handling for "turning_angle": computes "cosw" and "sinw"
-                   and inserts them into the `dynamics_nml` block.
+                3. Derived parameters, e.g. "turning_angle": computes "cosw" and "sinw"
+                   and inserts them into the `dynamics_nml` block (see `derived_params`).
+                4. Element-wise array updates, e.g. "rhos(2)": 300.0 or "rhos(2:4)": [1, 2, 3];
+                   a scalar is applied to every element of a slice.
             target_file (Path): Path to the namelist file, relative to `self.directory`.
+
+        The original text is patched in place (see `patch_namelist`): only the targeted
+        assignments are rewritten, added or deleted, so comments, ordering and all other lines
+        stay byte-identical; element-wise updates only rewrite the targeted elements of the
+        existing array. Layouts or values the patcher cannot handle fall back to a full f90nml
+        round trip.
         """
         nml_path = self.directory / target_file
-        nml_tmp_path = nml_path.with_suffix(".tmp")
 
-        nml_all = f90nml.read(nml_path)
+        with open(nml_path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        groups = index_namelist(lines)
+
+        updates = self._resolve_updates(param_dict, str(target_file), groups)
 
+        patched = self._patch_lines(lines, groups, updates)
+        if patched is None:
+            self._update_with_f90nml(nml_path, updates)
+            return
+
+        if patched != lines:
+            _write_lines_atomic(nml_path, patched)
+
+    @staticmethod
+    def _resolve_updates(param_dict: dict, target_file: str, groups: dict) -> dict[str, dict]:
+        """
+        Validate `param_dict` and resolve it into `{group: {variable: value}}` edits.
+
+        PRESERVE entries are dropped, "REMOVE" and None are kept for the writers, and
+        sources of derived parameters (e.g. `turning_angle` in `dynamics_nml`) are replaced
+        by the variables derived from them. Subscripted keys (`var(3)`, `var(2:4)`) are
+        collected into one `ArrayElements` per array, or applied to the new value of the
+        whole array if it is set as well. `param_dict` itself is not modified.
+        """
+        updates = {}
         for group_name, group_value in param_dict.items():
             if not isinstance(group_value, dict):
                 raise ValueError(f"Expected dict for {group_name}, got {type(group_value)}")
 
-            # Special handling for 'turning_angle'
-            # ref: https://github.com/aekiss/ensemble/blob/b27e4b7992683e4308bf630aa16da21730ccb11a/ensemble.py\
-            # #L63C77-L63C89
-            if "turning_angle" in group_value:
-                turning_angle = group_value["turning_angle"]
-
-                # Only manage cos/sin and delete 'turning_angle' when it's in dynamics_nml
-                if group_name == "dynamics_nml":
-                    # remove turning_angle from dynamics_nml
-                    group_value.pop("turning_angle", None)
-
-                    # Only CICE namelists manage cosw/sinw
-                    if target_file.endswith(("cice_in.nml", "ice_in")):
-                        if _is_removed_str(turning_angle):
-                            # drop cos/sin
-                            if "dynamics_nml" in nml_all:
-                                nml_all["dynamics_nml"].pop("cosw", None)
-                                nml_all["dynamics_nml"].pop("sinw", None)
-                                # TODO: consider removing empty dynamics_nml group?
-                                # if not nml_all["dynamics_nml"]:
-                                #     nml_all.pop("dynamics_nml", None)
-
-                        elif _is_preserved_str(turning_angle) or turning_angle is None:
-                            dyn = nml_all.get("dynamics_nml", {})
-                            if "cosw" not in dyn and "sinw" not in dyn:
-                                raise ValueError(
-                                    "Cannot preserve turning_angle: no existing cosw and sinw found in `dynamics_nml`"
-                                )
-                        else:
-                            tmp = np.radians(turning_angle)
-                            cosw = np.cos(tmp)
-                            sinw = np.sin(tmp)
-                            nml_all.setdefault("dynamics_nml", {})
-                            nml_all["dynamics_nml"]["cosw"] = cosw
-                            nml_all["dynamics_nml"]["sinw"] = sinw
+            # derived parameters (e.g. turning_angle -> cosw/sinw in dynamics_nml), see `derived_params`
+            group = groups.get(group_name.lower())
+            consumed, variables = derive_for_group(
+                target_file,
+                group_name,
+                group_value,
+                lambda var: group is not None and var.lower() in group.entries,
+            )
+
+            for var, value in group_value.items():
+                if var in consumed or _is_preserved_str(value):
+                    continue
+                subscript = _SUBSCRIPT.match(var)
+                if subscript is None:
+                    variables[var] = value
                 else:
-                    # turning_angle is in some other group -> do NOT touch cos/sin.
-                    # Leave it to the normal per-variable loop below (REMOVE / PRESERVE / None rules).
-                    pass
+                    _set_elements(variables, group_name, var, subscript, value)
+
+            # groups are created even when nothing is left to set in them
+            updates[group_name] = variables
+
+        return updates
 
+    @staticmethod
+    def _patch_lines(lines: list[str], groups: dict, updates: dict[str, dict]) -> list[str] | None:
+        """
+        Render resolved `updates` and patch them into `lines`; None if f90nml has to do it.
+        """
+        edits = {}
+        for group_name, variables in updates.items():
+            group = groups.get(group_name.lower())
+            group_edits = edits.setdefault(group_name, {})
+            for var, value in variables.items():
+                exists = group is not None and var.lower() in group.entries
+                if isinstance(value, ArrayElements):
+                    items = {i: _render_nml_item(v) for i, v in value.items()}
+                    if any(item is None for item in items.values()):
+                        return None
+                    if not exists:
+                        # new array: one `var(first) = ...` assignment per run of consecutive elements
+                        for first, run in _element_runs(items):
+                            group_edits[var if first == 1 else f"{var}({first})"] = ", ".join(run)
+                        continue
+                    entry = group.entries[var.lower()]
+                    new_lines = patch_array_lines(lines, entry, items) if entry.patchable else None
+                    if new_lines is None:
+                        return None
+                    group_edits[var] = new_lines
+                    continue
+                if _is_removed_str(value):
+                    if exists:
+                        group_edits[var] = None
+                    continue
+                if value is None and not exists:
+                    # as in the f90nml path, None only rewrites an existing value (as the literal None)
+                    continue
+                text = _render_nml_value(value)
+                if text is None:
+                    return None
+                group_edits[var] = text
+
+        return patch_namelist(lines, groups, edits)
+
+    @staticmethod
+    def _update_with_f90nml(nml_path: Path, updates: dict[str, dict]) -> None:
+        """
+        Apply resolved `updates` with a full f90nml read / write round trip.
+
+        The f90nml output and its post-formatting are rendered in memory and written once.
+        """
+        nml_all = f90nml.read(nml_path)
+
+        for group_name, variables in updates.items():
             # Ensure the groupname exists
             if group_name not in nml_all:
                 nml_all[group_name] = {}
 
             # Update or remove variables
-            for var, value in group_value.items():
+            for var, value in variables.items():
                 if _is_removed_str(value):
                     nml_all[group_name].pop(var, None)
                     continue
-                if _is_preserved_str(value) or value is None:
+                if value is None:
                     # Preserve None: do not alter existing values, do not delete.
                     continue
+                if isinstance(value, ArrayElements):
+                    value = _apply_elements(nml_all[group_name], var, value)
+                else:
+                    # a whole value starts at the first element, whatever subscript the file used
+                    getattr(nml_all[group_name], "start_index", {}).pop(var.lower(), None)
                 nml_all[group_name][var] = value
 
-        f90nml.write(nml_all, nml_tmp_path, force=True)
-        nml_tmp_path.replace(nml_path)
+        buffer = io.StringIO()
+        f90nml.write(nml_all, buffer)
+        lines = buffer.getvalue().splitlines(True)
 
         # Postprocessing to ensure proper formatting
-        format_nml_params(nml_path, param_dict)
+        lines = _format_nml_lines(lines, updates) or lines
+
+        _write_lines_atomic(nml_path, lines)
+
+
+def _set_elements(variables: dict, group_name: str, key: str, subscript: re.Match, value) -> None:
+    """
+    Record the update of array elements `key` (`var(i)` or `var(i:j)`) in resolved `variables`.
+    """
+    name, first, last = subscript.group(1), int(subscript.group(2)), subscript.group(3)
+    last = first if last is None else int(last)
+    if first < 1 or last < first:
+        raise ValueError(f"Invalid subscript {key} in `{group_name}`: expected var(i) or var(i:j) with 1 <= i <= j")
+    if _is_removed_str(value):
+        raise ValueError(f"Cannot remove {key} from `{group_name}`: only whole arrays can be removed")
+
+    count = last - first + 1
+    values = list(value) if isinstance(value, (list, tuple)) else [value] * count
+    if len(values) != count:
+        raise ValueError(f"{key} in `{group_name}` expects {count} values, got {len(values)}")
+
+    # the array may also be set as a whole, possibly spelled in another case
+    name = next((var for var in variables if var.lower() == name.lower()), name)
+    current = variables.setdefault(name, ArrayElements())
+    if isinstance(current, ArrayElements):
+        current.update(zip(range(first, last + 1), values))
+    elif isinstance(current, (list, tuple)):
+        array = list(current) + [None] * (last - len(current))
+        start = first - 1
+        array[start:last] = values
+        variables[name] = array
+    else:
+        raise ValueError(f"Cannot set {key} in `{group_name}`: {name} is not set to an array")
+
+
+def _element_runs(items: dict[int, str]) -> list[tuple[int, list[str]]]:
+    """
+    Split rendered `items` (position -> text) into runs of consecutive positions.
+    """
+    runs = []
+    for i in sorted(items):
+        if runs and runs[-1][0] + len(runs[-1][1]) == i:
+            runs[-1][1].append(items[i])
+        else:
+            runs.append((i, [items[i]]))
+    return runs
+
+
+def _apply_elements(group, var: str, elements: ArrayElements) -> list:
+    """
+    Return the f90nml value of array `var` in `group` with `elements` applied, padded with nulls.
+    """
+    current = group[var] if var in group else None
+    array = list(current) if isinstance(current, list) else ([] if current is None else [current])
+
+    # f90nml keeps arrays read from `var(i) = ...` with their start index; rebase them to 1
+    start_index = getattr(group, "start_index", {})
+    starts = start_index.pop(var.lower(), None)
+    first = starts[0] if starts and starts[0] else 1
+    array = [None] * (first - 1) + array
+
+    array.extend([None] * (max(elements) - len(array)))
+    for i, value in elements.items():
+        array[i - 1] = value
+    return array
+
+
+def _write_lines_atomic(nml_path: Path, lines: list[str]) -> None:
+    """
+    Write `lines` to a temporary file next to `nml_path`, then move it into place.
+    """
+    nml_tmp_path = nml_path.with_suffix(".tmp")
+    with open(nml_tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    nml_tmp_path.replace(nml_path)
+
+
+def _format_nml_value(value) -> str | None:
+    """
+    Render a parameter for `format_nml_params`; None means leave the line as f90nml wrote it.
+    """
+    # markers are resolved by update_nml_params, and f90nml already renders arrays and groups
+    if _is_removed_str(value) or _is_preserved_str(value) or isinstance(value, (list, tuple, dict)):
+        return None
+    # convert Python bool to Fortran logical
+    if isinstance(value, bool):
+        return ".true." if value else ".false."
+    return str(value)
+
+
+def _render_nml_item(value) -> str | None:
+    """
+    Render one array element the way f90nml does; None if it is not a plain scalar.
+    """
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if value is None:
+        # null value
+        return ""
+    if isinstance(value, (bool, numbers.Real)):
+        return _format_nml_value(value)
+    return None
+
+
+def _render_nml_value(value) -> str | None:
+    """
+    Render a parameter as namelist text for `patch_namelist`; None if only f90nml can render it.
+
+    Scalars are written as `format_nml_params` would post-format them (strings verbatim,
+    Fortran logicals), arrays as f90nml writes them (comma-separated, strings quoted).
+    """
+    if isinstance(value, (list, tuple)):
+        items = [_render_nml_item(v) for v in value]
+        if not items or any(item is None for item in items):
+            return None
+        return ", ".join(items)
+    if value is None or isinstance(value, (str, bool, numbers.Real)):
+        return _format_nml_value(value)
+    return None
 
 
 def format_nml_params(nml_path: str, param_dict: dict) -> None:
@@ -115,6 +316,10 @@ def format_nml_params(nml_path: str, param_dict: dict) -> None:
     This method correctly formats boolean values and ensures Fortran syntax
     is preserved when updating parameters.
 
+    The file is tokenized once into a `(group, variable) -> lines` index (see `index_namelist`)
+    and every parameter is patched in a single rebuild, so a variable name shared by several
+    groups is only rewritten in the group it belongs to.
+
     Args:
         nml_path (str): The path to specific f90 namelist file.
         param_dict (dict): The dictionary of parameters to update.
@@ -133,19 +338,43 @@ def format_nml_params(nml_path: str, param_dict: dict) -> None:
     with open(nml_path, "r", encoding="utf-8") as f:
         fileread = f.readlines()
 
-    for _, tmp_subgroups in param_dict.items():
+    out = _format_nml_lines(fileread, param_dict)
+    if out is None:
+        return
+
+    with open(nml_path, "w", encoding="utf-8") as f:
+        f.writelines(out)
+
+
+def _format_nml_lines(fileread: list[str], param_dict: dict) -> list[str] | None:
+    """
+    In-memory body of `format_nml_params`; returns the formatted lines, or None if nothing changes.
+    """
+    groups = index_namelist(fileread)
+
+    # first line of each patched entry -> (one past its last line, replacement line)
+    patches = {}
+    for group_name, tmp_subgroups in param_dict.items():
+        group = groups.get(str(group_name).lower())
+        if group is None or not isinstance(tmp_subgroups, dict):
+            continue
         for tmp_param, tmp_values in tmp_subgroups.items():
-            # convert Python bool to Fortran logical
-            if isinstance(tmp_values, bool):
-                tmp_values = ".true." if tmp_values else ".false."
+            entry = group.entries.get(str(tmp_param).lower())
+            text = _format_nml_value(tmp_values)
+            if entry is None or not entry.patchable or text is None:
+                continue
+            patches[entry.start] = (entry.stop, f"{entry.indent}{entry.name} = {text}{entry.comment}\n")
 
-            for idx, line in enumerate(fileread):
-                if line.lstrip().startswith("!"):
-                    continue
-                words = [w for w in re.split(r"[^a-zA-Z0-9_]+", line) if w]
-                if tmp_param in words:
-                    fileread[idx] = f"    {tmp_param} = {tmp_values}\n"
-                    break
+    if not patches:
+        return None
 
-    with open(nml_path, "w", encoding="utf-8") as f:
-        f.writelines(fileread)
+    out = []
+    idx = 0
+    while idx < len(fileread):
+        if idx in patches:
+            idx, line = patches[idx]
+            out.append(line)
+            continue
+        out.append(fileread[idx])
+        idx += 1
+    return out
@@ -1,45 +1,120 @@
+from collections.abc import Mapping
 from pathlib import Path
 
-from .tmp_parser.field_table import read_field_table, write_field_table
+from .tmp_parser.field_table import FieldTableDocument, write_field_table
 
-from .utils import update_config_entries
+from .utils import update_config_entries, ChangeSet
 
 
-def prune_empty_field_table_config(config: dict) -> None:
+def prune_empty_field_table_config(config: dict, entries=None) -> None:
     """
     In field_table semantics, an entry with no methods should be removed entirely.
+
+    `entries` limits the check to the given (field, model, field_type) entries; by default
+    the whole config is walked.
     """
-    # config[field][model][field_type] = {"methods": [...]}
-    for field in list(config.keys()):
-        field_map = config[field]
-        for model in list(field_map.keys()):
-            model_map = field_map[model]
-            for field_type in list(model_map.keys()):
-                block = model_map[field_type]
-                methods = block.get("methods", None)
-
-                # treat missing methods as no entry
-                if not methods:
-                    del model_map[field_type]
-
-            if not model_map:
-                del field_map[model]
-        if not field_map:
+    if entries is None:
+        for field in list(config.keys()):
+            field_map = config[field]
+            for model in list(field_map.keys()):
+                model_map = field_map[model]
+                for field_type in list(model_map.keys()):
+                    block = model_map[field_type]
+                    methods = block.get("methods", None)
+
+                    # treat missing methods as no entry
+                    if not methods:
+                        del model_map[field_type]
+
+                if not model_map:
+                    del field_map[model]
+            if not field_map:
+                del config[field]
+        return
+
+    for field, model, field_type in entries:
+        model_map = config.get(field, {}).get(model)
+        if model_map is None or field_type not in model_map:
+            continue
+        if not model_map[field_type].get("methods", None):
+            del model_map[field_type]
+        if not model_map:
+            del config[field][model]
+        if not config[field]:
             del config[field]
 
 
+def _touched_entries(param_dict: Mapping, entries) -> list[tuple[str, str, str]]:
+    """
+    The (field, model, field_type) `entries` that `param_dict` may change, in order and without duplicates.
+    """
+    touched = {}
+    for key in entries:
+        field, model, field_type = key
+        if field not in param_dict:
+            continue
+        models = param_dict[field]
+        if isinstance(models, Mapping):
+            if model not in models:
+                continue
+            types = models[model]
+            if isinstance(types, Mapping) and field_type not in types:
+                continue
+        touched[key] = None
+    return list(touched)
+
+
 class FieldTableUpdater:
     def __init__(self, directory: Path) -> None:
         self.directory = directory
+        # field_table file -> (text, parsed document) of the last version read
+        self._documents: dict[Path, tuple[str, FieldTableDocument]] = {}
 
     def update_field_table_params(
         self,
         param_dict: dict,
         target_file: str,
         state: dict,
-    ) -> None:
+    ) -> ChangeSet:
+        """
+        Updates entries of a field_table file and writes it back if anything changed.
+
+        Only the method lines of changed entries are spliced into the original lines, so
+        comments and the layout of everything else are kept. A file whose text was already
+        parsed (e.g. the same field_table on another branch) is not parsed again.
+        """
         fpath = self.directory / target_file
-        config = read_field_table(fpath)
-        update_config_entries(config, param_dict, pop_key=True, path=str(target_file), state=state)
-        prune_empty_field_table_config(config)
-        write_field_table(config, fpath)
+        doc = self._load_document(fpath)
+        config = doc.config()
+        changes = update_config_entries(config, param_dict, pop_key=True, path=str(target_file), state=state)
+        if not changes:
+            return changes
+
+        if not doc.patchable:
+            prune_empty_field_table_config(config)
+            write_field_table(config, fpath)
+            return changes
+
+        new_entries = [(f, m, t) for f in param_dict for m, types in config.get(f, {}).items() for t in types]
+        entries = _touched_entries(param_dict, [*doc.entries, *new_entries])
+        prune_empty_field_table_config(config, entries)
+
+        for field, model, field_type in entries:
+            block = config.get(field, {}).get(model, {}).get(field_type)
+            if block is None:
+                doc.remove((field, model, field_type))
+            else:
+                doc.set((field, model, field_type), block.get("methods", []))
+        doc.write(fpath)
+        return changes
+
+    def _load_document(self, fpath: Path) -> FieldTableDocument:
+        """
+        Return a fresh document for `fpath`, reusing the parsed lines if its text is unchanged.
+        """
+        text = fpath.read_text()
+        cached = self._documents.get(fpath)
+        if cached is None or cached[0] != text:
+            cached = (text, FieldTableDocument(text.splitlines(True)))
+            self._documents[fpath] = cached
+        return cached[1].clone()
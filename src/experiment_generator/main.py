@@ -2,7 +2,7 @@ import argparse
 import os
 from importlib.metadata import version, PackageNotFoundError
 
-from .tmp_parser.yaml_config import read_yaml
+from .plan_loader import load_plan
 from .experiment_generator import ExperimentGenerator
 
 
@@ -25,8 +25,8 @@ def main():
 
     Command-line Arguments:
         -i, --input-yaml-file (str, optional):
-            Path to the YAML file specifying parameter values for the experiment runs.
-            Defaults to 'Experiment_generator.yaml' if it exists.
+            Path(s) to the YAML file(s) specifying parameter values for the experiment runs,
+            merged in order. Defaults to 'Experiment_generator.yaml' if it exists.
     """
 
     parser = argparse.ArgumentParser(
@@ -44,8 +44,11 @@ def main():
         "-i",
         "--input-yaml-file",
         type=str,
+        action="extend",
+        nargs="+",
         help=(
-            "Path to the YAML file specifying parameter values for experiment runs.\n"
+            "Path(s) to the YAML file(s) specifying parameter values for experiment runs.\n"
+            "Several files (or `include:` lists inside them) are merged in order.\n"
             "Defaults to 'Experiment_generator.yaml' if present in the current directory."
         ),
     )
@@ -60,17 +63,17 @@ def main():
 
     args = parser.parse_args()
     if args.input_yaml_file:
-        input_yaml = args.input_yaml_file
+        input_yamls = args.input_yaml_file
     elif os.path.exists("Experiment_generator.yaml"):
-        input_yaml = "Experiment_generator.yaml"
+        input_yamls = ["Experiment_generator.yaml"]
     else:
         parser.error(
             "No YAML file specified and 'Experiment_generator.yaml' not found.\n"
             "Please provide one using -i / --input-yaml-file."
         )
 
-    # Load the YAML file
-    indata = read_yaml(input_yaml)
+    # Load the YAML file(s)
+    indata = load_plan(input_yamls)
 
     # Run the experiment generator
     generator = ExperimentGenerator(indata)
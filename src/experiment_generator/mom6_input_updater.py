@@ -1,9 +1,6 @@
 from pathlib import Path
-from .utils import update_config_entries
-from .tmp_parser.mom6_input import (
-    read_mom_input,
-    write_mom_input,
-)
+from .utils import update_config_entries, ChangeSet
+from .tmp_parser.mom6_input import MomInputDocument, ADDED_HEADER
 
 
 class Mom6InputUpdater:
@@ -13,29 +10,67 @@ class Mom6InputUpdater:
 
     def __init__(self, directory: Path) -> None:
         self.directory = directory
+        # MOM6 input file -> (text, tokenized document) of the last version read
+        self._documents: dict[Path, tuple[str, MomInputDocument]] = {}
 
     def update_mom6_params(
         self,
         param_dict: dict,
         target_file: str,
         state: dict,
-    ) -> None:
+    ) -> ChangeSet:
         """
         Updates parameters and overwrites the MOM6 input file.
 
         Args:
             param_dict (dict): Dictionary of parameters to update.
-            target_file (str): Name of the MOM6 input file.
+                Parameters inside module blocks are addressed by scoped keys, e.g. `KPP%N_SMOOTH`.
+            target_file (str): Name of the MOM6 input file (`MOM_input` or `MOM_override`).
+
+        Only the keys in `param_dict` are patched into the tokenized document, and a file
+        whose text was already tokenized (e.g. the same MOM_input on another branch) is
+        cloned instead of being tokenized again.
+
+        `MOM_override` is updated as an overlay of the `MOM_input` next to it: MOM_input itself
+        is left untouched, and new keys already set in MOM_input are written as `#override`.
         """
         nml_path = self.directory / target_file
+        is_override = nml_path.name == "MOM_override"
 
         # Read the MOM6 input file
-        raw_lines, base_params = read_mom_input(nml_path)
+        doc = self._load_document(nml_path, missing_ok=is_override)
+        base_params = doc.params()
 
         # Update the parameters
         # Note: This will remove keys with value "REMOVE" only
         # stored state is dummy in this updater since there is no list handling here
-        update_config_entries(base_params, param_dict, pop_key=True, path=str(target_file), state=state)
+        changes = update_config_entries(base_params, param_dict, pop_key=True, path=str(target_file), state=state)
 
         # Write the updated parameters back to the MOM6 input file
-        write_mom_input(raw_lines, base_params, nml_path)
+        if changes:
+            overridden = set()
+            if is_override and (nml_path.parent / "MOM_input").exists():
+                overridden = self._load_document(nml_path.parent / "MOM_input").index.keys()
+            for name in param_dict:
+                if name in base_params:
+                    doc.set(name, base_params[name], override=name in overridden)
+                else:
+                    doc.remove(name)
+            doc.write(nml_path)
+        return changes
+
+    def _load_document(self, nml_path: Path, missing_ok: bool = False) -> MomInputDocument:
+        """
+        Return a fresh document for `nml_path`, reusing the tokenized records if its text is unchanged.
+
+        With `missing_ok`, a missing file is read as an empty MOM_override (no "Added parameters" header).
+        """
+        if missing_ok and not nml_path.exists():
+            return MomInputDocument([], added_header=None)
+        text = nml_path.read_text(encoding="utf-8")
+        cached = self._documents.get(nml_path)
+        if cached is None or cached[0] != text:
+            header = None if nml_path.name == "MOM_override" else ADDED_HEADER
+            cached = (text, MomInputDocument(text.splitlines(True), added_header=header))
+            self._documents[nml_path] = cached
+        return cached[1].clone()
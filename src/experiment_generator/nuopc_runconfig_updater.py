@@ -5,8 +5,8 @@ This module provides utilities for updating `nuopc.runconfig` configuration file
 """
 
 from pathlib import Path
-from .utils import update_config_entries
-from .tmp_parser.nuopc_config import read_nuopc_config, write_nuopc_config
+from .utils import update_config_entries, ChangeSet
+from .tmp_parser.nuopc_config import NuopcConfigDocument, write_nuopc_config
 
 
 class NuopcRunConfigUpdater:
@@ -19,22 +19,51 @@ class NuopcRunConfigUpdater:
         Initialise the updater with the working directory.
         """
         self.directory = directory
+        # nuopc.runconfig file -> (text, parsed document) of the last version read
+        self._documents: dict[Path, tuple[str, NuopcConfigDocument]] = {}
 
     def update_runconfig_params(
         self,
         param_dict: dict,
         target_file: str,
         state: dict,
-    ) -> None:
+    ) -> ChangeSet:
         """
         Updates parameters and overwrites the `nuopc.runconfig` file.
 
         This method reads the file, updates entries based on the provided dictionary,
-        and writes the modified configuration back to file.
+        and writes the modified configuration back to file if anything changed.
+
+        Only the values that changed are patched into the original lines, so comments
+        and the formatting of every other line are kept. A file whose text was already
+        parsed (e.g. the same nuopc.runconfig on another branch) is not parsed again.
         """
         nml_path = self.directory / target_file
 
-        file_read = read_nuopc_config(nml_path)
+        doc = self._load_document(nml_path)
+        file_read = doc.config()
         # stored state is dummy in this updater since there is no list handling here
-        update_config_entries(file_read, param_dict, pop_key=True, path=str(target_file), state=state)
-        write_nuopc_config(file_read, nml_path)
+        changes = update_config_entries(file_read, param_dict, pop_key=True, path=str(target_file), state=state)
+        if changes and not doc.patchable:
+            write_nuopc_config(file_read, nml_path)
+        elif changes:
+            for key in param_dict:
+                if key in file_read:
+                    doc.set(key, file_read[key])
+                else:
+                    doc.remove(key)
+            doc.write(nml_path)
+        return changes
+
+    def _load_document(self, nml_path: Path) -> NuopcConfigDocument:
+        """
+        Return a fresh document for `nml_path`, reusing the parsed lines if its text is unchanged.
+        """
+        if not nml_path.is_file():
+            raise FileNotFoundError(f"File not found: {nml_path.as_posix()}")
+        text = nml_path.read_text()
+        cached = self._documents.get(nml_path)
+        if cached is None or cached[0] != text:
+            cached = (text, NuopcConfigDocument(text.splitlines(True), file_name=str(nml_path)))
+            self._documents[nml_path] = cached
+        return cached[1].clone()
@@ -1,9 +1,14 @@
+from collections.abc import Mapping
 from pathlib import Path
-from .tmp_parser.nuopc_seq import (
-    read_runseq,
-    modify_runseq,
-    write_runseq,
-)
+from .tmp_parser.nuopc_seq import RunSequence
+from .utils import ChangeSet, Change
+
+# plan keys understood by `update_nuopc_runseq`, in the order they are applied
+RUNSEQ_KEYS = ("runseq_block", "cpl_dt", "loop_dt", "remove", "insert_before", "insert_after", "remap")
+
+
+def _as_list(value) -> list:
+    return list(value) if isinstance(value, (list, tuple)) else [value]
 
 
 class NuopcRunseqUpdater:
@@ -11,43 +16,92 @@ class NuopcRunseqUpdater:
     A utility class for updating nuopc_runseq input files.
 
     Methods:
-        - `update_nuopc_runseq`: Updates MOM6 input parameters.
+        - `update_nuopc_runseq`: Updates the run sequence of a nuopc.runseq file.
     """
 
     def __init__(self, directory: Path) -> None:
         self.directory = directory
+        # nuopc.runseq file -> (text, parsed run sequence) of the last version read
+        self._documents: dict[Path, tuple[str, RunSequence]] = {}
 
     def update_nuopc_runseq(
         self,
         param_dict: dict,
         target_file: str,
-    ) -> None:
+        state: dict | None = None,
+    ) -> ChangeSet:
         """
-        Updates parameters and overwrites the MOM6 input file.
+        Updates the run sequence and overwrites the nuopc.runseq file if anything changed.
+
+        Supported keys, applied in this order (a None value leaves the file as is):
+          - `runseq_block`: text replacing the whole run sequence,
+          - `cpl_dt`: time step of the first time loop (`@<number>`),
+          - `loop_dt`: `{old time step: new time step}` for any time loop, nested ones included,
+          - `remove`: call(s) to remove, e.g. `MED med_phases_diag_ocn`,
+          - `insert_before` / `insert_after`: `{existing call: call(s) to insert next to it}`,
+          - `remap`: `{"SRC -> DST": remap method}` for connectors.
+        Connectors may be referred to without their options, e.g. `MED -> OCN`. Unchanged lines
+        keep their original text. A file whose text was already parsed (e.g. the same
+        nuopc.runseq on another branch) is not parsed again.
         """
+        # stored state is not used by this updater, the run sequence holds no mergeable lists
+        unknown = [key for key in param_dict if key not in RUNSEQ_KEYS]
+        if unknown:
+            raise ValueError(f"-- {target_file}: unsupported key(s) {unknown}, expected any of {list(RUNSEQ_KEYS)}")
+
         nml_path = self.directory / target_file
+        params = {key: param_dict[key] for key in RUNSEQ_KEYS if param_dict.get(key) is not None}
+        for key in ("loop_dt", "insert_before", "insert_after", "remap"):
+            if key in params and not isinstance(params[key], Mapping):
+                raise ValueError(f"-- {target_file}: `{key}` must be a mapping, got {params[key]!r}")
+        text, runseq = self._load_document(nml_path, missing_ok=bool(params.get("runseq_block")))
+
+        changes = ChangeSet()
+        path = str(target_file)
+        if params.get("runseq_block"):
+            runseq.set_block(params["runseq_block"])
+            changes.modified.append(Change(f"{path}.runseq_block", new=params["runseq_block"]))
+
+        if "cpl_dt" in params:
+            old = runseq.set_cpl_dt(params["cpl_dt"])
+            if old != str(params["cpl_dt"]):
+                changes.modified.append(Change(f"{path}.cpl_dt", old=old, new=params["cpl_dt"]))
 
-        # Update runseq block if provided
-        if "runseq_block" in param_dict and param_dict["runseq_block"]:
-            new_commands = modify_runseq(
-                commands=[],  # ignore when new_block is provided
-                new_block=param_dict["runseq_block"],
-            )
-            write_runseq(new_commands, nml_path)
-            return
-
-        # Otherwise, just update cpl_dt line
-        raw_lines = read_runseq(nml_path)
-
-        old_val = None
-        for line in raw_lines:
-            stripped = line.strip()
-            if stripped.startswith("@") and stripped[1:].isdigit():
-                old_val = stripped[1:]
-                break
-
-        if old_val is None:
-            raise ValueError("Could not find a line beginning with '@<number>'in nuopc.runseq file")
-
-        new_commands = modify_runseq(raw_lines, old_val=old_val, new_val=param_dict["cpl_dt"])
-        write_runseq(new_commands, nml_path)
+        for old, new in params.get("loop_dt", {}).items():
+            runseq.set_loop_dt(old, new)
+            if str(old) != str(new):
+                changes.modified.append(Change(f"{path}.loop_dt.{old}", old=old, new=new))
+
+        for call in _as_list(params.get("remove", [])):
+            runseq.remove(call)
+            changes.removed.append(Change(f"{path}.{call}", old=call))
+
+        for key, after in (("insert_before", False), ("insert_after", True)):
+            for anchor, calls in params.get(key, {}).items():
+                runseq.insert(anchor, _as_list(calls), after=after)
+                changes.added.extend(Change(f"{path}.{call}", new=call) for call in _as_list(calls))
+
+        for connector, method in params.get("remap", {}).items():
+            if runseq.set_remap(connector, method):
+                changes.modified.append(Change(f"{path}.{connector}", new=method))
+
+        if runseq.render() != text:
+            runseq.write(nml_path)
+        else:
+            changes = ChangeSet()
+        return changes
+
+    def _load_document(self, nml_path: Path, missing_ok: bool = False) -> tuple[str | None, RunSequence]:
+        """
+        Return the text of `nml_path` and a fresh run sequence, reusing the parsed tree if the text is unchanged.
+        """
+        if not nml_path.is_file():
+            if not missing_ok:
+                raise FileNotFoundError(f"File not found: {nml_path.as_posix()}")
+            return None, RunSequence([])
+        text = nml_path.read_text()
+        cached = self._documents.get(nml_path)
+        if cached is None or cached[0] != text:
+            cached = (text, RunSequence(text.splitlines(True)))
+            self._documents[nml_path] = cached
+        return text, cached[1].clone()
@@ -1,11 +1,99 @@
+from collections.abc import Callable, Mapping
 from pathlib import Path
 from .tmp_parser.json_parser import read_json, write_json
-from .utils import update_config_entries
+from .utils import update_config_entries, ChangeSet
 import warnings
 from .common_var import _is_removed_str, _is_preserved_str, REMOVED, PRESERVED
 
 required = ["type", "dimension", "value", "calendar", "comment"]
 allowed_types = {"scaling", "offset", "separable", REMOVED, PRESERVED}
+allowed_dimensions = {"spatial", "temporal", "constant", "spatiotemporal"}
+allowed_calendars = {"forcing", "experiment"}
+
+
+class PerturbationSchemaError(ValueError):
+    """
+    Raised when forcing perturbations in the plan do not match the perturbation schema.
+
+    Attributes:
+        violations (list[str]): Every violation found, each prefixed with its plan path.
+    """
+
+    def __init__(self, violations: list[str]) -> None:
+        self.violations = violations
+        super().__init__("Invalid forcing perturbations:\n  " + "\n  ".join(violations))
+
+
+class PerturbationValidator:
+    """
+    Perturbation schema compiled into one check per field.
+
+    `schema` maps a field name to `(check, error)`: `check(value)` tells whether a value is valid,
+    and `error` formats the message for an invalid value. Fields listed in `mandatory` must be present.
+    """
+
+    def __init__(self, schema: dict[str, tuple[Callable, str]], mandatory: tuple[str, ...]) -> None:
+        self._checks = tuple((name, check, error) for name, (check, error) in schema.items())
+        self._mandatory = mandatory
+
+    def errors(self, pert: Mapping, path: str = "") -> list[str]:
+        """
+        Return every violation of a single perturbation dict, prefixed with `path`.
+        """
+        prefix = f"{path}: " if path else ""
+        errors = [f"{prefix}missing '{name}'" for name in self._mandatory if name not in pert]
+        for name, check, error in self._checks:
+            if name in pert and not check(pert[name]):
+                errors.append(prefix + error.format(pert[name]))
+        return errors
+
+    def validate_params(self, param_dict: Mapping, path: str) -> list[str]:
+        """
+        Return every violation in the perturbations of a `{fieldname: updates}` forcing plan.
+
+        Markers are interpreted as `update_forcing_params` does: PRESERVE'd or empty perturbation
+        lists, REMOVE'd / PRESERVE'd perturbations and PRESERVE'd fields are not checked.
+        """
+        errors = []
+        for fieldname, updates in param_dict.items():
+            if not isinstance(updates, Mapping) or "perturbations" not in updates:
+                continue
+            perts = updates["perturbations"]
+            pert_path = f"{path}.{fieldname}.perturbations"
+            if (
+                perts in (None, {}, [])
+                or _is_preserved_str(perts)
+                or (isinstance(perts, list) and len(perts) == 1 and _is_preserved_str(perts[0]))
+            ):
+                continue
+            if isinstance(perts, Mapping):
+                perts = {pert_path: perts}
+            elif isinstance(perts, list) and all(isinstance(pert, Mapping) for pert in perts):
+                perts = {f"{pert_path}[{i}]": pert for i, pert in enumerate(perts)}
+            else:
+                errors.append(f"{pert_path}: must be a dict or list of dicts")
+                continue
+
+            for pert_path, pert in perts.items():
+                if _is_removed_str(pert.get("type")) or _is_preserved_str(pert.get("type")):
+                    continue
+                errors.extend(self.errors({k: v for k, v in pert.items() if not _is_preserved_str(v)}, pert_path))
+        return errors
+
+
+PERTURBATION_VALIDATOR = PerturbationValidator(
+    {
+        "type": (lambda v: isinstance(v, str) and v in allowed_types, "Invalid perturbation type: {}"),
+        "dimension": (
+            lambda v: (isinstance(v, str) and v in allowed_dimensions) or v == ["temporal", "spatial"],
+            "Invalid perturbation dimension: {}",
+        ),
+        "value": (lambda v: v is not None, "Invalid perturbation value: {}"),
+        "calendar": (lambda v: isinstance(v, str) and v in allowed_calendars, "Invalid perturbation calendar: {}"),
+        "comment": (lambda v: isinstance(v, str), "Invalid perturbation comment: {}"),
+    },
+    mandatory=("type", "dimension", "calendar"),
+)
 
 
 class Om2ForcingUpdater:
@@ -21,15 +109,31 @@ class Om2ForcingUpdater:
         param_dict: dict,
         target_file: Path,
         state: dict,
-    ) -> None:
+        validated: bool = False,
+    ) -> ChangeSet:
+        """
+        Apply `{fieldname: updates}` to the inputs of a forcing file.
+
+        `validated=True` skips the perturbation schema checks for plans already checked with
+        `PERTURBATION_VALIDATOR.validate_params` (as `PerturbationExperiment` does while collecting
+        experiment definitions); the perturbations are still cleaned of markers.
+        """
         forcing_path = self.directory / target_file
         file_read = read_json(forcing_path)
+        changes = ChangeSet()
 
+        # resolve every fieldname before touching any input
+        index, duplicates = self._fieldname_index(file_read["inputs"])
+        targets = []
         for fieldname, updates in param_dict.items():
-            idx = self._find_matching_param_index(file_read["inputs"], fieldname)
+            idx = index.get(fieldname)
             if idx is None:
                 raise ValueError("Did not find a valid perturbed fieldname!")
+            if fieldname in duplicates:
+                raise ValueError(f"-- forcing.json: fieldname '{fieldname}' appears more than once in 'inputs'")
+            targets.append((fieldname, updates, idx))
 
+        for fieldname, updates, idx in targets:
             base = file_read["inputs"][idx]
 
             if "perturbations" in updates:
@@ -40,32 +144,38 @@ class Om2ForcingUpdater:
                     # don't touch existing perts for this field
                     updates.pop("perturbations", None)
                 else:
-                    self._preprocess_perturbations(fieldname, updates)
+                    self._preprocess_perturbations(fieldname, updates, validate=not validated)
 
             # Drop any top-level keys explicitly marked PRESERVE (do not change this key)
             keys_to_drop = [k for k, v in updates.items() if _is_preserved_str(v)]
             for k in keys_to_drop:
                 updates.pop(k, None)
 
-            update_config_entries(base, updates, path=str(target_file), state=state)
+            changes.extend(update_config_entries(base, updates, path=str(target_file), state=state))
 
         write_json(file_read, forcing_path)
+        return changes
 
     @staticmethod
-    def _find_matching_param_index(inputs: list, fieldname: str) -> int | None:
+    def _fieldname_index(inputs: list) -> tuple[dict[str, int], set[str]]:
         """
-        Locate the index of a parameter in the 'inputs' list by field name.
+        Map each fieldname in `inputs` to its index, and collect the fieldnames used more than once.
         """
+        index = {}
+        duplicates = set()
         for i, base in enumerate(inputs):
-            if base.get("fieldname") != fieldname:
-                continue
-            return i
-        return None
-
-    def _preprocess_perturbations(self, fieldname: str, updates: dict) -> None:
+            fieldname = base.get("fieldname")
+            if fieldname in index:
+                duplicates.add(fieldname)
+            else:
+                index[fieldname] = i
+        return index, duplicates
+
+    def _preprocess_perturbations(self, fieldname: str, updates: dict, validate: bool = True) -> None:
         """
         process `updates["perturbations"]`.
         Warns and removes the key from `updates` if unsuitable.
+        `validate=False` skips the schema checks of perturbations that were validated up front.
         """
         perts = updates.get("perturbations")
 
@@ -108,7 +218,7 @@ class Om2ForcingUpdater:
                     q.pop(k, None)
 
             # drop invalid type
-            if not isinstance(t_, str) or t_ not in allowed_types:
+            if validate and (not isinstance(t_, str) or t_ not in allowed_types):
                 raise ValueError(
                     f"-- forcing.json '{fieldname}': perturbation has invalid type '{t_}'. "
                     f"Allowed types: {sorted(allowed_types)}"
@@ -127,8 +237,9 @@ class Om2ForcingUpdater:
             return
 
         # validate each dict
-        for pert in cleaned:
-            self._validate_single_perturbation(pert)
+        if validate:
+            for pert in cleaned:
+                self._validate_single_perturbation(pert)
 
         # keep only the cleaned ones
         updates["perturbations"] = cleaned
@@ -136,17 +247,8 @@ class Om2ForcingUpdater:
     @staticmethod
     def _validate_single_perturbation(pert: dict) -> None:
         """
-        Validate a single perturbation dict.
+        Validate a single perturbation dict, raising on the first violation.
         """
-        if pert["type"] not in allowed_types:
-            raise ValueError(f"Invalid perturbation type: {pert['type']}")
-
-        dim = pert["dimension"]
-        accepted_dim = (isinstance(dim, str) and dim in {"spatial", "temporal", "constant", "spatiotemporal"}) or (
-            isinstance(dim, list) and dim == ["temporal", "spatial"]
-        )
-        if not accepted_dim:
-            raise ValueError(f"Invalid perturbation dimension: {dim}")
-
-        if pert["calendar"] not in {"forcing", "experiment"}:
-            raise ValueError(f"Invalid perturbation calendar: {pert['calendar']}")
+        errors = PERTURBATION_VALIDATOR.errors(pert)
+        if errors:
+            raise ValueError(errors[0])
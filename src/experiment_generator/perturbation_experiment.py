@@ -11,11 +11,12 @@ from .config_updater import ConfigUpdater
 from .nuopc_runconfig_updater import NuopcRunConfigUpdater
 from .mom6_input_updater import Mom6InputUpdater
 from .nuopc_runseq_updater import NuopcRunseqUpdater
-from .om2_forcing_updater import Om2ForcingUpdater
+from .om2_forcing_updater import Om2ForcingUpdater, PERTURBATION_VALIDATOR, PerturbationSchemaError
 from .field_table_updater import FieldTableUpdater
 from .common_var import BRANCH_KEY, _is_removed_str, _is_preserved_str, _is_seq
-from .utils import _strip_preserved
+from .utils import normalise_markers, _run_walker, ChangeSet
 from .state_store import RemoveStateStore
+from .derived_params import derive_for_branches
 
 
 @dataclass
@@ -34,6 +35,85 @@ class ExperimentDefinition:
     file_params: dict[str, dict]
 
 
+def _filter_value(x):
+    """
+    Clean values; return (keep: bool, cleaned).
+
+    - REMOVE / PRESERVE markers are kept as values so later updaters can interpret them.
+    - Mappings are cleaned and empty children pruned; an empty mapping is not kept.
+    - Sequences are cleaned element-wise; an empty sequence is not kept.
+    - Scalars, strings and None are kept as-is.
+
+    Nested containers are walked with an explicit stack.
+    """
+
+    def _is_leaf(v) -> bool:
+        if _is_removed_str(v) or _is_preserved_str(v):
+            return True
+        if isinstance(v, Mapping):
+            return False
+        if _is_seq(v):
+            # keep ["PRESERVE"] so the list merger can interpret it
+            return len(v) == 1 and _is_preserved_str(v[0])
+        return True
+
+    def _frame(node, parent, key):
+        if isinstance(node, Mapping):
+            return (node, iter(node.items()), type(node)(), parent, key)
+        return (node, iter(enumerate(node)), [], parent, key)
+
+    if _is_leaf(x):
+        return True, x
+
+    # each frame is (source, remaining items, cleaned output, parent frame, key in parent)
+    stack = [_frame(x, None, None)]
+    result = None
+    while stack:
+        node, items, out, parent, key = frame = stack[-1]
+        is_mapping = isinstance(node, Mapping)
+        for k, v in items:
+            if not _is_leaf(v):
+                stack.append(_frame(v, frame, k))
+                break
+            if is_mapping:
+                out[k] = v
+            else:
+                out.append(v)
+        else:
+            stack.pop()
+            filtered = (False, None) if not out else (True, out)
+            if parent is None:
+                result = filtered
+            elif isinstance(parent[0], Mapping):
+                # prune empty mappings and sequences from mappings
+                if filtered[0]:
+                    parent[2][key] = filtered[1]
+            else:
+                # sequences keep every slot
+                parent[2].append(filtered[1])
+    return result
+
+
+def _select_from_list(row: list):
+    """
+    Clean a list and select the appropriate element for this run index.
+    """
+    keep_v, cleaned = _filter_value(row)
+    if not keep_v:
+        return False, None
+    # Propagate literal REMOVE (non-sequence) upwards
+    if _is_removed_str(cleaned) and not _is_seq(cleaned):
+        return True, cleaned
+    return True, cleaned
+
+
+def _is_namelist_file(filename: str) -> bool:
+    """
+    Fortran namelists are handled by `F90NamelistUpdater`.
+    """
+    return filename.endswith("_in") or filename.endswith(".nml") or os.path.basename(filename) == "namelists"
+
+
 class PerturbationExperiment(BaseExperiment):
     """
     Class to manage perturbation experiments by applying parameter sensitivity tests.
@@ -60,32 +140,50 @@ class PerturbationExperiment(BaseExperiment):
         self.om2forcingupdater = Om2ForcingUpdater(directory)
         self.fieldtableupdater = FieldTableUpdater(directory)
 
-    def _apply_updates(self, file_params: dict[str, dict], state: dict | None = None) -> None:
+    def _apply_updates(
+        self, file_params: dict[str, dict], state: dict | None = None, validated: bool = False
+    ) -> dict[str, ChangeSet]:
         """
         Apply a dict of `{filename: parameters}` to different config files.
+
+        Returns the `ChangeSet` reported by each updater that supports it, keyed by filename,
+        and prints a one-line change summary per file.
+
+        Markers are resolved once per file by `normalise_markers` (a no-op for definitions
+        collected by `_collect_experiment_definitions`); updaters consume the normalised tree.
+        `validated=True` tells updaters that the parameters were schema-checked while the
+        definitions were collected, so they skip their own checks.
         """
+        file_changes = {}
         for filename, params in file_params.items():
             # TODO: this is temporary because f90nml_updater.update_nml_params does not use
             # update_config_entries() yet. This will be fixed as long as access-parsers implements.
-            should_apply, params = _strip_preserved(params)
-            if not should_apply:
-                params = {}
+            params = normalise_markers(params)
 
-            if filename.endswith("_in") or filename.endswith(".nml") or os.path.basename(filename) == "namelists":
+            changes = None
+            if _is_namelist_file(filename):
                 # Fortran namelist does not contain nested lists hence state store is not required here
                 self.f90namelistupdater.update_nml_params(params, filename)
             elif filename.endswith(".yaml"):
-                self.configupdater.update_config_params(params, filename, state=state)
+                changes = self.configupdater.update_config_params(params, filename, state=state)
             elif filename == "nuopc.runconfig":
-                self.nuopcrunconfigupdater.update_runconfig_params(params, filename, state=state)
-            elif filename == "MOM_input":
-                self.mom6inputupdater.update_mom6_params(params, filename, state=state)
+                changes = self.nuopcrunconfigupdater.update_runconfig_params(params, filename, state=state)
+            elif filename in ("MOM_input", "MOM_override"):
+                changes = self.mom6inputupdater.update_mom6_params(params, filename, state=state)
             elif filename == "nuopc.runseq":
-                self.nuopcrunsequpdater.update_nuopc_runseq(params, filename, state=state)
+                changes = self.nuopcrunsequpdater.update_nuopc_runseq(params, filename, state=state)
             elif filename == "atmosphere/forcing.json":
-                self.om2forcingupdater.update_forcing_params(params, filename, state=state)
+                changes = self.om2forcingupdater.update_forcing_params(
+                    params, filename, state=state, validated=validated
+                )
             elif filename.endswith("field_table"):
-                self.fieldtableupdater.update_field_table_params(params, filename, state=state)
+                changes = self.fieldtableupdater.update_field_table_params(params, filename, state=state)
+
+            if isinstance(changes, ChangeSet):
+                file_changes[filename] = changes
+                print(f"-- {filename}: {changes.summary()}")
+
+        return file_changes
 
     def manage_control_expt(self) -> None:
         """
@@ -163,8 +261,8 @@ class PerturbationExperiment(BaseExperiment):
 
             state = self.state_store.load_state(branch)
 
-            # then pass state into updates
-            self._apply_updates(expt_def.file_params, state=state)
+            # then pass state into updates; definitions were validated when collected
+            self._apply_updates(expt_def.file_params, state=state, validated=True)
 
             # save state after updates
             self.state_store.save_state(branch, state)
@@ -176,8 +274,13 @@ class PerturbationExperiment(BaseExperiment):
     def _collect_experiment_definitions(self, namelists: dict) -> list[ExperimentDefinition]:
         """
         Collects and returns a list of experiment definitions based on provided perturbation namelists.
+
+        Forcing perturbations of every branch are checked against the perturbation schema here, and
+        all violations are reported at once in a `PerturbationSchemaError`, before any branch is set up.
         """
         experiment_definitions = []
+        # schema violation -> branches it occurs in
+        violations: dict[str, list[str]] = {}
         for block_name, blockcontents in namelists.items():
             branch_keys = f"{BRANCH_KEY}"
             if branch_keys not in blockcontents:
@@ -192,13 +295,15 @@ class PerturbationExperiment(BaseExperiment):
             # all other keys hold file-specific parameter configurations
             file_params_all = {k: v for k, v in blockcontents.items() if k != branch_keys}
 
+            block_definitions = []
             for indx, branch_name in enumerate(branch_names):
                 single_run_file_params = {}
                 for filename, param_dict in file_params_all.items():
                     run_specific_params = self._extract_run_specific_params(param_dict, indx, total_exps)
-                    single_run_file_params[filename] = run_specific_params
+                    # resolve markers once per branch; updaters consume the normalised tree
+                    single_run_file_params[filename] = normalise_markers(run_specific_params)
 
-                experiment_definitions.append(
+                block_definitions.append(
                     ExperimentDefinition(
                         block_name=block_name,
                         branch_name=branch_name,
@@ -206,6 +311,25 @@ class PerturbationExperiment(BaseExperiment):
                     )
                 )
 
+            # evaluate derived namelist parameters for all branches of the block at once
+            for filename in file_params_all:
+                if _is_namelist_file(filename):
+                    derive_for_branches(filename, [d.file_params[filename] for d in block_definitions])
+
+            if "atmosphere/forcing.json" in file_params_all:
+                plan_path = f"Perturbation_Experiment.{block_name}.atmosphere/forcing.json"
+                for expt_def in block_definitions:
+                    params = expt_def.file_params["atmosphere/forcing.json"]
+                    for error in PERTURBATION_VALIDATOR.validate_params(params, plan_path):
+                        violations.setdefault(error, []).append(expt_def.branch_name)
+
+            experiment_definitions.extend(block_definitions)
+
+        if violations:
+            raise PerturbationSchemaError(
+                [f"{error} (branches: {', '.join(branches)})" for error, branches in violations.items()]
+            )
+
         return experiment_definitions
 
     def _extract_run_specific_params(self, nested_dict: dict, indx: int, total_exps: int) -> dict:
@@ -239,67 +363,28 @@ class PerturbationExperiment(BaseExperiment):
          - Special markers:
             -  REMOVE: keep it in the result so that later updaters can drop the key.
             -  PRESERVE: also keep it in the result so that later stripping
-              (via _strip_preserved or update_config_entries) decides whether to
-              keep or drop it.
+              (via normalise_markers) decides whether to keep or drop it.
             - None or null etc: preserved as-is (not removed).
 
          -  Filtering:
             - After cleaning, empty lists and empty dicts are dropped (parent key omitted).
             - `None`/null values are preserved as-is (not removed).
-        """
 
-        def _filter_value(x):
-            """
-            Clean values; return (keep: bool, cleaned).
-            """
-            # Preserve explicit delete marker as a value (not dropped here)
-            if _is_removed_str(x):
-                return True, x
-
-            if _is_preserved_str(x):
-                # keep marker so list merger can interpret it at element level
-                return True, x
-
-            # Mapping (dict, CommentedMap, etc); clean values and prune empties
-            if isinstance(x, Mapping):
-                res = type(x)()
-                for k, v in x.items():
-                    keep_v, filtered_v = _filter_value(v)
-                    if keep_v:
-                        res[k] = filtered_v
-                return (False, None) if not res else (True, res)
-
-            # Sequence (list etc); clean each element and drop empties/_drop
-            if _is_seq(x):
-                if len(x) == 1 and _is_preserved_str(x[0]):
-                    return True, x
-
-                elements = []
-                for v in x:
-                    keep_v, filtered_v = _filter_value(v)
-                    elements.append(filtered_v)
-                return (False, None) if not elements else (True, elements)
-
-            # # Scalar, str, None, etc
-            return True, x
-
-        def _select_from_list(row: list):
-            """
-            Clean a list and select the appropriate element for this run index.
-            """
-            keep_v, cleaned = _filter_value(row)
-            if not keep_v:
-                return False, None
-            # Propagate literal REMOVE (non-sequence) upwards
-            if _is_removed_str(cleaned) and not _is_seq(cleaned):
-                return True, cleaned
-            return True, cleaned
+         - Nested mappings are walked with an explicit stack (see `_run_walker`), so deeply
+           nested plans do not hit the recursion limit.
+        """
+        return _run_walker(self._extract_run_specific_walker(nested_dict, indx, total_exps))
 
+    def _extract_run_specific_walker(self, nested_dict: dict, indx: int, total_exps: int):
+        """
+        Walker behind `_extract_run_specific_params`; nested extractions are yielded to
+        `_run_walker` instead of recursing.
+        """
         result = {}
         for key, value in nested_dict.items():
             # nested dictionary (Mapping)
             if isinstance(value, Mapping):
-                keep_v, cleaned = _filter_value(self._extract_run_specific_params(value, indx, total_exps))
+                keep_v, cleaned = _filter_value((yield self._extract_run_specific_walker(value, indx, total_exps)))
                 if keep_v:
                     result[key] = cleaned
                 continue
@@ -313,7 +398,9 @@ class PerturbationExperiment(BaseExperiment):
                     # Clean each item first (so empties fall out)
                     cleaned_items = []
                     for item in value:
-                        keep_v, item_clean = _filter_value(self._extract_run_specific_params(item, indx, total_exps))
+                        keep_v, item_clean = _filter_value(
+                            (yield self._extract_run_specific_walker(item, indx, total_exps))
+                        )
                         if keep_v:
                             cleaned_items.append(item_clean)
                     if not cleaned_items:
@@ -352,7 +439,7 @@ class PerturbationExperiment(BaseExperiment):
                                 # recurse into dicts
                                 if isinstance(i, Mapping):
                                     keep_v, cleaned = _filter_value(
-                                        self._extract_run_specific_params(i, indx, total_exps)
+                                        (yield self._extract_run_specific_walker(i, indx, total_exps))
                                     )
                                     slots.append(cleaned if keep_v else {})
                                     continue
@@ -365,7 +452,7 @@ class PerturbationExperiment(BaseExperiment):
                             # recurse for each dict
                             items = []
                             for d in inner:
-                                items.append(self._extract_run_specific_params(d, indx, total_exps))
+                                items.append((yield self._extract_run_specific_walker(d, indx, total_exps)))
                             result[key] = items
                             continue
                         # otherwise, treat as a plain list
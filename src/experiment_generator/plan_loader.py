@@ -0,0 +1,84 @@
+"""
+Experiment plans split over several YAML files.
+
+A plan can be given as several files (`-i resources.yaml physics.yaml`), and any file can pull in
+others with a top-level `include:` (a path or a list of paths, relative to the including file).
+Files are merged in order: mappings are merged key by key, any other value of a later file replaces
+the earlier one, and the keys of a file override the files it includes.
+
+A perturbation block can also live in its own file(s), merged under the block's own keys:
+
+    Perturbation_Experiment:
+      physics_sweep:
+        include: sweeps/physics.yaml
+      diagnostics:
+        include: [sweeps/diag_branches.yaml, sweeps/diag_table.yaml]
+"""
+
+from collections.abc import Mapping
+from pathlib import Path
+
+from .common_var import INCLUDE_KEY
+from .tmp_parser.yaml_config import read_plan
+
+PERTURBATION_KEY = "Perturbation_Experiment"
+
+
+def merge_plans(base: Mapping, override: Mapping) -> dict:
+    """
+    Return `base` updated with `override`, nested mappings merged key by key. Neither is modified.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, Mapping) and isinstance(merged.get(key), Mapping):
+            merged[key] = merge_plans(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _include_paths(value, base_dir: Path) -> list[Path]:
+    if value is None:
+        return []
+    values = value if isinstance(value, list) else [value]
+    return [(base_dir / Path(v).expanduser()).resolve() for v in values]
+
+
+def _load_files(paths: list, chain: tuple) -> dict:
+    plan: dict = {}
+    for path in paths:
+        plan = merge_plans(plan, _load_file(path, chain))
+    return plan
+
+
+def _load_file(path: Path, chain: tuple) -> dict:
+    """
+    Load one plan file merged over the files it includes, with its block includes expanded.
+    """
+    if path in chain:
+        cycle = " -> ".join(p.as_posix() for p in (*chain, path))
+        raise ValueError(f"Circular include in experiment plan: {cycle}")
+    chain = chain + (path,)
+
+    plan = read_plan(path) or {}
+    if not isinstance(plan, Mapping):
+        raise ValueError(f"{path.as_posix()}: an experiment plan must be a mapping, got {type(plan).__name__}")
+
+    blocks = plan.get(PERTURBATION_KEY)
+    if isinstance(blocks, Mapping):
+        for name, block in blocks.items():
+            if isinstance(block, Mapping) and INCLUDE_KEY in block:
+                included = _load_files(_include_paths(block.pop(INCLUDE_KEY), path.parent), chain)
+                blocks[name] = merge_plans(included, block)
+
+    includes = _include_paths(plan.pop(INCLUDE_KEY, None), path.parent)
+    if not includes:
+        return plan
+    return merge_plans(_load_files(includes, chain), plan)
+
+
+def load_plan(paths: list) -> dict:
+    """
+    Load the experiment plan merged from the YAML file(s) `paths`, in order.
+    """
+    return _load_files([Path(p).resolve() for p in paths], ())
@@ -1,110 +1,358 @@
+from dataclasses import dataclass
+import difflib
 from pathlib import Path
 import re
 
-HEADER_PATTERN = re.compile(r'^\s*"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\s*$')
-THREE_STRINGS_PATTERN = re.compile(r'^\s*"([^"]*)"\s*,\s*"([^"]*)"\s*,\s*"([^"]*)"\s*$')
-TWO_STRINGS_PATTERN = re.compile(r'^\s*"([^"]*)"\s*,\s*"([^"]*)"\s*$')
-ASSIGNMENT_PATTERN = re.compile(r"^\s*([A-Za-z0-9_.-]+(?:/[A-Za-z0-9_.-]+)*)\s*=\s*(.*?)\s*$")
-
-
-def _strip_comments(line: str) -> str:
-    if line.lstrip().startswith("#"):
-        return ""
-    return line.rstrip("\n")
-
-
-def _split_end(line: str) -> tuple[str, bool]:
-    parts = line.rstrip()
-    if parts.endswith("/"):
-        return parts[:-1].rstrip(), True
-    return parts, False
+# one match per line, on the line without its `/` terminator: a comment, 2 or 3 quoted strings
+# (a header or a method) or a `key = value` assignment; anything else does not match
+_LINE = re.compile(
+    r"""
+    \s*(?:
+        (?P<comment>\#)
+        |(?P<strings>"(?P<s1>[^"]*)"\s*,\s*"(?P<s2>[^"]*)"(?:\s*,\s*"(?P<s3>[^"]*)")?)\s*\Z
+        |(?P<assignment>(?P<name>[A-Za-z0-9_.-]+(?:/[A-Za-z0-9_.-]+)*)\s*=\s*(?P<value>.*\S)?)\s*\Z
+    )
+    """,
+    re.VERBOSE,
+)
 
 
 def _parse_param_blob(blob: str) -> dict:
     """
     Specific for 3-quoted method lines
     """
-    parts = [p.strip() for p in blob.split(",") if p.strip()]
     param_dict: dict[str, str] = {}
-    for p in parts:
-        if "=" not in p:
-            return {}
-        key, value = p.split("=", 1)
+    for part in blob.split(","):
+        key, eq, value = part.partition("=")
         key = key.strip()
-        value = value.strip()
+        if not eq:
+            # empty parts are skipped, anything else must be an assignment
+            if key:
+                return {}
+            continue
         if not key:
             return {}
-        param_dict[key] = value
+        param_dict[key] = value.strip()
     return param_dict
 
 
-def read_field_table(path) -> dict:
+@dataclass
+class FieldTableMethod:
+    """
+    One method line of a field_table entry.
+
+    Attributes:
+        pos (int): Position of the line.
+        span (tuple[int, int]): Position of the method text in the line, quotes included.
+        method (dict): Parsed method, `{"key", "value"}` plus `"params"` for 3-quoted lines.
+        assignment (bool): True for the `key = value` format.
+        sep (str): Text between the quoted strings (or around `=` for assignments), to keep the layout on edits.
+    """
 
-    config = {}
+    pos: int
+    span: tuple[int, int]
+    method: dict
+    assignment: bool = False
+    sep: str = ", "
 
-    current_header: tuple[str, str, str] | None = None  # field_type, model, field
 
-    with open(Path(path), "r") as f:
-        for line in f:
-            line = _strip_comments(line)
+@dataclass
+class FieldTableEntry:
+    """
+    Lines of one field_table entry, from its header to the line holding its `/` terminator.
 
-            if not line.strip():
-                continue
+    Attributes:
+        start (int): Position of the header line.
+        end (int): Position of the line holding the terminator.
+        methods (list[FieldTableMethod] | None): Method lines, in file order; located on first edit.
+        indent (str): Indent of the first method line, used for new methods.
+    """
+
+    start: int
+    end: int = -1
+    methods: list[FieldTableMethod] | None = None
+    indent: str = ""
+
+
+def _tokenize(raw: str) -> tuple[re.Match | None, str | None, bool]:
+    """
+    Classify one line with a single match: returns the match, its kind ("blank", "comment", "strings",
+    "assignment", or None for anything else) and whether the line ends with the `/` terminator.
+    """
+    body = raw.rstrip()
+    if not body:
+        return None, "blank", False
+    is_end = body[-1] == "/"
+    m = _LINE.match(body, 0, len(body) - is_end)
+    return m, m.lastgroup if m else None, is_end
+
+
+def _method_dict(m: re.Match, kind: str | None) -> dict | None:
+    """
+    The method held by a tokenized line, None if the line holds no valid method.
+    """
+    if kind == "strings":
+        if m["s3"] is None:
+            # 2 strings
+            return {"key": m["s1"], "value": m["s2"]}
+        # 3 strings
+        params = _parse_param_blob(m["s3"])
+        return {"key": m["s1"], "value": m["s2"], "params": params} if params else None
+    if kind == "assignment":
+        # this is for assignment format - reading only
+        return {"key": m["name"], "value": m["value"] or ""}
+    return None
+
+
+def _copy_method(method: dict) -> dict:
+    if "params" in method:
+        return {**method, "params": dict(method["params"])}
+    return dict(method)
+
+
+def _method_key(method: dict) -> tuple:
+    params = method.get("params")
+    params = params if isinstance(params, dict) else {}
+    return (str(method.get("key")), str(method.get("value")), tuple((str(k), str(v)) for k, v in params.items()))
+
+
+class FieldTableDocument:
+    """
+    A field_table file parsed once, keeping its lines and a `(field, model, field_type) -> entry` index.
+
+    Edits are kept as an overlay on the original lines, so comments and the layout of unchanged
+    entries and methods are preserved, and `clone` gives an independent document (e.g. one per
+    branch) without parsing the file again. `set` diffs the methods of an entry against the file
+    and splices only the method lines that changed; new entries are appended at the end.
+
+    A file in which an entry header appears more than once is not `patchable`: `read_field_table`
+    merges the methods of such entries, so the file has to be regenerated with `write_field_table`.
+    """
+
+    def __init__(self, lines: list[str]) -> None:
+        self.lines = lines
+        # (field, model, field_type) -> entry, in file order
+        self.entries: dict[tuple[str, str, str], FieldTableEntry] = {}
+        self.patchable = True
+        self._config: dict = {}
 
-            body, is_end = _split_end(line)
+        current_header: tuple[str, str, str] | None = None  # field_type, model, field
+        start = 0
+        methods: list[dict] = []
+
+        for i, raw in enumerate(lines):
+            m, kind, is_end = _tokenize(raw)
+            if kind == "blank" or kind == "comment":
+                continue
 
             if current_header is None:
-                header_match = HEADER_PATTERN.match(body)
-                if not header_match:
-                    raise ValueError(f"Expected header (3 quoted strings), got: {line.strip()}")
-                current_header = (header_match.group(1), header_match.group(2), header_match.group(3))
+                if kind != "strings" or m["s3"] is None:
+                    raise ValueError(f"Expected header (3 quoted strings), got: {raw.strip()}")
+                current_header = (m["s1"], m["s2"], m["s3"])
+                start = i
                 methods = []
-                if is_end:
-                    _store_field(config, current_header, methods)
-                    current_header = None
-                continue
+            else:
+                # inside a field definition
+                method = _method_dict(m, kind)
+                if method is not None:
+                    methods.append(method)
 
-            # inside a field definition
-            if body.strip():
-                # 3 strings
-                method_match = THREE_STRINGS_PATTERN.match(body)
-                if method_match:
-                    key, value, blob = method_match.group(1), method_match.group(2), method_match.group(3)
-                    param_dict = _parse_param_blob(blob)
-                    if param_dict:
-                        methods.append({"key": key, "value": value, "params": param_dict})
-                else:
-                    # 2 strings
-                    method_match = TWO_STRINGS_PATTERN.match(body)
-                    if method_match:
-                        methods.append({"key": method_match.group(1), "value": method_match.group(2)})
-                    else:
-                        # this is for assignment format - reading only
-                        method_match = ASSIGNMENT_PATTERN.match(body)
-                        if method_match:
-                            methods.append({"key": method_match.group(1), "value": method_match.group(2)})
             if is_end:
-                _store_field(config, current_header, methods)
+                field_type, model, field_name = current_header
+                key = (field_name, model, field_type)
+                if key in self.entries:
+                    self.patchable = False
+                else:
+                    self.entries[key] = FieldTableEntry(start=start, end=i)
+                _store_field(self._config, current_header, methods)
                 current_header = None
-                methods = []
 
-    if current_header is not None:
-        raise ValueError(f"Unclosed entry {current_header} (missing trailing '/' terminator).")
+        if current_header is not None:
+            raise ValueError(f"Unclosed entry {current_header} (missing trailing '/' terminator).")
+
+        # line position -> replacement text (possibly several lines), or None if the line is removed
+        self._edits: dict[int, str | None] = {}
+        # line position -> lines inserted before it
+        self._inserts: dict[int, list[str]] = {}
+        # terminator line position -> method lines inserted before the terminator on that line
+        self._before_end: dict[int, list[str]] = {}
+        # new entries, appended at the end of the file
+        self._added: dict[tuple[str, str, str], list[str]] = {}
+
+    def _methods(self, entry: FieldTableEntry) -> list[FieldTableMethod]:
+        """
+        Method lines of `entry`, located on first use.
+        """
+        if entry.methods is not None:
+            return entry.methods
+        methods = []
+        for i in range(entry.start + 1, entry.end + 1):
+            raw = self.lines[i]
+            m, kind, _ = _tokenize(raw)
+            method = _method_dict(m, kind)
+            if method is None:
+                continue
+            if not methods:
+                entry.indent = raw[: len(raw) - len(raw.lstrip())]
+            if kind == "strings":
+                last = "s3" if m["s3"] is not None else "s2"
+                # the separator between the closing and the opening quotes
+                sep_start, sep_end = m.end("s1") + 1, m.start("s2") - 1
+                sep = raw[sep_start:sep_end]
+                methods.append(FieldTableMethod(i, (m.start("s1") - 1, m.end(last) + 1), method, sep=sep))
+            else:
+                name_end = m.end("name")
+                value_start = m.start("value") if m["value"] is not None else m.end("assignment")
+                sep = raw[name_end:value_start]
+                methods.append(FieldTableMethod(i, (m.start("name"), m.end("assignment")), method, True, sep))
+        entry.methods = methods
+        return methods
+
+    @classmethod
+    def read(cls, path) -> "FieldTableDocument":
+        with open(Path(path), "r") as f:
+            return cls(f.readlines())
+
+    def clone(self) -> "FieldTableDocument":
+        """
+        Return an independent copy sharing the parsed lines and index.
+        """
+        other = object.__new__(type(self))
+        other.lines = self.lines
+        other.entries = self.entries
+        other.patchable = self.patchable
+        other._config = self._config
+        other._edits = dict(self._edits)
+        other._inserts = {pos: list(lines) for pos, lines in self._inserts.items()}
+        other._before_end = {pos: list(lines) for pos, lines in self._before_end.items()}
+        other._added = dict(self._added)
+        return other
+
+    def config(self) -> dict:
+        """
+        Contents of the file as read, in the format returned by `read_field_table`.
+        """
+        return {
+            field_name: {
+                model: {
+                    field_type: {"methods": [_copy_method(m) for m in block["methods"]]}
+                    for field_type, block in types.items()
+                }
+                for model, types in models.items()
+            }
+            for field_name, models in self._config.items()
+        }
+
+    def set(self, key: tuple[str, str, str], methods: list[dict]) -> None:
+        """
+        Set the methods of entry `key` = (field, model, field_type), splicing only the method lines that change.
+        """
+        entry = self.entries.get(key)
+        if entry is None or self._edits.get(entry.start, "") is None:
+            field_name, model, field_type = key
+            self._added[key] = _entry_lines(field_type, model, field_name, methods)
+            return
+
+        old = self._methods(entry)
+        sep = next((m.sep for m in old if not m.assignment), ", ")
+        matcher = difflib.SequenceMatcher(
+            a=[_method_key(m.method) for m in old], b=[_method_key(m) for m in methods], autojunk=False
+        )
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            paired = min(i2 - i1, j2 - j1)
+            following, first_added = i1 + paired, j1 + paired
+            for m, new in zip(old[i1:following], methods[j1:first_added]):
+                self._splice(m, _method_text(new, m.sep, m.assignment), entry.end)
+            for m in old[following:i2]:
+                self._splice(m, None, entry.end)
+            added = [f"{entry.indent}{_method_text(new, sep)}\n" for new in methods[first_added:j2]]
+            if not added:
+                continue
+            if following < len(old):
+                self._inserts.setdefault(old[following].pos, []).extend(added)
+            elif entry.end == entry.start or (old and old[-1].pos == entry.end):
+                # the terminator shares its line with the last method (or the header)
+                self._before_end.setdefault(entry.end, []).extend(added)
+            else:
+                self._inserts.setdefault(entry.end, []).extend(added)
+
+    def _splice(self, method: FieldTableMethod, text: str | None, end: int) -> None:
+        line = self.lines[method.pos]
+        if text is None and method.pos != end:
+            self._edits[method.pos] = None
+            return
+        # a method sharing its line with the terminator is cut out, keeping the terminator
+        start, stop = method.span
+        self._edits[method.pos] = line[:start] + (text or "") + line[stop:]
+
+    def remove(self, key: tuple[str, str, str]) -> None:
+        """
+        Remove entry `key` = (field, model, field_type), with the blank line following it.
+        """
+        if self._added.pop(key, None) is not None:
+            return
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        for i in range(entry.start, entry.end + 1):
+            self._edits[i] = None
+            self._inserts.pop(i, None)
+            self._before_end.pop(i, None)
+        after = entry.end + 1
+        if after < len(self.lines) and not self.lines[after].strip():
+            self._edits[after] = None
+
+    def render(self) -> str:
+        """
+        Return the text of the document, original lines with the edits applied.
+        """
+        out = []
+        for i, line in enumerate(self.lines):
+            out.extend(self._inserts.get(i, ()))
+            line = self._edits.get(i, line)
+            if line is None:
+                continue
+            if i in self._before_end:
+                # move the terminator after the inserted methods
+                code = line.rstrip()[:-1].rstrip()
+                if code.strip():
+                    out.append(code + "\n")
+                out.extend(self._before_end[i])
+                out.append("/\n")
+                continue
+            out.append(line)
+
+        for block in self._added.values():
+            if out and not out[-1].endswith("\n"):
+                out[-1] += "\n"
+            if out and out[-1].strip():
+                out.append("\n")
+            out.extend(block)
+        return "".join(out)
 
-    return config
+    def write(self, path) -> None:
+        with open(Path(path), "w") as f:
+            f.write(self.render())
+
+
+def read_field_table(path) -> dict:
+    # the document is not kept, so its contents need no copy
+    return FieldTableDocument.read(path)._config
 
 
 def _store_field(config: dict, header: tuple[str, str, str], methods: list[dict]) -> None:
-    field_type, model, field = header
+    field_type, model, field_name = header
 
-    if field not in config:
-        config[field] = {}
-    if model not in config[field]:
-        config[field][model] = {}
-    if field_type not in config[field][model]:
-        config[field][model][field_type] = {"methods": []}
+    if field_name not in config:
+        config[field_name] = {}
+    if model not in config[field_name]:
+        config[field_name][model] = {}
+    if field_type not in config[field_name][model]:
+        config[field_name][model][field_type] = {"methods": []}
 
-    config[field][model][field_type]["methods"].extend(methods)
+    config[field_name][model][field_type]["methods"].extend(methods)
 
 
 def _params_to_blob(params: dict) -> str:
@@ -118,6 +366,38 @@ def _params_to_blob(params: dict) -> str:
     return ", ".join(parts)
 
 
+def _method_text(method: dict, sep: str = ", ", assignment: bool = False) -> str:
+    """
+    Render a method as `"key", "value"` or `"key", "value", "k=v, k2=v2"`, or as `key = value` for `assignment`.
+    """
+    key = method.get("key")
+    value = method.get("value")
+    params = method.get("params", {})
+
+    if isinstance(params, dict) and params:
+        sep = ", " if assignment else sep
+        return f'"{key}"{sep}"{value}"{sep}"{_params_to_blob(params)}"'
+    if assignment:
+        return f"{key}{sep}{value}"
+    return f'"{key}"{sep}"{value}"'
+
+
+def _entry_lines(field_type: str, model: str, field_name: str, methods: list[dict]) -> list[str]:
+    """
+    Lines of one entry in the strict format written by `write_field_table`.
+    """
+    # header must be field_type, model, field
+    lines = [f'"{field_type}", "{model}", "{field_name}"\n']
+
+    if not methods:
+        lines.append(" /\n")
+        return lines
+
+    for index, method in enumerate(methods):
+        lines.append(_method_text(method) + ("\n/\n" if index == len(methods) - 1 else "\n"))
+    return lines
+
+
 def write_field_table(config: dict, file: Path) -> None:
     """
     Only write in strict 2-quoted / 3-quoted format for consistency.
@@ -129,33 +409,14 @@ def write_field_table(config: dict, file: Path) -> None:
     with open(Path(file), "w") as f:
         first = True  # to manage the first blank line and blank lines between entries
 
-        for field in config.keys():
-            for model in config[field].keys():
-                for field_type in config[field][model].keys():
-                    block = config[field][model][field_type] or {}
-                    # print(block)
+        for field_name in config.keys():
+            for model in config[field_name].keys():
+                for field_type in config[field_name][model].keys():
+                    block = config[field_name][model][field_type] or {}
                     methods = block.get("methods", [])
 
                     if not first:
                         f.write("\n")
                     first = False
 
-                    # header must be field_type, model, field
-                    f.write(f'"{field_type}", "{model}", "{field}"\n')
-
-                    if not methods:
-                        f.write(" /\n")
-                        continue
-
-                    for index, method in enumerate(methods):
-                        key = method.get("key")
-                        value = method.get("value")
-                        params = method.get("params", {})
-
-                        if isinstance(params, dict) and params:
-                            blob = _params_to_blob(params)
-                            line = f'"{key}", "{value}", "{blob}"'
-                        else:
-                            line = f'"{key}", "{value}"'
-
-                        f.write(line + ("\n/\n" if index == len(methods) - 1 else "\n"))
+                    f.writelines(_entry_lines(field_type, model, field_name, methods))
@@ -1,6 +1,11 @@
 import json
+from json.decoder import scanstring
+import re
 from pathlib import Path
 
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
 
 def read_json(p: Path) -> dict:
     """
@@ -13,9 +18,117 @@ def read_json(p: Path) -> dict:
 def write_json(obj: dict, p: Path) -> None:
     """
     Writes a dict to a json file, preserving formatting.
+
+    If `p` already exists, its original layout is kept and only the values that differ from
+    `obj` are spliced in (see `splice_json`); a file whose content is unchanged is not rewritten.
+    New files are written with `indent=2`.
     """
+    try:
+        original = p.read_text()
+    except FileNotFoundError:
+        original = None
+
+    text = splice_json(original, obj) if original is not None else json.dumps(obj, indent=2) + "\n"
+    if text == original:
+        return
+
     tmp = p.with_suffix(p.suffix + ".tmp")
     with tmp.open("w") as f:
-        json.dump(obj, f, indent=2)
-        f.write("\n")
+        f.write(text)
     tmp.replace(p)
+
+
+def splice_json(original: str, obj) -> str:
+    """
+    Return `original` JSON text updated to hold `obj`, changing as little text as possible.
+
+    Objects with the same keys and arrays with the same length are compared member by member;
+    any other changed value (a scalar, or a container whose keys or length changed) is re-rendered
+    in place, indented like the line it starts on. Text that is not valid JSON is replaced by a
+    full `indent=2` dump.
+    """
+    try:
+        old = json.loads(original)
+        node, _ = _index_json(original, 0)
+    except (ValueError, IndexError):
+        return json.dumps(obj, indent=2) + "\n"
+
+    edits = []
+    _diff_json(node, old, obj, edits)
+    if not edits:
+        return original
+
+    # indent new containers with the unit of the first indented line
+    m = re.search(r"\n([ \t]+)\S", original)
+    indent = m.group(1) if m else 2
+
+    pieces = []
+    pos = 0
+    for start, end, value in edits:
+        line_start = original.rfind("\n", 0, start) + 1
+        prefix = _WHITESPACE.match(original, line_start).group().strip("\r\n")
+        pieces.append(original[pos:start])
+        pieces.append(json.dumps(value, indent=indent).replace("\n", "\n" + prefix))
+        pos = end
+    pieces.append(original[pos:])
+    return "".join(pieces)
+
+
+def _index_json(text: str, pos: int) -> tuple[tuple, int]:
+    """
+    Parse the JSON value at `pos` into `(start, end, children)` spans, returning the node and its end.
+
+    `children` maps keys to member nodes for objects, is a list of nodes for arrays and None for scalars.
+    """
+    pos = _WHITESPACE.match(text, pos).end()
+    start = pos
+    opening = text[pos]
+    if opening not in "{[":
+        _, end = _DECODER.raw_decode(text, pos)
+        return (start, end, None), end
+
+    closing = "}" if opening == "{" else "]"
+    children = {} if opening == "{" else []
+    pos = _WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == closing:
+        return (start, pos + 1, children), pos + 1
+
+    while True:
+        if opening == "{":
+            if text[pos] != '"':
+                raise ValueError(f"Expected a key at position {pos}")
+            key, pos = scanstring(text, pos + 1)
+            pos = _WHITESPACE.match(text, pos).end()
+            if text[pos] != ":":
+                raise ValueError(f"Expected ':' at position {pos}")
+            children[key], pos = _index_json(text, pos + 1)
+        else:
+            child, pos = _index_json(text, pos)
+            children.append(child)
+
+        pos = _WHITESPACE.match(text, pos).end()
+        if text[pos] == ",":
+            pos = _WHITESPACE.match(text, pos + 1).end()
+        elif text[pos] == closing:
+            return (start, pos + 1, children), pos + 1
+        else:
+            raise ValueError(f"Expected ',' or '{closing}' at position {pos}")
+
+
+def _diff_json(node: tuple, old, new, edits: list) -> None:
+    """
+    Append `(start, end, new_value)` for every span of `node` whose value changes from `old` to `new`.
+    """
+    start, end, children = node
+    if isinstance(old, dict) and isinstance(new, dict) and list(old) == list(new):
+        for key, value in new.items():
+            _diff_json(children[key], old[key], value, edits)
+        return
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for child, old_value, value in zip(children, old, new):
+            _diff_json(child, old_value, value, edits)
+        return
+    # type check so that e.g. 1 -> true or 1 -> 1.0 is still written
+    if type(old) is type(new) and old == new:
+        return
+    edits.append((start, end, new))
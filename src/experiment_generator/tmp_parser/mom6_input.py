@@ -1,12 +1,258 @@
+"""
+A temporary parser for MOM_input-style files (MOM_input, MOM_override).
+
+Parameters inside module blocks are scoped by the block name:
+
+    KPP%
+    N_SMOOTH = 2        ! indexed as KPP%N_SMOOTH
+    %KPP
+
+so they never collide with top-level parameters of the same name, and `KPP%N_SMOOTH = 2` written
+inline is the same key. In MOM_override, `#override KEY = value` assigns a key already set in
+MOM_input.
+"""
+
+from dataclasses import dataclass, field
 from pathlib import Path
 import re
 from typing import Any
 
-# allow % inside assignment keys, and in tag lines
-_REG_PATTERN = re.compile(r"^(\s*)([%\w]+)\s*=\s*(.*?)\s*(!.*)?$")
+# allow % inside assignment keys, and in tag lines; MOM_override prefixes overrides with #override
+_REG_PATTERN = re.compile(r"^(\s*)(?:#override\s+)?([%\w]+)\s*=\s*(.*?)\s*(!.*)?$")
 # matches lines like "KPP%", or "MLE%XXX" (with optional indent)
 _REG_TAG = re.compile(r"^\s*%?\w+(?:%\w+)*%?\s*$")
 
+ADDED_HEADER = "! --- Added parameters ---"
+
+# record kinds
+ASSIGNMENT = "assignment"
+COMMENT = "comment"
+TAG = "tag"
+BLANK = "blank"
+OTHER = "other"
+
+
+@dataclass(frozen=True)
+class MomRecord:
+    """
+    One tokenized line of a MOM_input-style file.
+
+    Attributes:
+        kind (str): ASSIGNMENT, COMMENT, TAG, BLANK or OTHER.
+        line (str): Original text of the line.
+        key (str | None): Parameter name of an assignment, as written on the line.
+        value (str): Stripped right-hand side of an assignment.
+        span (tuple[int, int] | None): Position of the right-hand side in `line`.
+    """
+
+    kind: str
+    line: str
+    key: str | None = None
+    value: str = ""
+    span: tuple[int, int] | None = None
+
+
+@dataclass
+class MomSection:
+    """
+    Lines of a module block, e.g. `KPP%` ... `%KPP`.
+
+    Attributes:
+        start (int): Position of the opening tag.
+        end (int | None): Position of the closing tag, None if the block is never closed.
+        indent (str): Indent of the first assignment in the block.
+        keys (list[str]): Scoped keys assigned directly in the block.
+    """
+
+    start: int
+    end: int | None = None
+    indent: str = ""
+    keys: list[str] = field(default_factory=list)
+
+
+def _tokenize(line: str) -> MomRecord:
+    m = _REG_PATTERN.match(line)
+    if m:
+        return MomRecord(ASSIGNMENT, line, key=m.group(2), value=m.group(3).strip(), span=m.span(3))
+    stripped = line.strip()
+    if not stripped:
+        return MomRecord(BLANK, line)
+    if stripped.startswith("!"):
+        return MomRecord(COMMENT, line)
+    if _REG_TAG.match(stripped):
+        return MomRecord(TAG, line)
+    return MomRecord(OTHER, line)
+
+
+class MomInputDocument:
+    """
+    A MOM_input-style file tokenized once into records, with a `scoped key -> record` index.
+
+    Assignments inside module blocks are indexed by scoped keys (`KPP%N_SMOOTH`) and every block
+    by its scope (`KPP`, nested blocks as `KPP%MLE`). Edits are kept as an overlay on the tokenized
+    lines, so each update costs O(1) per key and `clone` gives an independent document (e.g. one
+    per branch) without re-tokenizing. New keys of an existing block are inserted before its
+    closing tag; other new keys are appended at the end of the file, under `added_header`.
+    """
+
+    def __init__(self, lines: list[str], added_header: str | None = ADDED_HEADER) -> None:
+        self.records = [_tokenize(ln) for ln in lines]
+        self.added_header = added_header
+        # scoped key -> positions of its assignments (a key may be assigned more than once)
+        self.index: dict[str, list[int]] = {}
+        # scope -> module block
+        self.sections: dict[str, MomSection] = {}
+        self._params: dict[str, str] = {}
+
+        scope: list[str] = []
+        for i, record in enumerate(self.records):
+            if record.kind == ASSIGNMENT:
+                prefix = "%".join(scope)
+                key = f"{prefix}%{record.key}" if prefix else record.key
+                self.index.setdefault(key, []).append(i)
+                self._params[key] = record.value
+                section = self.sections.get(prefix)
+                if section is not None and section.end is None:
+                    if not section.keys:
+                        section.indent = record.line[: len(record.line) - len(record.line.lstrip())]
+                    section.keys.append(key)
+            elif record.kind == TAG:
+                tag = record.line.strip()
+                if tag.endswith("%") and not tag.startswith("%"):
+                    # opening tag, e.g. KPP% or KPP%MLE%
+                    for name in tag[:-1].split("%"):
+                        scope.append(name)
+                        self.sections.setdefault("%".join(scope), MomSection(start=i))
+                elif tag.startswith("%") and not tag.endswith("%"):
+                    # closing tag, e.g. %KPP
+                    names = tag[1:].split("%")
+                    depth = len(scope) - len(names)
+                    if depth >= 0 and scope[depth:] == names:
+                        for _ in names:
+                            section = self.sections["%".join(scope)]
+                            if section.end is None:
+                                section.end = i
+                            scope.pop()
+
+        # record position -> replacement line, or None if the line is removed
+        self._edits: dict[int, str | None] = {}
+        # removed key -> positions of the comment lines removed with it
+        self._dropped: dict[str, list[int]] = {}
+        # new key -> (position of the closing tag it is inserted before, None for the end of file; line)
+        self._added: dict[str, tuple[int | None, str]] = {}
+
+    @classmethod
+    def read(cls, path: str, added_header: str | None = ADDED_HEADER) -> "MomInputDocument":
+        return cls(Path(path).read_text(encoding="utf-8").splitlines(True), added_header=added_header)
+
+    @property
+    def lines(self) -> list[str]:
+        """
+        Original text, line-preserving.
+        """
+        return [record.line for record in self.records]
+
+    def clone(self) -> "MomInputDocument":
+        """
+        Return an independent copy sharing the (immutable) tokenized records, index and sections.
+        """
+        other = object.__new__(type(self))
+        other.records = self.records
+        other.added_header = self.added_header
+        other.index = self.index
+        other.sections = self.sections
+        other._params = dict(self._params)
+        other._edits = dict(self._edits)
+        other._dropped = {key: list(positions) for key, positions in self._dropped.items()}
+        other._added = dict(self._added)
+        return other
+
+    def params(self) -> dict[str, str]:
+        """
+        Current scoped key -> value text of every parameter.
+        """
+        return dict(self._params)
+
+    def set(self, key: str, value: Any, override: bool = False) -> None:
+        """
+        Set scoped `key` to `value`; only the RHS of existing assignments changes.
+
+        A new key goes into its module block if the block exists, otherwise to the end of the file
+        (scoped keys are then written inline, e.g. `KPP%N_SMOOTH = 2`). `override` prefixes a new
+        line with `#override`, for MOM_override entries of keys set in MOM_input.
+        """
+        text = _format_conversion(value)
+        self._params[key] = text
+        for i in self._dropped.pop(key, ()):
+            self._edits.pop(i, None)
+
+        if key not in self.index:
+            prefix = "#override " if override else ""
+            scope, _, name = key.rpartition("%")
+            section = self.sections.get(scope) if scope else None
+            if section is not None and section.end is not None:
+                self._added[key] = (section.end, f"{section.indent}{prefix}{name} = {text}\n")
+            else:
+                self._added[key] = (None, f"{prefix}{key} = {text}\n")
+            return
+
+        for i in self.index[key]:
+            record = self.records[i]
+            if record.value == text:
+                # If rhs unchanged, keep exact line
+                self._edits.pop(i, None)
+            else:
+                left, right = record.span
+                self._edits[i] = record.line[:left] + text + record.line[right:]
+
+    def remove(self, key: str) -> None:
+        """
+        Remove the assignments of scoped `key`, with any comment lines immediately following them.
+        """
+        self._params.pop(key, None)
+        self._added.pop(key, None)
+        dropped = []
+        for i in self.index.get(key, ()):
+            self._edits[i] = None
+            j = i + 1
+            while j < len(self.records) and self.records[j].kind == COMMENT:
+                self._edits[j] = None
+                dropped.append(j)
+                j += 1
+        if dropped:
+            self._dropped[key] = dropped
+
+    def render(self) -> str:
+        """
+        Return the text of the document, original lines with the edits applied.
+        """
+        inserts: dict[int | None, list[str]] = {}
+        for position, line in self._added.values():
+            inserts.setdefault(position, []).append(line)
+
+        if self._edits or any(position is not None for position in inserts):
+            out = []
+            for i, record in enumerate(self.records):
+                out.extend(inserts.get(i, ()))
+                line = self._edits.get(i, record.line)
+                if line is not None:
+                    out.append(line)
+        else:
+            out = [record.line for record in self.records]
+
+        # append new parameters that never existed in the file
+        appended = inserts.get(None)
+        if appended:
+            if out and not out[-1].endswith("\n"):
+                out[-1] += "\n"
+            if self.added_header is not None:
+                out.append(f"\n{self.added_header}\n")
+            out.extend(appended)
+        return "".join(out)
+
+    def write(self, path: str) -> None:
+        Path(path).write_text(self.render())
+
 
 def read_mom_input(path: str) -> tuple[list[str], dict[str, str]]:
     """
@@ -15,16 +261,10 @@ def read_mom_input(path: str) -> tuple[list[str], dict[str, str]]:
     Returns
     -------
     lines   : list[str]        # original text, line-preserving
-    params  : dict[str, str]   # key→value pairs (keys may contain '%')
+    params  : dict[str, str]   # scoped key→value pairs (e.g. KPP%N_SMOOTH inside a KPP% block)
     """
-    lines = Path(path).read_text(encoding="utf-8").splitlines(True)
-    params: dict[str, str] = {}
-    for ln in lines:
-        m = _REG_PATTERN.match(ln)
-        if m:
-            _, name, rhs, _ = m.groups()
-            params[name] = rhs.strip()
-    return lines, params
+    doc = MomInputDocument.read(path)
+    return doc.lines, doc.params()
 
 
 def _format_conversion(val: Any) -> str:
@@ -43,69 +283,21 @@ def write_mom_input(
     """
     Updating MOM_input lines, preserving original format.
 
+    - Keys are scoped by module block, as returned by `read_mom_input`.
     - Existing keys present in `params` are updated.
       - Only the RHS is changed, comments and spacing are preserved.
       - If the RHS text is identical, the line is unchanged.
     - Existing keys absent from `params` are removed if `remove_missing` is True.
       - The assignment line is removed.
       - Any immediately following comment lines are also removed.
-    - New keys in `params` that were not in the original file are appended at the end.
+    - New keys in `params` that were not in the original file are inserted at the end of their
+      module block, or appended at the end of the file.
     """
-    out: list[str] = []
-    skip_comment_block = False
-    seen_keys: set[str] = set()
-
-    for ln in lines:
-        stripped = ln.strip()
-
-        # skip pure comments after a removed assignment/tag
-        if skip_comment_block and stripped.startswith("!"):
-            continue
-        skip_comment_block = False
-
-        # assignment
-        m = _REG_PATTERN.match(ln)
-        if m:
-            indent, name, rhs, comment = m.groups()
-            seen_keys.add(name)
-
-            # remove keys not in params
-            if remove_missing and name not in params:
-                skip_comment_block = True
-                continue
-
-            # If we don't have an override for this key, keep original line
+    doc = MomInputDocument(lines)
+    if remove_missing:
+        for name in doc.index:
             if name not in params:
-                out.append(ln)
-                continue
-
-            # keep and rewrite
-            new_rhs = _format_conversion(params[name])
-            # If rhs unchanged, keep exact line
-            if rhs.strip() == new_rhs:
-                out.append(ln)
-                continue
-
-            # keep everything except rhs
-            rhs_left, rhs_right = m.span(3)
-            out.append(ln[:rhs_left] + new_rhs + ln[rhs_right:])
-            continue
-
-        # section/tag line
-        if _REG_TAG.match(stripped):
-            out.append(ln)
-            continue
-
-        out.append(ln)
-
-    # append new parameters that never existed in the file
-    to_add = [k for k in params.keys() if k not in seen_keys]
-    if to_add:
-        if out and not out[-1].endswith("\n"):
-            out[-1] += "\n"
-        out.append("\n! --- Added parameters ---\n")
-        for k in to_add:
-            v = _format_conversion(params[k])
-            out.append(f"{k} = {v}\n")
-
-    Path(out_path).write_text("".join(out))
+                doc.remove(name)
+    for name, value in params.items():
+        doc.set(name, value)
+    doc.write(out_path)
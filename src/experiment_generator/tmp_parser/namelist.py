@@ -0,0 +1,352 @@
+"""Line index of Fortran namelist files.
+
+Namelist files are made of groups, each opened by `&group_name` and closed by `/` (or `&end`), holding
+`variable = value` assignments. A value may continue over several lines:
+
+    &mom_oasis3_interface_nml
+        fields_in = 'u_flux', 'v_flux', 'lprec',
+                    'evap'   ! continuation line
+        fields_out = 't_surf', 's_surf'
+    /
+
+`index_namelist` tokenizes the file once and records, for every group and variable, the lines it occupies, so
+callers can patch any number of variables in a single rebuild of the file instead of rescanning it per variable.
+`patch_namelist` uses that index to rewrite, add and delete assignments while every other line, comment and the
+ordering of the file stay byte-identical, and `patch_array` / `patch_array_lines` rewrite single elements of an
+array value in place (`var(3)`, `var(2:4)` updates) without re-emitting the rest of it, even when the array
+continues over several lines.
+Group and variable names are case-insensitive in Fortran and are indexed in lower case.
+"""
+
+from dataclasses import dataclass, field
+import re
+
+# strings are matched first so that "/", "!" and "=" inside them are not taken as tokens
+_TOKEN = re.compile(
+    r"""
+    (?P<string>'(?:[^'\n]|'')*'?|"(?:[^"\n]|"")*"?)
+    |(?P<comment>!.*)
+    |(?P<end>/|[&$](?i:end)\b)
+    |(?P<group>[&$](?P<group_name>\w+))
+    |(?P<var>(?P<var_name>\b[A-Za-z_]\w*(?:\s*%\s*\w+)*)\s*(?P<subscript>\([^)]*\))?\s*=)
+    """,
+    re.VERBOSE,
+)
+_STRUCTURAL = ("end", "group", "var")
+# fast path for the common `name = value  ! comment` line without strings, delimiters or subscripts
+_SIMPLE_ASSIGNMENT = re.compile(
+    r"(?P<indent>[ \t]*)(?P<var_name>[A-Za-z_]\w*)[ \t]*=(?P<value>[^'\"!/&$=(\r\n]*?)"
+    r"(?P<comment>[ \t]*![^\r\n]*)?[ \t]*\r?\n?$"
+)
+# one element of an array value: a quoted string or a bare literal
+_ARRAY_ITEM = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|[^\s,'"]+""")
+
+
+@dataclass
+class NmlEntry:
+    """
+    Lines occupied by one variable assignment.
+
+    Attributes:
+        name (str): Variable name as spelled in the file.
+        start (int): Index of the line holding the assignment.
+        stop (int): One past the last line holding its value (comment-only lines are not included).
+        indent (str): Leading whitespace of the assignment line.
+        value (str): Right-hand side text, continuation lines joined by a space.
+        comment (str): Trailing comment of the last value line, with the whitespace before it.
+        patchable (bool): True if the lines hold nothing but this assignment (no other assignment, group
+            delimiter or subscript), so they can be replaced wholesale.
+        spans (list[tuple[int, int, int]]): `(line, start, stop)` of the raw value text on each line holding it.
+    """
+
+    name: str
+    start: int
+    stop: int
+    indent: str
+    value: str = ""
+    comment: str = ""
+    patchable: bool = True
+    spans: list[tuple[int, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class NmlGroup:
+    """
+    Lines occupied by one namelist group.
+
+    Attributes:
+        name (str): Group name as spelled in the file.
+        start (int): Index of the `&group_name` line.
+        end (int | None): Index of the line closing the group, None if it is never closed.
+        repeated (bool): True if another group of the same name follows (only the first is indexed).
+        entries (dict[str, NmlEntry]): Assignments keyed by lower-case variable name.
+    """
+
+    name: str
+    start: int
+    end: int | None = None
+    repeated: bool = False
+    entries: dict[str, NmlEntry] = field(default_factory=dict)
+
+
+def index_namelist(lines: list[str]) -> dict[str, NmlGroup]:
+    """
+    Tokenize namelist `lines` once and index every group and variable by lower-case name.
+
+    A group that appears more than once is indexed by its first occurrence. A variable that is assigned
+    more than once in a group is kept but marked as not patchable.
+    """
+    groups: dict[str, NmlGroup] = {}
+    group: NmlGroup | None = None
+    entry: NmlEntry | None = None
+
+    for i, line in enumerate(lines):
+        simple = _SIMPLE_ASSIGNMENT.match(line) if group is not None else None
+        if simple is not None:
+            name = simple.group("var_name")
+            entry = NmlEntry(
+                name=name,
+                start=i,
+                stop=i + 1,
+                indent=simple.group("indent"),
+                value=simple.group("value").strip(),
+                comment=simple.group("comment") or "",
+                spans=[(i, *simple.span("value"))],
+            )
+            if name.lower() in group.entries:
+                group.entries[name.lower()].patchable = False
+                entry.patchable = False
+            else:
+                group.entries[name.lower()] = entry
+            continue
+
+        tokens = []
+        code_end = len(line)
+        comment = ""
+        for m in _TOKEN.finditer(line):
+            if m.lastgroup == "comment":
+                code_end = m.start()
+                # keep the whitespace separating the comment from the code
+                comment_start = len(line[:code_end].rstrip())
+                comment = line[comment_start:].rstrip("\r\n")
+                break
+            if m.lastgroup in _STRUCTURAL:
+                tokens.append(m)
+
+        if not tokens:
+            # continuation of the current value (blank and comment-only lines are not)
+            if entry is not None and line[:code_end].strip():
+                entry.stop = i + 1
+                entry.value = f"{entry.value} {line[:code_end].strip()}"
+                entry.comment = comment
+                entry.spans.append((i, 0, code_end))
+            continue
+
+        leading = line[: tokens[0].start()]
+        shared = len(tokens) > 1 or bool(leading.strip())
+        if entry is not None and leading.strip():
+            # the current value continues on a line shared with the next token
+            entry.stop = i + 1
+            entry.patchable = False
+
+        for m in tokens:
+            entry = None
+            kind = m.lastgroup
+            if kind == "group":
+                group = NmlGroup(name=m.group("group_name"), start=i)
+                if group.name.lower() in groups:
+                    groups[group.name.lower()].repeated = True
+                else:
+                    groups[group.name.lower()] = group
+            elif kind == "end":
+                if group is not None:
+                    group.end = i
+                group = None
+            elif group is not None:
+                name = re.sub(r"\s+", "", m.group("var_name"))
+                value_start = m.end()
+                entry = NmlEntry(
+                    name=name,
+                    start=i,
+                    stop=i + 1,
+                    indent=leading if not leading.strip() else "",
+                    value=line[value_start:code_end].strip(),
+                    comment=comment,
+                    patchable=not shared and m.group("subscript") is None,
+                    spans=[(i, value_start, code_end)],
+                )
+                key = name.lower()
+                if key in group.entries:
+                    group.entries[key].patchable = False
+                    entry.patchable = False
+                else:
+                    group.entries[key] = entry
+
+        if shared and entry is not None:
+            entry.patchable = False
+
+    return groups
+
+
+def _closes_alone(line: str) -> bool:
+    """
+    True if `line` holds nothing but a group terminator (and possibly a comment).
+    """
+    return line.split("!", 1)[0].strip().lower() in ("/", "&end", "$end")
+
+
+def patch_namelist(
+    lines: list[str], groups: dict[str, NmlGroup], edits: dict[str, dict[str, str | list[str] | None]]
+) -> list[str] | None:
+    """
+    Apply rendered edits to namelist `lines` without reformatting anything else.
+
+    `edits` maps group name -> variable name -> right-hand side text, or None to delete the variable,
+    or the replacement lines of an existing variable (see `patch_array_lines`), and `groups` is the
+    `index_namelist` index of `lines`.
+      - existing variables are rewritten in place, keeping their indent and trailing comment;
+        a variable whose text is unchanged is left untouched,
+      - new variables are inserted before the line closing their group,
+      - missing groups are appended at the end of the file.
+
+    Returns the patched lines, or None if the layout cannot be patched line by line (a target shares
+    its lines with other tokens, or its group is repeated or not closed on a line of its own); the
+    caller should then fall back to a full namelist parser.
+    """
+    # first line of a replaced entry -> (one past its last line, replacement lines)
+    replace: dict[int, tuple[int, list[str]]] = {}
+    # closing line of a group -> lines inserted before it
+    insert: dict[int, list[str]] = {}
+    new_groups: list[list[str]] = []
+
+    for group_name, variables in edits.items():
+        group = groups.get(group_name.lower())
+        if group is None:
+            block = [f"&{group_name}\n"]
+            block.extend(f"    {var} = {text}\n" for var, text in variables.items() if text is not None)
+            block.append("/\n")
+            new_groups.append(block)
+            continue
+
+        if group.repeated or group.end is None:
+            return None
+
+        indent = next((e.indent for e in group.entries.values() if e.indent), "    ")
+        added = []
+        for var, text in variables.items():
+            entry = group.entries.get(var.lower())
+            if entry is None:
+                if text is not None:
+                    added.append(f"{indent}{var} = {text}\n")
+                continue
+            if not entry.patchable:
+                return None
+            if text is None:
+                replace[entry.start] = (entry.stop, [])
+            elif isinstance(text, list):
+                replace[entry.start] = (entry.stop, text)
+            elif text != entry.value:
+                replace[entry.start] = (entry.stop, [f"{entry.indent}{entry.name} = {text}{entry.comment}\n"])
+
+        if added:
+            if group.end == group.start or not _closes_alone(lines[group.end]):
+                return None
+            insert.setdefault(group.end, []).extend(added)
+
+    out = []
+    i = 0
+    while i < len(lines):
+        out.extend(insert.get(i, ()))
+        if i in replace:
+            i, new = replace[i]
+            out.extend(new)
+            continue
+        out.append(lines[i])
+        i += 1
+
+    for block in new_groups:
+        if out and not out[-1].endswith("\n"):
+            out[-1] += "\n"
+        # groups are separated by a blank line, as f90nml writes them
+        if out and out[-1].strip():
+            out.append("\n")
+        out.extend(block)
+
+    return out
+
+
+def split_array(text: str) -> list[tuple[int, int]] | None:
+    """
+    Return the `(start, stop)` span of every element of the array value `text`.
+
+    Returns None for values whose elements cannot be located one by one: null values (`1, , 3`),
+    repeat counts (`3*0.5`), complex numbers and unterminated strings.
+    """
+    spans = []
+    pos = 0
+    for m in _ARRAY_ITEM.finditer(text):
+        start = m.start()
+        gap = text[pos:start]
+        if gap.strip(", \t\n") or gap.count(",") > (1 if spans else 0):
+            return None
+        item = m.group()
+        if item[0] not in "'\"" and any(c in item for c in "*()"):
+            return None
+        spans.append(m.span())
+        pos = m.end()
+
+    tail = text[pos:]
+    if tail.strip(", \t\n") or tail.count(",") > (1 if spans else 0):
+        return None
+    return spans
+
+
+def patch_array(text: str, items: dict[int, str]) -> str | None:
+    """
+    Replace elements of the array value `text`, leaving every other element and separator untouched.
+
+    `items` maps 1-based element positions to their rendered text. Positions past the end of the array
+    are appended, with null values filling any gap. Returns None if `split_array` cannot locate the
+    elements of `text`.
+    """
+    spans = split_array(text)
+    if spans is None:
+        return None
+
+    out = text
+    for i in sorted((i for i in items if i <= len(spans)), reverse=True):
+        start, stop = spans[i - 1]
+        out = out[:start] + items[i] + out[stop:]
+
+    extra = [items.get(i, "") for i in range(len(spans) + 1, max(items, default=0) + 1)]
+    if extra:
+        head = out.rstrip().rstrip(",").rstrip()
+        out = f"{head}, " + ", ".join(extra) if head else ", ".join(extra)
+    return out
+
+
+def patch_array_lines(lines: list[str], entry: NmlEntry, items: dict[int, str]) -> list[str] | None:
+    """
+    Replace elements of the array assigned by `entry`, returning new lines for `lines[entry.start:entry.stop]`.
+
+    The value is patched with `patch_array` across its continuation lines, so every line keeps its own
+    layout and trailing comment; appended elements go at the end of the last value line. Returns None if
+    the elements cannot be located.
+    """
+    # trailing whitespace stays with the line, so appending cannot glue the value to a comment
+    spans = [(i, start, start + len(lines[i][start:stop].rstrip())) for i, start, stop in entry.spans]
+    # value segments are joined by newlines so each one can be split back onto its own line
+    text = "\n".join(lines[i][start:stop] for i, start, stop in spans)
+    patched = patch_array(text, items)
+    if patched is None:
+        return None
+    segments = patched.split("\n")
+    if len(segments) != len(spans):
+        return None
+
+    first, last = entry.start, entry.stop
+    out = lines[first:last]
+    for (i, start, stop), segment in zip(spans, segments):
+        line = lines[i]
+        out[i - first] = line[:start] + segment + line[stop:]
+    return out
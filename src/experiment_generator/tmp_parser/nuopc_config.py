@@ -68,10 +68,246 @@ The CESM driver then uses tables as defined in Resource Files to store Fortran N
 
 """
 
+from dataclasses import dataclass
 from pathlib import Path
 import re
 
 from .tmp_utils import convert_from_string, convert_to_string
+from ..common_var import _same_value
+
+_COMMENT = re.compile(r"(#).*")
+# one match per line; the named alternative that matched tells the kind of line
+_LINE = re.compile(
+    r"""
+    \s*(?:
+        (?P<blank>(?=\#|$))
+        |(?P<table_end>::)
+        |(?P<table_start>(?P<table_name>\w+)\s*::)
+        |(?P<label_value>(?P<label>\w+)\s*:\s*(?P<values>[^\#\n]+))
+        |(?P<assignment>(?P<name>\w+)\s*=\s*(?P<value>[^\s\#]+))
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+@dataclass
+class NuopcTable:
+    """
+    Lines of a table, e.g. `PELAYOUT_attributes::` ... `::`.
+
+    Attributes:
+        start (int): Position of the line opening the table.
+        end (int | None): Position of the line closing the table, None if it is never closed.
+        indent (str): Indent of the first assignment in the table.
+    """
+
+    start: int
+    end: int | None = None
+    indent: str = "  "
+
+
+class NuopcConfigDocument:
+    """
+    A NUOPC config file parsed once, keeping its lines and a `(table, label) -> line` index.
+
+    Top-level label-value pairs are indexed as `(None, label)`. Edits are kept as an overlay on the
+    original lines: only the value text of changed entries is replaced, so comments, spacing and the
+    formatting of unchanged values are preserved, and `clone` gives an independent document (e.g. one
+    per branch) without parsing the file again.
+
+    A file with a table that is never closed or appears more than once (also as a top-level label) is
+    not `patchable`: `read_nuopc_config` drops such tables, so the file has to be regenerated with
+    `write_nuopc_config` instead.
+    """
+
+    def __init__(self, lines: list[str], file_name: str = "<string>") -> None:
+        self.lines = lines
+        # (table, label) -> positions of its lines; table is None for top-level label-value pairs
+        self.index: dict[tuple[str | None, str], list[int]] = {}
+        # line position -> span of its value text
+        self.spans: dict[int, tuple[int, int]] = {}
+        self.tables: dict[str, NuopcTable] = {}
+        self._config: dict = {}
+
+        table_name = None
+        table = None
+        repeated = False
+        for i, raw in enumerate(lines):
+            match = _LINE.match(raw)
+            kind = match.lastgroup if match else None
+            if kind == "blank":
+                continue
+            if table is not None:
+                if kind == "table_end":
+                    self._config[table_name] = table
+                    self.tables[table_name].end = i
+                    table = None
+                    continue
+                if kind != "assignment":
+                    raise ValueError(
+                        f"Line: {_COMMENT.sub('', raw)} in file {file_name} is not a valid NUOPC configuration "
+                        "specification"
+                    )
+                label = match.group("name")
+                if not table:
+                    self.tables[table_name].indent = raw[: match.start("name")]
+                table[label] = convert_from_string(match.group("value"))
+                self.index.setdefault((table_name, label), []).append(i)
+                self.spans[i] = match.span("value")
+            elif kind == "table_start":
+                table_name = match.group("table_name")
+                table = {}
+                repeated = repeated or table_name in self.tables or (None, table_name) in self.index
+                self.tables[table_name] = NuopcTable(start=i)
+            elif kind == "label_value":
+                label = match.group("label")
+                values = match.group("values")
+                repeated = repeated or label in self.tables
+                self._config[label] = [convert_from_string(string) for string in values.split()]
+                self.index.setdefault((None, label), []).append(i)
+                start = match.start("values")
+                self.spans[i] = (start, start + len(values.rstrip()))
+
+        self.patchable = table is None and not repeated
+        # line position -> replacement line, or None if the line is removed
+        self._edits: dict[int, str | None] = {}
+        # new entries: key -> (position of the line they are inserted before, None for the end; text)
+        self._added: dict[tuple[str | None, str], tuple[int | None, str]] = {}
+
+    @classmethod
+    def read(cls, file_name: str) -> "NuopcConfigDocument":
+        fname = Path(file_name)
+        if not fname.is_file():
+            raise FileNotFoundError(f"File not found: {fname.as_posix()}")
+        with open(fname, "r") as stream:
+            return cls(stream.readlines(), file_name=str(file_name))
+
+    def clone(self) -> "NuopcConfigDocument":
+        """
+        Return an independent copy sharing the parsed lines, index and tables.
+        """
+        other = object.__new__(type(self))
+        other.lines = self.lines
+        other.index = self.index
+        other.spans = self.spans
+        other.tables = self.tables
+        other.patchable = self.patchable
+        other._config = {k: dict(v) if isinstance(v, dict) else v for k, v in self._config.items()}
+        other._edits = dict(self._edits)
+        other._added = dict(self._added)
+        return other
+
+    def config(self) -> dict:
+        """
+        Current contents, as returned by `read_nuopc_config`.
+        """
+        return {k: dict(v) if isinstance(v, dict) else list(v) for k, v in self._config.items()}
+
+    def set(self, key: str, value) -> None:
+        """
+        Set top-level `key` to `value`: a dict for a table, anything else for a label-value pair.
+
+        Only entries whose value changes are rewritten; values are formatted with `convert_to_string`.
+        """
+        old = self._config.get(key)
+        if old is not None and isinstance(old, dict) != isinstance(value, dict):
+            self.remove(key)
+            old = None
+
+        if not isinstance(value, dict):
+            values = value if isinstance(value, list) else [value]
+            if old is not None and _same_value(old, values):
+                return
+            self._config[key] = list(values)
+            self._set_text((None, key), " ".join(map(convert_to_string, values)), f"{key}: {{}}\n", None)
+            return
+
+        table = self._config.get(key)
+        if table is None:
+            table = self._config[key] = {}
+            section = self.tables.get(key)
+            if section is None or section.end is None or self._edits.get(section.start, "") is None:
+                # new table, appended at the end of the file
+                body = "".join(f"  {label} = {convert_to_string(v)}\n" for label, v in value.items())
+                self._added[(key, None)] = (None, f"{key}::\n{body}::\n")
+                table.update(value)
+                return
+
+        for label in [label for label in table if label not in value]:
+            del table[label]
+            self._drop((key, label))
+        section = self.tables[key]
+        for label, v in value.items():
+            if label in table and _same_value(table[label], v):
+                continue
+            table[label] = v
+            self._set_text((key, label), convert_to_string(v), f"{section.indent}{label} = {{}}\n", section.end)
+
+    def remove(self, key: str) -> None:
+        """
+        Remove top-level `key`: a whole table, or a label-value pair.
+        """
+        old = self._config.pop(key, None)
+        if self._added.pop((key, None), None) is not None:
+            return
+        if isinstance(old, dict):
+            section = self.tables[key]
+            for i in range(section.start, section.end + 1):
+                self._edits[i] = None
+            # the blank line separating it from the next block
+            after = section.end + 1
+            if after < len(self.lines) and not self.lines[after].strip():
+                self._edits[after] = None
+            for label in old:
+                self._added.pop((key, label), None)
+        elif old is not None:
+            self._drop((None, key))
+
+    def _set_text(self, entry: tuple[str | None, str], text: str, template: str, insert_at: int | None) -> None:
+        positions = self.index.get(entry)
+        if not positions or all(self._edits.get(i, "") is None for i in positions):
+            self._added[entry] = (insert_at, template.format(text))
+            return
+        for i in positions:
+            start, end = self.spans[i]
+            line = self.lines[i]
+            self._edits[i] = line[:start] + text + line[end:]
+
+    def _drop(self, entry: tuple[str | None, str]) -> None:
+        self._added.pop(entry, None)
+        for i in self.index.get(entry, ()):
+            self._edits[i] = None
+
+    def render(self) -> str:
+        """
+        Return the text of the document, original lines with the edits applied.
+        """
+        inserts: dict[int | None, list[str]] = {}
+        for position, text in self._added.values():
+            inserts.setdefault(position, []).append(text)
+
+        out = []
+        for i, line in enumerate(self.lines):
+            out.extend(inserts.get(i, ()))
+            line = self._edits.get(i, line)
+            if line is not None:
+                out.append(line)
+
+        appended = inserts.get(None)
+        if appended:
+            if out and not out[-1].endswith("\n"):
+                out[-1] += "\n"
+            for text in appended:
+                # tables are separated by a blank line
+                if text.endswith("::\n") and out and out[-1].strip():
+                    out.append("\n")
+                out.append(text)
+        return "".join(out)
+
+    def write(self, file: Path) -> None:
+        with open(file, "w") as stream:
+            stream.write(self.render())
 
 
 def read_nuopc_config(file_name: str) -> dict:
@@ -83,47 +319,7 @@ def read_nuopc_config(file_name: str) -> dict:
     Returns:
         dict: Contents of file.
     """
-    fname = Path(file_name)
-    if not fname.is_file():
-        raise FileNotFoundError(f"File not found: {fname.as_posix()}")
-
-    label_value_pattern = re.compile(r"\s*(\w+)\s*:\s*(.+)\s*")
-    table_start_pattern = re.compile(r"\s*(\w+)\s*::\s*")
-    table_end_pattern = re.compile(r"\s*::\s*")
-    assignment_pattern = re.compile(r"\s*(\w+)\s*=\s*(\S+)\s*")
-
-    config = {}
-    with open(fname, "r") as stream:
-        reading_table = False
-        label = None
-        table = None
-        for line in stream:
-            line = re.sub(r"(#).*", "", line)
-            if line.strip():
-                if reading_table:
-                    if re.match(table_end_pattern, line):
-                        config[label] = table
-                        reading_table = False
-                    else:
-                        match = re.match(assignment_pattern, line)
-                        if match:
-                            table[match.group(1)] = convert_from_string(match.group(2))
-                        else:
-                            raise ValueError(
-                                f"Line: {line} in file {file_name} is not a valid NUOPC configuration specification"
-                            )
-
-                elif re.match(table_start_pattern, line):
-                    reading_table = True
-                    match = re.match(label_value_pattern, line)
-                    label = match.group(1)
-                    table = {}
-
-                elif re.match(label_value_pattern, line):
-                    match = re.match(label_value_pattern, line)
-                    config[match.group(1)] = [convert_from_string(string) for string in match.group(2).split()]
-
-    return config
+    return NuopcConfigDocument.read(file_name).config()
 
 
 def write_nuopc_config(config: dict, file: Path):
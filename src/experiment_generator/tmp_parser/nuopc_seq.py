@@ -1,4 +1,310 @@
+"""Utilities to handle NUOPC run sequence files (`nuopc.runseq`).
+
+The run sequence is a `runSeq::` block of time loops and component / connector calls:
+
+    runSeq::
+    @3600                                   # time loop with a 3600 s time step
+      MED med_phases_prep_ocn_avg           # component phase
+      MED -> OCN :remapMethod=redist        # connector, with options
+      OCN                                   # component
+      @1800                                 # nested time loop
+        MED med_phases_aofluxes_run
+        ATM
+      @
+    @
+    ::
+
+`RunSequence` parses the block once into a tree of `RunSeqLoop` and `RunSeqItem` nodes. The tree
+can be edited (loop time steps, phases inserted or removed, connector remap methods) and rendered
+back: unchanged lines keep their original text, new or edited ones are indented like their siblings.
+"""
+
+import copy
+from dataclasses import dataclass, field
 from pathlib import Path
+import re
+
+_CONNECTOR = re.compile(r"(\w+)\s*->\s*(\w+)\s*(.*)")
+_INDENT_UNIT = "  "
+
+
+@dataclass
+class RunSeqItem:
+    """
+    One line of the run sequence: a component or connector call, a comment or a blank line.
+
+    Attributes:
+        text (str): Stripped text of the line, without its trailing comment.
+        indent (str): Leading whitespace of the line.
+        comment (str): Trailing comment, with the whitespace before it.
+        line (str | None): Original line, None for new or edited items.
+    """
+
+    text: str
+    indent: str = ""
+    comment: str = ""
+    line: str | None = None
+
+    @property
+    def is_call(self) -> bool:
+        return bool(self.text) and not self.text.startswith(("#", "@"))
+
+    @property
+    def connector(self) -> tuple[str, str, str] | None:
+        """
+        `(source, destination, options)` of a connector call, None for any other item.
+        """
+        m = _CONNECTOR.fullmatch(self.text) if self.is_call else None
+        return m.groups() if m else None
+
+    def render(self) -> str:
+        return self.line if self.line is not None else f"{self.indent}{self.text}{self.comment}\n"
+
+
+@dataclass
+class RunSeqLoop:
+    """
+    A time loop, `@<dt>` ... `@`.
+
+    Attributes:
+        dt (str): Time step text following `@`.
+        indent (str): Leading whitespace of the opening line.
+        comment (str): Trailing comment of the opening line, with the whitespace before it.
+        children (list[RunSeqItem | RunSeqLoop]): Loop body.
+        line (str | None): Original opening line, None for new or edited loops.
+        end_line (str | None): Original closing line, None if the loop is new or never closed.
+    """
+
+    dt: str
+    indent: str = ""
+    comment: str = ""
+    children: list = field(default_factory=list)
+    line: str | None = None
+    end_line: str | None = None
+
+    def render(self) -> str:
+        head = self.line if self.line is not None else f"{self.indent}@{self.dt}{self.comment}\n"
+        body = "".join(child.render() for child in self.children)
+        return head + body + (self.end_line if self.end_line is not None else f"{self.indent}@\n")
+
+
+def _normalise_call(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def _same_dt(a, b) -> bool:
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return str(a).strip() == str(b).strip()
+
+
+def _parse_body(lines: list[str], reindent: bool = False) -> list:
+    """
+    Parse the lines of a runSeq block into a list of top-level nodes.
+
+    Loops still open at the end of the block are closed implicitly. With `reindent`, the original
+    layout is dropped and every node is indented by its depth.
+    """
+    root: list = []
+    stack: list[RunSeqLoop] = []
+    for line in lines:
+        content = line.rstrip("\r\n")
+        code = content.split("#", 1)[0].rstrip()
+        # comment-only lines are kept whole as items
+        text = code.strip() or content.strip()
+        code_end = len(code)
+        comment = content[code_end:] if code.strip() else ""
+        if reindent and not text:
+            continue
+        siblings = stack[-1].children if stack else root
+        indent = line[: len(line) - len(line.lstrip(" \t"))]
+        original = None if reindent else line
+
+        if text.startswith("@") and text != "@":
+            if reindent:
+                indent = _INDENT_UNIT * len(stack)
+            loop = RunSeqLoop(dt=text[1:].strip(), indent=indent, comment=comment, line=original)
+            siblings.append(loop)
+            stack.append(loop)
+        elif text == "@" and stack:
+            stack.pop().end_line = original
+        else:
+            if reindent:
+                indent = _INDENT_UNIT * max(len(stack), 1)
+            siblings.append(RunSeqItem(text=text, indent=indent, comment=comment, line=original))
+    return root
+
+
+class RunSequence:
+    """
+    A `nuopc.runseq` file parsed once into a tree of time loops and calls.
+
+    The lines before `runSeq::` and from the closing `::` on are kept verbatim. `clone` gives an
+    independent copy of the tree, e.g. one per branch, without parsing the file again.
+    """
+
+    def __init__(self, lines: list[str]) -> None:
+        start = next((i for i, line in enumerate(lines) if line.strip().startswith("runSeq::")), None)
+        if start is None:
+            self.head: list[str] = list(lines)
+            self.body: list = []
+            self.tail: list[str] = []
+            self.found = False
+            return
+        end = next((i for i in range(start + 1, len(lines)) if lines[i].strip() == "::"), len(lines))
+        body_start = start + 1
+        self.head = lines[:body_start]
+        self.body = _parse_body(lines[body_start:end])
+        self.tail = lines[end:]
+        self.found = True
+
+    @classmethod
+    def read(cls, path: Path) -> "RunSequence":
+        with open(path, "r") as f:
+            return cls(f.readlines())
+
+    def clone(self) -> "RunSequence":
+        other = object.__new__(type(self))
+        other.head = self.head
+        other.tail = self.tail
+        other.found = self.found
+        other.body = copy.deepcopy(self.body)
+        return other
+
+    def _walk(self, nodes: list | None = None):
+        """
+        Yield `(siblings, position, node)` for every node of the tree, in file order.
+        """
+        nodes = self.body if nodes is None else nodes
+        for i, node in enumerate(nodes):
+            yield nodes, i, node
+            if isinstance(node, RunSeqLoop):
+                yield from self._walk(node.children)
+
+    def loops(self) -> list[RunSeqLoop]:
+        return [node for _, _, node in self._walk() if isinstance(node, RunSeqLoop)]
+
+    def calls(self) -> list[str]:
+        """
+        Component and connector calls, in file order.
+        """
+        return [node.text for _, _, node in self._walk() if isinstance(node, RunSeqItem) and node.is_call]
+
+    def _find(self, call: str) -> list[tuple[list, int, RunSeqItem]]:
+        """
+        Items matching `call`. A connector given without options (`MED -> OCN`) matches whatever its options.
+        """
+        wanted = _normalise_call(call)
+        pair = _CONNECTOR.fullmatch(wanted)
+        found = []
+        for siblings, i, node in self._walk():
+            if not isinstance(node, RunSeqItem) or not node.is_call:
+                continue
+            connector = node.connector
+            if _normalise_call(node.text) == wanted or (
+                pair and not pair.group(3) and connector and connector[:2] == pair.group(1, 2)
+            ):
+                found.append((siblings, i, node))
+        return found
+
+    def set_block(self, text: str) -> None:
+        """
+        Replace the whole run sequence with the `runSeq::` block body `text`.
+        """
+        if not self.found:
+            if self.head and not self.head[-1].endswith("\n"):
+                self.head = self.head[:-1] + [self.head[-1] + "\n"]
+            self.head = self.head + ["runSeq::\n"]
+            self.tail = ["::\n"]
+            self.found = True
+        self.body = _parse_body(text.splitlines(True), reindent=True)
+
+    def set_cpl_dt(self, dt) -> str:
+        """
+        Set the time step of the first time loop with a numeric time step and return its old value.
+        """
+        for loop in self.loops():
+            if loop.dt.isdigit():
+                old = loop.dt
+                self._set_dt(loop, dt)
+                return old
+        raise ValueError("Could not find a line beginning with '@<number>'in nuopc.runseq file")
+
+    def set_loop_dt(self, old, new) -> int:
+        """
+        Set the time step of every loop stepping by `old` to `new`; returns the number of loops changed.
+        """
+        loops = [loop for loop in self.loops() if _same_dt(loop.dt, old)]
+        if not loops:
+            raise ValueError(f"No time loop '@{old}' in nuopc.runseq file")
+        for loop in loops:
+            self._set_dt(loop, new)
+        return len(loops)
+
+    @staticmethod
+    def _set_dt(loop: RunSeqLoop, dt) -> None:
+        if loop.dt != str(dt):
+            loop.dt = str(dt)
+            loop.line = None
+
+    def remove(self, call: str) -> int:
+        """
+        Remove every occurrence of `call`; returns the number of lines removed.
+        """
+        found = self._find(call)
+        if not found:
+            raise ValueError(f"No call '{call}' in nuopc.runseq file")
+        for siblings, i, _ in reversed(found):
+            del siblings[i]
+        return len(found)
+
+    def insert(self, anchor: str, calls: list[str], after: bool = True) -> None:
+        """
+        Insert `calls` after (or before) the single occurrence of `anchor`, indented like it.
+        """
+        found = self._find(anchor)
+        if len(found) != 1:
+            problem = "No call" if not found else "More than one call"
+            raise ValueError(f"{problem} '{anchor}' in nuopc.runseq file, cannot insert {calls}")
+        siblings, i, node = found[0]
+        new = [RunSeqItem(text=_normalise_call(call), indent=node.indent) for call in calls]
+        position = i + 1 if after else i
+        siblings[position:position] = new
+
+    def set_remap(self, connector: str, method: str) -> int:
+        """
+        Set the `remapMethod` option of every `SRC -> DST` connector; returns the number of connectors changed.
+        """
+        m = _CONNECTOR.fullmatch(_normalise_call(connector))
+        if m is None or m.group(3):
+            raise ValueError(f"Invalid connector '{connector}', expected 'SRC -> DST'")
+        found = [node for _, _, node in self._find(connector)]
+        if not found:
+            raise ValueError(f"No connector '{connector}' in nuopc.runseq file")
+        changed = 0
+        for node in found:
+            source, destination, options = node.connector
+            pieces = [p.strip() for p in options.split(":") if p.strip()]
+            names = [p.split("=", 1)[0].strip() for p in pieces]
+            if "remapMethod" in names:
+                i = names.index("remapMethod")
+                if pieces[i].split("=", 1)[-1].strip() == str(method):
+                    continue
+                pieces[i] = f"remapMethod={method}"
+            else:
+                pieces.append(f"remapMethod={method}")
+            node.text = f"{source} -> {destination} :" + ":".join(pieces)
+            node.line = None
+            changed += 1
+        return changed
+
+    def render(self) -> str:
+        return "".join(self.head) + "".join(node.render() for node in self.body) + "".join(self.tail)
+
+    def write(self, path: Path) -> None:
+        with open(path, "w") as f:
+            f.write(self.render())
 
 
 def read_runseq(filepath: Path) -> list[str]:
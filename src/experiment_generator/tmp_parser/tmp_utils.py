@@ -1,3 +1,18 @@
+import re
+
+# one match classifies the common integer, real and Fortran double precision literals
+_LITERAL = re.compile(
+    r"""
+    (?P<integer>[+-]?\d+\Z)
+    |(?P<real>[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\Z)
+    |(?P<double>[+-]?(?:\d+\.?\d*|\.\d+)D[+-]?\d+\Z)
+    """,
+    re.VERBOSE,
+)
+# other strings int() or float() may still accept: digit separators, surrounding whitespace, nan and inf
+_UNUSUAL_NUMBER = re.compile(r"[\s_]|nan|inf", re.IGNORECASE)
+
+
 def convert_from_string(value: str):
     """Tries to convert a string to the most appropriate type. Leaves it unchanged if conversion does not succeed.
 
@@ -5,11 +20,21 @@ def convert_from_string(value: str):
     delimiter.
     """
     # Start by trying to convert from a Fortran logical to a Python bool
-    if value.lower() == ".true.":
+    lower = value.lower()
+    if lower == ".true.":
         return True
-    elif value.lower() == ".false.":
+    elif lower == ".false.":
         return False
-    # Next try to convert to integer or float
+    # Next classify the usual integer and float literals
+    match = _LITERAL.match(value)
+    if match:
+        kind = match.lastgroup
+        if kind == "integer":
+            return int(value)
+        return float(value) if kind == "real" else float(value.replace("D", "e"))
+    if not _UNUSUAL_NUMBER.search(value):
+        return value
+    # Then let Python's parsers handle the unusual forms
     for conversion in [
         lambda: int(value),
         lambda: float(value),
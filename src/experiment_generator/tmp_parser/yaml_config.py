@@ -1,29 +1,155 @@
 """
 A temporary parser for YAML format files.
 - `read_yaml`: Load a YAML file into a Python dictionary with preserved quotes.
+- `read_plan`: Load an experiment plan into plain dictionaries and lists, with a faster loader.
 - `write_yaml`: Dump a Python dictionary back to a YAML file, maintaining format.
 """
 
-import io
-import re
 import ruamel.yaml
+from ruamel.yaml.constructor import RoundTripConstructor, SafeConstructor
+from ruamel.yaml.nodes import ScalarNode, SequenceNode
+from ruamel.yaml.resolver import VersionedResolver
+from ruamel.yaml.scalarstring import (
+    DoubleQuotedScalarString,
+    FoldedScalarString,
+    LiteralScalarString,
+    SingleQuotedScalarString,
+)
+from ruamel.yaml.serializer import Serializer
+from ruamel.yaml.tokens import CommentToken
+
+
+def _on_key_line(node) -> bool:
+    """
+    Whether `node`, as a mapping value, is written on the line of its key.
+    """
+    if isinstance(node, ScalarNode):
+        return node.style not in ("|", ">") and "\n" not in node.value
+    return bool(node.flow_style) or not node.value
+
+
+def _drop_blank_lines_between_keys(root) -> None:
+    """
+    Drop the blank lines between sibling keys of block mappings, e.g.
+
+      key1: ...
+      <blank line(s)>
+      key2: ...
+
+    Blank lines followed by a comment, or ending a nested block, are kept. Only the nodes are
+    changed, not the comments of the dumped data.
+    """
+    seen = set()
+    stack = [(root, False)]
+    while stack:
+        node, in_sequence = stack.pop()
+        if isinstance(node, ScalarNode) or id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, SequenceNode):
+            stack.extend((item, not node.flow_style) for item in node.value)
+            continue
+        pairs = node.value
+        stack.extend((value, False) for _, value in pairs)
+        if node.flow_style:
+            continue
+        # the first key of a block sequence item shares its line with the "- " indicator
+        for i in range(1 if in_sequence else 0, len(pairs) - 1):
+            key, value = pairs[i]
+            next_key = pairs[i + 1][0]
+            # blank lines are kept on the end-of-line comment of the value, or before the next key
+            # (e.g. after a flow collection)
+            token = value.comment[0] if value.comment else None
+            before = next_key.comment[1] if next_key.comment and len(next_key.comment) > 1 else None
+            if token is None and not before:
+                continue
+            if not isinstance(key, ScalarNode) or not isinstance(next_key, ScalarNode) or not _on_key_line(value):
+                continue
+            if key.value.startswith(("-", "#")) or next_key.value.startswith(("-", "#")):
+                continue
+            eol, blank = "", ""
+            if isinstance(token, CommentToken):
+                eol, _, blank = token.value.partition("\n")
+            blank += "".join(t.value for t in before or [])
+            if not blank or blank.strip():
+                continue
+            if isinstance(token, CommentToken):
+                value.comment = [
+                    CommentToken(eol + "\n", start_mark=token.start_mark, end_mark=token.end_mark),
+                    *value.comment[1:],
+                ]
+            if before:
+                next_key.comment = [next_key.comment[0], None, *next_key.comment[2:]]
+
+
+class _Serializer(Serializer):
+    def serialize(self, node) -> None:
+        _drop_blank_lines_between_keys(node)
+        super().serialize(node)
+
 
 ryaml = ruamel.yaml.YAML()
 ryaml.indent(mapping=2, sequence=4, offset=2)
 ryaml.preserve_quotes = True
 ryaml.width = 10**9  # disable line wrapping for long lines
+ryaml.Serializer = _Serializer
 
-# remove blank lines between keys:
-#   key1: ...
-#
-#   key2: ...
-# ref: https://www.regextester.com/pregsyntax.html
-_BLANK_BETWEEN_KEYS = re.compile(
-    r"(?m)"  # multi-line mode and don't stop the regex on a line break
-    r"^(?P<i>[ \t]*)(?P<k>[^ \t#\-\n][^:\n]*:.*)\n"  # a key line
-    r"(?:[ \t]*\n)+"  # one+ blank lines
-    r"(?=(?P=i)[^ \t#\-\n][^:\n]*:)"  # next line is a key at same indent
-)
+# scalar style -> string type that is dumped with the same style
+_SCALAR_STYLES = {
+    "'": SingleQuotedScalarString,
+    '"': DoubleQuotedScalarString,
+    "|": LiteralScalarString,
+    ">": FoldedScalarString,
+}
+
+
+class _PlanConstructor(SafeConstructor):
+    """
+    Builds plain dicts and lists, without the comments and positions kept by round-trip loading.
+
+    What a plan value needs to be dumped the same way into the files it updates is kept: quoted
+    and block strings, and the formatting of numbers (e.g. `1.0e-3`, `0x1F`).
+    """
+
+    construct_yaml_int = RoundTripConstructor.construct_yaml_int
+    construct_yaml_float = RoundTripConstructor.construct_yaml_float
+    construct_yaml_timestamp = RoundTripConstructor.construct_yaml_timestamp
+
+    def construct_scalar(self, node):
+        value = super().construct_scalar(node)
+        if isinstance(value, str) and node.style in _SCALAR_STYLES:
+            return _SCALAR_STYLES[node.style](value)
+        return value
+
+
+for _tag in ("int", "float", "timestamp", "str"):
+    _PlanConstructor.add_default_constructor(_tag)
+
+plan_yaml = ruamel.yaml.YAML(typ="safe")
+plan_yaml.Constructor = _PlanConstructor
+
+try:
+    # ruamel.yaml.clibz, or the older ruamel.yaml.clib; YAML(typ="safe") only picks up the latter
+    from ruamel.yaml.cyaml import CParser
+except ImportError:
+    CParser = None
+
+if CParser is not None:
+
+    class _CPlanLoader(CParser, _PlanConstructor, VersionedResolver):
+        """
+        `plan_yaml` with the libyaml parser: the same constructor and YAML 1.2 resolver.
+        """
+
+        def __init__(self, stream) -> None:
+            CParser.__init__(self, stream)
+            self._parser = self._composer = self
+            _PlanConstructor.__init__(self, loader=self)
+            self.allow_duplicate_keys = plan_yaml.allow_duplicate_keys
+            VersionedResolver.__init__(self, loadumper=self)
+
+else:
+    _CPlanLoader = None
 
 
 def read_yaml(yaml_path: str) -> dict:
@@ -34,14 +160,28 @@ def read_yaml(yaml_path: str) -> dict:
         return ryaml.load(f)
 
 
+def read_plan(yaml_path: str) -> dict:
+    """
+    Reads an experiment plan, which is never written back, into plain dictionaries and lists.
+
+    Much faster and lighter than `read_yaml` on large plans, as comments and positions are not kept.
+    The libyaml parser is used when ruamel.yaml.clibz (or ruamel.yaml.clib) is installed.
+    """
+    with open(yaml_path, "r", encoding="utf-8") as f:
+        if _CPlanLoader is None:
+            return plan_yaml.load(f)
+        loader = _CPlanLoader(f)
+        try:
+            return loader.get_single_data()
+        finally:
+            loader.dispose()
+
+
 def write_yaml(data: dict, yaml_path: str) -> None:
     """
     Writes a dictionary to a YAML file while preserving formatting.
+
+    Blank lines between sibling keys are dropped (see `_drop_blank_lines_between_keys`).
     """
-    buffer = io.StringIO()
-    ryaml.dump(data, buffer)
-    txt = buffer.getvalue()
-    # collapse only blank lines between sibling mapping entries (all levels)
-    txt = _BLANK_BETWEEN_KEYS.sub(r"\g<i>\g<k>\n", txt)
     with open(yaml_path, "w", encoding="utf-8") as f:
-        f.write(txt)
+        ryaml.dump(data, f)
@@ -3,6 +3,12 @@ Utility module
 
 This module provides helper functions
  - `update_config_entries`: Recursively apply updates or removals to nested dictionaries.
+ - `compile_patch` / `apply_patch`: Compile a change tree once into a flat list of path operations
+   and replay it against any number of documents.
+ - `ChangeSet`: The paths added, modified and removed by an update, returned by both of the above.
+ - `normalise_markers`: Resolve the markers of one branch's parameters once, into sentinels.
+ - Keyed list merges: a change mapping holding `MATCH_BY: <field>` updates a list of mappings
+   by the value of `<field>` instead of by position.
  - Support for two special markers:
     - "REMOVE": delete a key or element (or set to ``None`` if ``pop_key=False``).
         #TODO: pop_key=False should be removed?
@@ -10,8 +16,9 @@ This module provides helper functions
 """
 
 from collections.abc import Mapping, Sequence
-from .common_var import _is_removed_str, _is_preserved_str, _is_seq
-from copy import deepcopy
+from .common_var import MATCH_BY, Marker, _as_marker, _is_removed_str, _is_preserved_str, _is_seq, _same_value
+from copy import copy
+from dataclasses import dataclass, field
 
 
 def _path_join(path: str, key: str) -> str:
@@ -29,6 +36,28 @@ def _remove_state_key(path: str, index: int) -> str:
     return f"{path}::REMOVE[{index}]"
 
 
+def _run_walker(walker):
+    """
+    Drive a generator-based walker with an explicit stack instead of recursion.
+
+    A walker `yield`s the sub-walker for each nested call and receives its return
+    value back, so arbitrarily deep trees never hit Python's recursion limit while
+    the evaluation order stays exactly that of the recursive formulation.
+    """
+    stack = [walker]
+    value = None
+    while stack:
+        try:
+            sub = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+        else:
+            stack.append(sub)
+            value = None
+    return value
+
+
 def _strip_preserved(x):
     """
     Remove any value marked as `PRESERVE` from an update tree.
@@ -38,24 +67,13 @@ def _strip_preserved(x):
       - Mapping -> recursively strip; if nothing left, should_apply=False
       - Sequence:
           - ["PRESERVE"] -> keep whole list as-is (should_apply=False)
+
+    Nested mappings are walked with an explicit stack.
     """
     # scalar "PRESERVE"
     if _is_preserved_str(x):
         return False, None
 
-    # mapping
-    if isinstance(x, Mapping):
-        out = type(x)()
-        applied_any = False
-        for k, v in x.items():
-            apply_child, v2 = _strip_preserved(v)
-            if apply_child:
-                out[k] = v2
-                applied_any = True
-        if not applied_any:
-            return False, None
-        return True, out
-
     # sequence (non-str)
     if _is_seq(x):
         # whole-list "PRESERVE" (explicitly keep the entire list as-is)
@@ -65,7 +83,32 @@ def _strip_preserved(x):
         return True, x
 
     # everything else: apply as-is
-    return True, x
+    if not isinstance(x, Mapping):
+        return True, x
+
+    # mapping: each frame is (remaining items, stripped output, parent output, key in parent)
+    root = type(x)()
+    stack = [(iter(x.items()), root, None, None)]
+    while stack:
+        items, out, parent, key = stack[-1]
+        for k, v in items:
+            if _is_preserved_str(v):
+                continue
+            if isinstance(v, Mapping):
+                stack.append((iter(v.items()), type(v)(), out, k))
+                break
+            if _is_seq(v) and len(v) == 1 and _is_preserved_str(v[0]):
+                continue
+            out[k] = v
+        else:
+            stack.pop()
+            # a mapping with nothing left is not applied
+            if parent is not None and out:
+                parent[key] = out
+
+    if not root:
+        return False, None
+    return True, root
 
 
 def _clean_removes(x, *, pop_key: bool) -> object:
@@ -77,38 +120,180 @@ def _clean_removes(x, *, pop_key: bool) -> object:
       clean to an empty mapping are dropped; sequence type is preserved (list).
     - Scalars (including None) pass through unchanged.
     - TODO: pop_key=False? Still need this behaviour? CAN BE DELETED?
+
+    Nested containers are walked with an explicit stack.
     """
-    # Mapping: clean keys/values and drop or null per pop_key
-    if isinstance(x, Mapping):
-        out = type(x)()
-        for k, v in x.items():
+    if not (isinstance(x, Mapping) or _is_seq(x)):
+        # Scalars (including None) pass through unchanged
+        return str(x) if type(x) is Marker else x
+
+    def _frame(node, parent, key):
+        if isinstance(node, Mapping):
+            # normalised plan mappings are written into documents as plain dicts
+            out = {} if isinstance(node, NormalisedParams) else type(node)()
+            return (node, iter(node.items()), out, parent, key)
+        return (node, iter(enumerate(node)), [], parent, key)
+
+    # each frame is (source, remaining items, cleaned output, parent frame, key in parent)
+    root = _frame(x, None, None)
+    stack = [root]
+    result = None
+    while stack:
+        node, items, out, parent, key = frame = stack[-1]
+        is_mapping = isinstance(node, Mapping)
+        for k, v in items:
             if _is_removed_str(v):
-                if pop_key:
-                    # drop this key entirely
-                    continue
-                else:
-                    # keep key, set to None
+                # Mapping: drop this key entirely or keep key set to None
+                # Sequence: drop literal "REMOVE" elements
+                if is_mapping and not pop_key:
                     out[k] = None
+                continue
+            if isinstance(v, Mapping) or _is_seq(v):
+                stack.append(_frame(v, frame, k))
+                break
+            if type(v) is Marker:
+                # sentinels never leave the merge engine
+                v = str(v)
+            if is_mapping:
+                out[k] = v
             else:
-                out[k] = _clean_removes(v, pop_key=pop_key)
-        return out
+                out.append(v)
+        else:
+            stack.pop()
+            cleaned = out if is_mapping else type(node)(out)
+            if parent is None:
+                result = cleaned
+            elif isinstance(parent[0], Mapping):
+                parent[2][key] = cleaned
+            # if an element becomes an empty mapping, drop it (special-case tidy)
+            elif not (isinstance(cleaned, Mapping) and not cleaned):
+                parent[2].append(cleaned)
 
-    # Sequence (but not str): clean each item; drop "REMOVE" and items that become {}
-    if _is_seq(x):
-        out_seq = []
-        for item in x:
-            # drop literal "REMOVE" elements
-            if _is_removed_str(item):
+    return result
+
+
+class NormalisedParams(dict):
+    """
+    A parameter mapping whose markers were resolved by `normalise_markers`.
+
+    `compile_patch` applies it without stripping PRESERVE again.
+    """
+
+
+def normalise_markers(params):
+    """
+    Resolve the REMOVE / PRESERVE markers of one branch's parameters in a single pass.
+
+    - PRESERVE is stripped exactly as `_strip_preserved` does; if nothing is left the
+      result is an empty mapping.
+    - Every remaining marker string, including positional markers inside lists, is
+      replaced by its `Marker` sentinel so later checks are identity compares.
+    - Stripped mappings are returned as `NormalisedParams`. Mappings inside lists are
+      not stripped, because the positional merge interprets their markers per slot.
+
+    Already normalised input is returned as-is. The tree is walked with an explicit
+    stack and is not modified.
+    """
+    if isinstance(params, NormalisedParams):
+        return params
+    if not isinstance(params, Mapping):
+        should_apply, params = _strip_preserved(params)
+        return _as_marker(params) if should_apply else NormalisedParams()
+
+    def _frame(node, strip, parent, key):
+        if isinstance(node, Mapping):
+            out = NormalisedParams() if strip else type(node)()
+            return (iter(node.items()), out, strip, parent, key, None)
+        return (iter(enumerate(node)), [], False, parent, key, type(node))
+
+    # each frame is (remaining items, output, strip PRESERVE, parent output, key in parent, sequence type)
+    root = _frame(params, True, None, None)
+    stack = [root]
+    while stack:
+        items, out, strip, parent, key, seq_type = stack[-1]
+        for k, v in items:
+            if strip and (_is_preserved_str(v) or (_is_seq(v) and len(v) == 1 and _is_preserved_str(v[0]))):
                 continue
-            item_clean = _clean_removes(item, pop_key=pop_key)
-            # if an element becomes an empty mapping, drop it (special-case tidy)
-            if isinstance(item_clean, Mapping) and not item_clean:
+            if isinstance(v, Mapping) or _is_seq(v):
+                stack.append(_frame(v, strip and isinstance(v, Mapping), out, k))
+                break
+            if seq_type is None:
+                out[k] = _as_marker(v)
+            else:
+                out.append(_as_marker(v))
+        else:
+            stack.pop()
+            if parent is None:
+                continue
+            if seq_type is not None:
+                out = seq_type(out)
+            elif strip and not out:
+                # a mapping with nothing left is not applied
                 continue
-            out_seq.append(item_clean)
-        return type(x)(out_seq)
+            if isinstance(parent, Mapping):
+                parent[key] = out
+            else:
+                parent.append(out)
+
+    return root[1]
 
-    # Scalars (including None) pass through unchanged
-    return x
+
+def _copy_along(node, change):
+    """
+    Shallow-copy `node` and every container that `change` reaches into.
+
+    Containers that `change` does not touch are shared with `node`, so an
+    in-place update of the result only allocates along the modified paths and
+    never mutates `node` itself. A keyed change (`MATCH_BY`) copies the list it
+    targets.
+    """
+    holder = [node]
+    stack = [(holder, 0, change)]
+    while stack:
+        container, key, change = stack.pop()
+        node = container[key]
+
+        # a single-item list change is unwrapped against a non-list value
+        while _is_seq(change) and len(change) == 1 and not isinstance(node, list):
+            change = change[0]
+
+        if isinstance(node, list) and isinstance(change, Mapping) and MATCH_BY in change:
+            # a keyed merge adds and drops elements of the list in place (and copies the
+            # elements it merges into itself), so only the list needs a private copy
+            container[key] = copy(node)
+        elif isinstance(node, Mapping) and isinstance(change, Mapping):
+            out = copy(node)
+            container[key] = out
+            for k, v in change.items():
+                if k in out:
+                    stack.append((out, k, v))
+        elif isinstance(node, list) and _is_seq(change):
+            # lists are rebuilt slot by slot and written back in place, so only the
+            # outer list needs a private copy
+            container[key] = copy(node)
+
+    return holder[0]
+
+
+def _copy_containers(node):
+    """
+    Copy `node` and every mapping and list nested in it; scalars are shared.
+
+    Unlike `deepcopy`, the tree is walked with an explicit stack, so deep documents
+    do not hit the recursion limit.
+    """
+    holder = [node]
+    stack = [(holder, 0)]
+    while stack:
+        container, key = stack.pop()
+        node = container[key]
+        if isinstance(node, Mapping):
+            out = container[key] = copy(node)
+            stack.extend((out, k) for k in out)
+        elif isinstance(node, list):
+            out = container[key] = copy(node)
+            stack.extend((out, i) for i in range(len(out)))
+    return holder[0]
 
 
 class PositionalMergeError(ValueError):
@@ -118,6 +303,15 @@ class PositionalMergeError(ValueError):
 def _merge_lists_positional(
     base_list: list, change_list: list, *, path: str, state: dict | None, pop_key: bool
 ) -> list | None:
+    """
+    Positionally merge `change_list` into `base_list`; see `_merge_lists_walker`.
+    """
+    return _run_walker(_merge_lists_walker(base_list, change_list, path=path, state=state, pop_key=pop_key))
+
+
+def _merge_lists_walker(
+    base_list: list, change_list: list, *, path: str, state: dict | None, pop_key: bool, in_baseline: bool = False
+):
     """
     Merge two lists by index:
 
@@ -137,6 +331,10 @@ def _merge_lists_positional(
             1. First run, for each positional REMOVE, record a unique key in state store
             2. On later runs, REMOVE[i] removes that recorded value wherever it appears, even if indices shifted.
         can return None if the entire list is removed
+        the baseline snapshot is a deep copy taken on the first run, so it is never shared with
+            a document; merged mapping slots are copied from it only along the paths the change modifies.
+        walker: nested merges are yielded to `_run_walker` instead of recursing.
+        in_baseline: `base_list` is a slot of an enclosing snapshot, which is already a private copy.
     """
     if state is None:
         state = {}
@@ -147,15 +345,20 @@ def _merge_lists_positional(
 
     base_key = f"{path}::BASE"
     if base_key not in state:
-        # deepcopy to avoid later mutations affecting the snapshot
-        state[base_key] = deepcopy(base_list)
+        # the snapshot is persisted with the REMOVE state, so it must not share
+        # any container with the document that later updates edit in place
+        state[base_key] = base_list if in_baseline else _copy_containers(base_list)
     base0 = state[base_key]  # stable baseline for all runs
 
     def _baseline_slot(i: int):
         """
         Keep baseline results deterministic across runs.
+
+        Slots are shared with the snapshot rather than copied: the merge never
+        mutates a baseline slot in place, it copies along modified paths only, and
+        only slots that differ from the document are written back into it.
         """
-        return deepcopy(base0[i])
+        return base0[i]
 
     out = type(base_list)()
     max_len = max(len(base0), len(change_list))
@@ -196,10 +399,10 @@ def _merge_lists_positional(
         if _is_removed_str(c):
             continue
 
-        # If both sides exist and are mappings, recursively merge
+        # If both sides exist and are mappings, recursively merge into a copy-on-write view of the slot
         if have_base and isinstance(base0[i], Mapping) and isinstance(c, Mapping):
-            merged = deepcopy(base0[i])
-            update_config_entries(merged, c, pop_key=pop_key, path=_path_join(path, f"[{i}]"), state=state)
+            merged = _copy_along(base0[i], c)
+            yield _update_walker(merged, c, path=_path_join(path, f"[{i}]"), state=state, pop_key=pop_key)
             if not merged and pop_key:
                 continue
             out.append(merged)
@@ -208,7 +411,11 @@ def _merge_lists_positional(
         # If both sides exist and are lists, recursively merge lists
         if have_base and isinstance(base0[i], list) and isinstance(c, list):
             out.append(
-                _merge_lists_positional(base0[i], c, path=_path_join(path, f"[{i}]"), state=state, pop_key=pop_key)
+                (
+                    yield _merge_lists_walker(
+                        base0[i], c, path=_path_join(path, f"[{i}]"), state=state, pop_key=pop_key, in_baseline=True
+                    )
+                )
             )
             continue
 
@@ -226,9 +433,398 @@ def _merge_lists_positional(
     return out
 
 
+class KeyedMergeError(ValueError):
+    pass
+
+
+def _index_by(items: list, field_name, path: str) -> dict:
+    """
+    Map each value of `field_name` to the index of the list element holding it.
+
+    Elements that are not mappings or lack the field are not addressable and are skipped.
+    """
+    index = {}
+    for i, item in enumerate(items):
+        # plain dict check first: it is much cheaper than the Mapping ABC check
+        if not (isinstance(item, dict) or isinstance(item, Mapping)) or field_name not in item:
+            continue
+        match = item[field_name]
+        if match in index:
+            raise KeyedMergeError(
+                f"\n -- {path}: {field_name}={match!r} matches elements {index[match]} and {i}. \n"
+                f"    -- {MATCH_BY}: {field_name} needs a unique {field_name} per element!"
+            )
+        index[match] = i
+    return index
+
+
+def _keyed_merge_walker(base: dict, k, change: Mapping, key_path: str, state: dict, pop_key: bool, changes):
+    """
+    Merge a keyed change into the list of mappings at `base[k]`, in place.
+
+    `change[MATCH_BY]` names the field that identifies an element; every other key of
+    `change` is a value of that field:
+        * "PRESERVE"      -> keep the matching element as-is
+        * "REMOVE"        -> drop the matching element (no-op if there is none)
+        * a mapping       -> merge into the matching element, or append a new element
+                             `{field: value, **mapping}` if there is none
+
+    The baseline list is indexed once, so each change is matched in O(1) and plans only
+    list the elements they touch. Removal by key is stable across runs, so unlike the
+    positional merge no REMOVE state is recorded.
+    """
+    field_name = change[MATCH_BY]
+    items = base.get(k)
+    if not isinstance(items, list):
+        raise KeyedMergeError(
+            f"\n -- {key_path}: {MATCH_BY}: {field_name} needs an existing list of mappings, "
+            f"got {type(items).__name__}."
+        )
+
+    index = _index_by(items, field_name, key_path)
+    drop = set()
+    for match, c in change.items():
+        if match == MATCH_BY or _is_preserved_str(c):
+            continue
+        item_path = _path_join(key_path, f"[{field_name}={match}]")
+        i = index.get(match)
+
+        if _is_removed_str(c):
+            if i is not None:
+                drop.add(i)
+            continue
+
+        if not isinstance(c, Mapping):
+            raise KeyedMergeError(f"\n -- {item_path}: expected a mapping, REMOVE or PRESERVE, got {type(c).__name__}.")
+
+        if i is None:
+            new = _clean_removes(c, pop_key=pop_key)
+            if not new and pop_key:
+                continue
+            new = {field_name: match, **new}
+            index[match] = len(items)
+            items.append(new)
+            changes.added.append(Change(item_path, new=new))
+            continue
+
+        # copy-on-write: the element may be shared with a positional baseline snapshot or the caller
+        merged = _copy_along(items[i], c)
+        item_changes = yield _update_walker(merged, c, path=item_path, state=state, pop_key=pop_key)
+        changes.extend(item_changes)
+        if item_changes:
+            items[i] = merged
+        if pop_key and not items[i]:
+            drop.add(i)
+
+    # delete from the back so the remaining indices stay valid
+    for i in sorted(drop, reverse=True):
+        item = items[i]
+        changes.removed.append(Change(_path_join(key_path, f"[{field_name}={item.get(field_name)}]"), old=item))
+        del items[i]
+
+    if pop_key and not items:
+        changes.removed.append(Change(key_path, old=base.pop(k)))
+
+
+@dataclass
+class Change:
+    """
+    A single entry of a `ChangeSet`.
+
+    Attributes:
+        path (str): Dotted path of the changed entry (same format as the state store keys).
+        old: Value before the update (None for additions).
+        new: Value after the update (None for removals).
+    """
+
+    path: str
+    old: object = None
+    new: object = None
+
+
+@dataclass
+class ChangeSet:
+    """
+    Paths added, modified and removed by an update, with their old and new values.
+    """
+
+    added: list[Change] = field(default_factory=list)
+    modified: list[Change] = field(default_factory=list)
+    removed: list[Change] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.added) + len(self.modified) + len(self.removed)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def extend(self, other: "ChangeSet | None") -> None:
+        """
+        Merge another change set into this one.
+        """
+        if not other:
+            return
+        self.added.extend(other.added)
+        self.modified.extend(other.modified)
+        self.removed.extend(other.removed)
+
+    def summary(self) -> str:
+        """
+        One-line human readable summary, e.g. "1 added, 2 modified, 0 removed".
+        """
+        return f"{len(self.added)} added, {len(self.modified)} modified, {len(self.removed)} removed"
+
+
+def _assign(base: dict, k, op: "PatchOp", key_path: str, changes: ChangeSet) -> None:
+    """
+    Apply a resolved OP_SET / OP_REMOVE to `base[k]` and record it.
+    """
+    if op.kind == OP_REMOVE:
+        if k in base:
+            changes.removed.append(Change(key_path, old=base.pop(k)))
+        return
+
+    new = _fresh(op.value)
+    if k not in base:
+        changes.added.append(Change(key_path, new=new))
+    elif not _same_value(base[k], new):
+        changes.modified.append(Change(key_path, old=base[k], new=new))
+    base[k] = new
+
+
+def _apply_entry_walker(base: dict, k, v, key_path: str, state: dict, pop_key: bool, changes: ChangeSet):
+    """
+    Apply one PRESERVE-stripped change `v` to `base[k]` in place, recording into `changes`.
+    """
+    # if the incoming value is a single value list but the base value is scalar,
+    # then treat it as a scalar.
+    if isinstance(v, list) and len(v) == 1 and not isinstance(base.get(k), list):
+        v = v[0]
+
+    if isinstance(v, Mapping) and isinstance(base.get(k), Mapping):
+        changes.extend((yield _update_walker(base[k], v, path=key_path, state=state, pop_key=pop_key)))
+        if pop_key and isinstance(base[k], Mapping) and not base[k]:
+            changes.removed.append(Change(key_path, old=base.pop(k)))
+        return
+
+    if isinstance(base.get(k), list) and isinstance(v, list):
+        merged = yield _merge_lists_walker(base[k], v, path=key_path, state=state, pop_key=pop_key)
+        # if merge returned None -> delete key
+        if merged is None or (pop_key and isinstance(merged, list) and len(merged) == 0):
+            changes.removed.append(Change(key_path, old=base.pop(k)))
+            return
+
+        # inplace update to preserve formatting and comments
+        base_list = base[k]
+
+        # if nothing changes then do nothing to preserve formatting
+        if _same_value(base_list, merged):
+            return
+
+        changes.modified.append(Change(key_path, old=copy(base_list), new=merged))
+
+        # overwrite changed slots; unchanged ones keep the document's own objects
+        n = min(len(base_list), len(merged))
+        for i in range(n):
+            if not _same_value(base_list[i], merged[i]):
+                base_list[i] = merged[i]
+
+        # append new items
+        for i in range(len(base_list), len(merged)):
+            base_list.append(merged[i])
+
+        # remove extra old items
+        while len(base_list) > len(merged):
+            base_list.pop()
+
+        return
+
+    _assign(base, k, _compile_assignment((k,), v, pop_key), key_path, changes)
+
+
+# Patch operation kinds
+OP_SET = "set"
+OP_REMOVE = "remove"
+OP_PRESERVE = "preserve"
+OP_MERGE = "merge"
+OP_PRUNE = "prune"
+OP_LIST = "list"
+OP_KEYED = "keyed"
+
+
+@dataclass(frozen=True)
+class PatchOp:
+    """
+    A single operation of a compiled patch.
+
+    Attributes:
+        kind (str): One of OP_SET, OP_REMOVE, OP_PRESERVE, OP_MERGE, OP_PRUNE, OP_LIST or OP_KEYED.
+        keys (tuple): Key path from the patch root to the entry this op targets.
+        value: Cleaned value for OP_SET, the stripped mapping for OP_MERGE or OP_KEYED,
+            or the raw change list for OP_LIST.
+        span (int): For OP_MERGE, number of following ops belonging to the nested mapping.
+    """
+
+    kind: str
+    keys: tuple
+    value: object = None
+    span: int = 0
+
+
+@dataclass(frozen=True)
+class Patch:
+    """
+    A change tree compiled into a flat, ordered list of path operations.
+
+    Compile once with `compile_patch` and apply to any number of documents with
+    `apply_patch` (or pass it to `update_config_entries` in place of the change dict).
+    """
+
+    ops: tuple[PatchOp, ...]
+    pop_key: bool = True
+
+
+def _compile_assignment(keys: tuple, v, pop_key: bool) -> PatchOp:
+    """
+    Resolve the plain assignment of `v` to `keys[-1]` into an OP_SET or OP_REMOVE.
+
+    Cleaning rules (via _clean_removes):
+      * "REMOVE" in mappings -> drop key (pop_key=True) or set None (pop_key=False).
+      * "REMOVE" in sequences -> drop element; elements that clean to {} -> drop element.
+      * with pop_key=True, values that clean to an empty mapping or sequence remove the key.
+    """
+    k = keys[-1]
+    cleaned = _clean_removes({k: v}, pop_key=pop_key)
+    if k not in cleaned:
+        return PatchOp(OP_REMOVE, keys)
+    val = cleaned[k]
+    if pop_key and (isinstance(val, Mapping) or (isinstance(val, Sequence) and not isinstance(val, str))) and not val:
+        return PatchOp(OP_REMOVE, keys)
+    return PatchOp(OP_SET, keys, val)
+
+
+def compile_patch(change: Mapping, pop_key: bool = True) -> Patch:
+    """
+    Compile a nested change tree into a flat `Patch`.
+
+    "PRESERVE" stripping and "REMOVE" cleaning are resolved here, once, so the
+    same patch can be replayed against several documents without re-interpreting
+    the change tree:
+      - preserved keys      -> OP_PRESERVE (no-op, kept for reporting)
+      - scalar values       -> OP_SET / OP_REMOVE
+      - mappings            -> OP_MERGE (+ nested ops + OP_PRUNE); if the document does not
+                               hold a mapping at that key, the whole cleaned mapping is assigned
+                               instead and the nested ops are skipped
+      - lists               -> OP_LIST, resolved against the document (positional merge or assignment)
+      - mappings with MATCH_BY -> OP_KEYED, merged into the document's list of mappings by key
+
+    The change tree is walked with an explicit stack. `NormalisedParams` (see
+    `normalise_markers`) are already stripped and are not stripped again.
+    """
+    stripped = isinstance(change, NormalisedParams)
+    ops: list[PatchOp] = []
+    # each frame is (remaining items, key prefix, index of its OP_MERGE, mapping); the root has no OP_MERGE
+    stack = [(iter(change.items()), (), None, change)]
+    while stack:
+        items, prefix, at, mapping = stack[-1]
+        for k, v in items:
+            keys = prefix + (k,)
+            # nested mappings were already stripped along with their parent
+            should_apply, v = (True, v) if stripped or at is not None else _strip_preserved(v)
+            if not should_apply:
+                ops.append(PatchOp(OP_PRESERVE, keys))
+            elif isinstance(v, Mapping) and MATCH_BY in v:
+                ops.append(PatchOp(OP_KEYED, keys, v))
+            elif isinstance(v, Mapping):
+                stack.append((iter(v.items()), keys, len(ops), v))
+                ops.append(None)  # placeholder until the span is known
+                break
+            elif isinstance(v, list):
+                ops.append(PatchOp(OP_LIST, keys, v))
+            else:
+                ops.append(_compile_assignment(keys, v, pop_key))
+        else:
+            stack.pop()
+            if at is not None:
+                ops.append(PatchOp(OP_PRUNE, prefix))
+                ops[at] = PatchOp(OP_MERGE, prefix, mapping, len(ops) - at - 1)
+
+    return Patch(tuple(ops), pop_key)
+
+
+def _fresh(value):
+    """
+    Give each document its own copy of a precompiled container value.
+    """
+    # cleaning an already clean tree rebuilds every container without recursion
+    return _clean_removes(value, pop_key=True)
+
+
+def apply_patch(base: dict, patch: Patch, path: str = "", state: dict | None = None) -> ChangeSet:
+    """
+    Apply a compiled `Patch` to `base` in place.
+
+    Produces the same result as `update_config_entries(base, change, ...)` for the
+    change tree the patch was compiled from, and returns the resulting `ChangeSet`.
+    """
+    return _run_walker(_apply_patch_walker(base, patch, path=path, state=state))
+
+
+def _apply_patch_walker(base: dict, patch: Patch, path: str = "", state: dict | None = None):
+    """
+    Walker behind `apply_patch`; list merges are yielded to `_run_walker`.
+    """
+    if state is None:
+        state = {}
+
+    changes = ChangeSet()
+    ops = patch.ops
+    # (mapping, path) of every OP_MERGE currently entered
+    stack = [(base, path)]
+    i = 0
+    while i < len(ops):
+        op = ops[i]
+        i += 1
+        parent, parent_path = stack[-1]
+        k = op.keys[-1]
+
+        if op.kind == OP_PRESERVE:
+            continue
+
+        key_path = _path_join(parent_path, str(k))
+        if op.kind in (OP_SET, OP_REMOVE):
+            _assign(parent, k, op, key_path, changes)
+        elif op.kind == OP_MERGE:
+            if isinstance(parent.get(k), Mapping):
+                stack.append((parent[k], key_path))
+                continue
+            # not a mapping in this document: assign the whole cleaned mapping instead
+            _assign(parent, k, _compile_assignment(op.keys, op.value, patch.pop_key), key_path, changes)
+            i += op.span
+        elif op.kind == OP_PRUNE:
+            stack.pop()
+            parent, parent_path = stack[-1]
+            if patch.pop_key and isinstance(parent[k], Mapping) and not parent[k]:
+                changes.removed.append(Change(_path_join(parent_path, str(k)), old=parent.pop(k)))
+        elif op.kind == OP_LIST:
+            yield _apply_entry_walker(parent, k, op.value, key_path, state, patch.pop_key, changes)
+        elif op.kind == OP_KEYED:
+            yield _keyed_merge_walker(parent, k, op.value, key_path, state, patch.pop_key, changes)
+
+    return changes
+
+
+def _update_walker(base: dict, change: dict | Patch, path: str, state: dict | None, pop_key: bool):
+    """
+    Walker behind `update_config_entries`.
+    """
+    patch = change if isinstance(change, Patch) else compile_patch(change, pop_key=pop_key)
+    return _apply_patch_walker(base, patch, path=path, state=state)
+
+
 def update_config_entries(
-    base: dict, change: dict, path: str = "", state: dict | None = None, pop_key: bool = True
-) -> None:
+    base: dict, change: dict | Patch, path: str = "", state: dict | None = None, pop_key: bool = True
+) -> ChangeSet:
     """
     Recursively update or remove entries in a nested dictionary in place.
 
@@ -252,71 +848,13 @@ def update_config_entries(
         support state store for
             - remembering positional REMOVE markers across runs,
             - preserving existing formatting by in-place list updates.
+        the change tree is compiled into a flat `Patch` (see `compile_patch`) before it is applied;
+        a precompiled `Patch` can be passed as `change` to skip compilation (its own pop_key is used).
+        returns a `ChangeSet` of the paths added, modified and removed, so callers can skip
+        rewriting unchanged files.
+        the walk runs on an explicit stack (see `_run_walker`), so deeply nested trees do not
+        hit the recursion limit.
+        a mapping holding `MATCH_BY: <field>` updates a list of mappings by key rather than
+        by position (see `_keyed_merge_walker`).
     """
-    if state is None:
-        state = {}
-
-    for k, v in change.items():
-        # strip "PRESERVE" first
-        should_apply, v = _strip_preserved(v)
-        if not should_apply:
-            continue  # no change for this key; keep existing value
-
-        # if the incoming value is a single value list but the base value is scalar,
-        # then treat it as a scalar.
-        if isinstance(v, list) and len(v) == 1 and not isinstance(base.get(k), list):
-            v = v[0]
-
-        key_path = _path_join(path, str(k))
-
-        if isinstance(v, Mapping) and isinstance(base.get(k), Mapping):
-            update_config_entries(base[k], v, path=key_path, state=state, pop_key=pop_key)
-            if pop_key and isinstance(base[k], Mapping) and not base[k]:
-                base.pop(k, None)
-            continue
-
-        if isinstance(base.get(k), list) and isinstance(v, list):
-            merged = _merge_lists_positional(base[k], v, path=key_path, state=state, pop_key=pop_key)
-            # if merge returned None -> delete key
-            if merged is None or (pop_key and isinstance(merged, list) and len(merged) == 0):
-                base.pop(k, None)
-                continue
-
-            # inplace update to preserve formatting and comments
-            base_list = base[k]
-
-            # if nothing changes then do nothing to preserve formatting
-            if base_list == merged:
-                continue
-
-            # overwrite existing slots
-            n = min(len(base_list), len(merged))
-            for i in range(n):
-                base_list[i] = merged[i]
-
-            # append new items
-            for i in range(len(base_list), len(merged)):
-                base_list.append(merged[i])
-
-            # remove extra old items
-            while len(base_list) > len(merged):
-                base_list.pop()
-
-            continue
-
-        cleaned = _clean_removes({k: v}, pop_key=pop_key)
-
-        if k in cleaned:
-            val = cleaned[k]
-            if pop_key:
-                if isinstance(val, Mapping) and not val:
-                    # special case: cleaned to empty mapping and pop_key=True -> remove key
-                    base.pop(k, None)
-                    continue
-                if isinstance(val, Sequence) and not isinstance(val, str) and len(val) == 0:
-                    # special case: cleaned to empty sequence and pop_key=True -> remove key
-                    base.pop(k, None)
-                    continue
-            base[k] = val
-        else:
-            base.pop(k, None)
+    return _run_walker(_update_walker(base, change, path=path, state=state, pop_key=pop_key))
@@ -3,6 +3,10 @@ import pytest
 from experiment_generator.common_var import (
     REMOVED,
     PRESERVED,
+    REMOVE_MARKER,
+    PRESERVE_MARKER,
+    Marker,
+    _as_marker,
     _is_removed_str,
     _is_preserved_str,
     _is_seq,
@@ -11,6 +15,7 @@ from experiment_generator.common_var import (
 
 def test_is_removed_str_true():
     assert _is_removed_str(REMOVED) is True
+    assert _is_removed_str(REMOVE_MARKER) is True
 
 
 @pytest.mark.parametrize(
@@ -30,6 +35,7 @@ def test_is_removed_str_false(value):
 
 def test_is_preserved_str_true():
     assert _is_preserved_str(PRESERVED) is True
+    assert _is_preserved_str(PRESERVE_MARKER) is True
 
 
 @pytest.mark.parametrize(
@@ -47,6 +53,26 @@ def test_is_preserved_str_false(value):
     assert _is_preserved_str(value) is False
 
 
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("REMOVE", REMOVE_MARKER),
+        ("PRESERVE", PRESERVE_MARKER),
+        (REMOVE_MARKER, REMOVE_MARKER),
+    ],
+)
+def test_as_marker_returns_sentinel(value, expected):
+    result = _as_marker(value)
+    assert result is expected
+    assert type(result) is Marker
+    assert result == value
+
+
+@pytest.mark.parametrize("value", ["REMOVE ", "x", None, 1, ["REMOVE"]])
+def test_as_marker_leaves_other_values(value):
+    assert _as_marker(value) is value
+
+
 @pytest.mark.parametrize(
     "value",
     [
@@ -1,7 +1,8 @@
 import pytest
 from pathlib import Path
 from experiment_generator.config_updater import ConfigUpdater
-from experiment_generator.tmp_parser.yaml_config import read_yaml
+from experiment_generator.tmp_parser import yaml_config
+from experiment_generator.tmp_parser.yaml_config import read_plan, read_yaml, write_yaml
 import warnings
 
 
@@ -77,3 +78,153 @@ def test_update_config_params_jobname_matches_no_warning(tmp_path):
     updated = read_yaml(config_path.as_posix())
     assert updated["jobname"] == "test_repo"
     assert updated["queue"] == "express"
+
+
+def test_plan_values_keep_their_style_in_config(tmp_path):
+    repo_dir = tmp_path / "test_repo"
+    repo_dir.mkdir()
+    config_path = repo_dir / "config.yaml"
+    config_path.write_text("jobname: test_repo\nqueue: normal  # queue comment\n")
+    plan = tmp_path / "plan.yaml"
+    plan.write_text("""
+# plan comment
+config.yaml:
+  queue: express
+  walltime: "10:00:00"
+  tol: 1.0e-3
+  modules: [a, b]
+""")
+
+    indata = read_plan(plan)
+    assert type(indata) is dict
+    assert type(indata["config.yaml"]["modules"]) is list
+
+    ConfigUpdater(repo_dir).update_config_params(indata["config.yaml"], Path("config.yaml"), {})
+
+    assert config_path.read_text() == (
+        "jobname: test_repo\n"
+        "queue: express # queue comment\n"
+        'walltime: "10:00:00"\n'
+        "tol: 1.0e-3\n"
+        "modules:\n"
+        "  - a\n"
+        "  - b\n"
+    )
+
+
+@pytest.mark.skipif(yaml_config._CPlanLoader is None, reason="needs ruamel.yaml.clibz or ruamel.yaml.clib")
+def test_read_plan_with_libyaml_matches_the_python_loader(tmp_path):
+    plan = tmp_path / "plan.yaml"
+    plan.write_text(
+        "a: yes\n"
+        "b: 0x1F\n"
+        "tol: 1.0e-3\n"
+        "q: '5'\n"
+        'dq: "x"\n'
+        "lit: |\n  echo a\n"
+        "date: 2001-12-14\n"
+        "lst: [1, on, ~]\n"
+        "base: &b {x: 1}\n"
+        "use: *b\n"
+    )
+
+    def typed(node):
+        if isinstance(node, dict):
+            return {k: typed(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [typed(v) for v in node]
+        return type(node), str(node)
+
+    with open(plan, encoding="utf-8") as f:
+        expected = yaml_config.plan_yaml.load(f)
+    assert typed(read_plan(plan)) == typed(expected)
+
+
+def test_write_yaml_drops_blank_lines_between_keys(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        "queue: normal  # eol\n"
+        "\n"
+        "walltime: 1:00:00\n"
+        "modules: [a, b]\n"
+        "\n"
+        "\n"
+        "env:\n"
+        "  A: 1\n"
+        "\n"
+        "# a comment\n"
+        "script: |\n"
+        "  echo a\n"
+        "\n"
+        "  echo b\n"
+        "\n"
+        "submodels:\n"
+        "  - name: atmosphere\n"
+        "\n"
+        "    ncpus: 1\n"
+        "\n"
+        "    exe: um\n"
+    )
+
+    write_yaml(read_yaml(path), path)
+
+    assert path.read_text() == (
+        "queue: normal  # eol\n"
+        "walltime: 1:00:00\n"
+        "modules: [a, b]\n"
+        "env:\n"
+        "  A: 1\n"
+        "\n"
+        "# a comment\n"
+        "script: |\n"
+        "  echo a\n"
+        "\n"
+        "  echo b\n"
+        "\n"
+        "submodels:\n"
+        "  - name: atmosphere\n"
+        "\n"
+        "    ncpus: 1\n"
+        "    exe: um\n"
+    )
+
+
+def test_update_config_params_writes_a_change_of_type_alone(tmp_path):
+    repo_dir = tmp_path / "test_repo"
+    repo_dir.mkdir()
+    config_path = repo_dir / "config.yaml"
+    config_path.write_text("jobname: test_repo\ndebug: 1\nlevels: [1, 2]\n")
+
+    changes = ConfigUpdater(repo_dir).update_config_params({"debug": True, "levels": [1.0, 2]}, Path("config.yaml"), {})
+
+    assert [c.path for c in changes.modified] == ["config.yaml.debug", "config.yaml.levels"]
+    assert config_path.read_text() == "jobname: test_repo\ndebug: true\nlevels: [1.0, 2]\n"
+
+
+def test_update_config_params_reuses_parsed_document(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "test_repo"
+    repo_dir.mkdir()
+    config_path = repo_dir / "config.yaml"
+    config = '# PBS configuration\nqueue: normal  # queue\nexe: "model.x"\nmodules: [a, b]\n'
+    updater = ConfigUpdater(repo_dir)
+
+    parsed = []
+    load = yaml_config.ryaml.load
+
+    def _record(stream):
+        parsed.append(stream)
+        return load(stream)
+
+    monkeypatch.setattr(yaml_config.ryaml, "load", _record)
+
+    # two branches starting from the same config.yaml
+    config_path.write_text(config)
+    updater.update_config_params({"queue": "express", "mem": "1GB"}, Path("config.yaml"), {})
+    config_path.write_text(config)
+    updater.update_config_params({"queue": "normalsr"}, Path("config.yaml"), {})
+
+    assert config_path.read_text() == (
+        '# PBS configuration\nqueue: normalsr # queue\nexe: "model.x"\nmodules: [a, b]\njobname: test_repo\n'
+    )
+
+    assert len(parsed) == 1
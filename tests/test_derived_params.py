@@ -0,0 +1,67 @@
+import math
+import pytest
+import experiment_generator.derived_params as derived_params
+from experiment_generator.derived_params import DerivedRule, derive_for_branches, derive_for_group
+from experiment_generator.common_var import REMOVED, PRESERVED
+
+
+def test_derive_for_branches_turning_angle_across_branches():
+    branches = [
+        {"dynamics_nml": {"turning_angle": 30, "kdyn": 1}},
+        {"dynamics_nml": {"turning_angle": REMOVED}},
+        {"dynamics_nml": {"turning_angle": None}},
+        {"setup_nml": {"days": 1}},
+    ]
+
+    derive_for_branches("ice/cice_in.nml", branches)
+
+    dyn = branches[0]["dynamics_nml"]
+    assert "turning_angle" not in dyn and dyn["kdyn"] == 1
+    assert math.isclose(dyn["cosw"], math.cos(math.radians(30)))
+    assert math.isclose(dyn["sinw"], math.sin(math.radians(30)))
+    assert branches[1]["dynamics_nml"] == {"cosw": REMOVED, "sinw": REMOVED}
+    # None keeps the existing cos/sin; the updater checks them against the file
+    assert branches[2]["dynamics_nml"] == {"turning_angle": None}
+    assert branches[3] == {"setup_nml": {"days": 1}}
+
+
+def test_derive_for_branches_consumes_source_in_unmanaged_files():
+    branches = [{"dynamics_nml": {"turning_angle": 30}}, {"grp": {"turning_angle": 30}}]
+
+    derive_for_branches("ocean/input.nml", branches)
+
+    assert branches == [{"dynamics_nml": {}}, {"grp": {"turning_angle": 30}}]
+
+
+def test_derive_for_branches_evaluates_rule_once_per_block(monkeypatch):
+    calls = []
+
+    def _double(values):
+        calls.append(list(values))
+        return ([v * 2 for v in values],)
+
+    rule = DerivedRule(group="grp", source="dt", targets=("dt2",), compute=_double)
+    monkeypatch.setattr(derived_params, "DERIVED_RULES", [rule])
+    branches = [{"grp": {"dt": 1}}, {"grp": {"dt": 2}}, {"grp": {"dt": 3}}]
+
+    derive_for_branches("input.nml", branches)
+
+    assert calls == [[1.0, 2.0, 3.0]]
+    assert [b["grp"] for b in branches] == [{"dt2": 2.0}, {"dt2": 4.0}, {"dt2": 6.0}]
+
+
+def test_derive_for_branches_rejects_non_numeric_source():
+    with pytest.raises(ValueError, match="must be numeric"):
+        derive_for_branches("ice_in", [{"dynamics_nml": {"turning_angle": "north"}}])
+
+
+@pytest.mark.parametrize("value", [PRESERVED, None])
+def test_derive_for_group_keep_requires_existing_targets(value):
+    with pytest.raises(ValueError, match="Cannot preserve turning_angle"):
+        derive_for_group("ice_in", "dynamics_nml", {"turning_angle": value}, lambda var: False)
+
+    consumed, assignments = derive_for_group(
+        "ice_in", "dynamics_nml", {"turning_angle": value}, lambda var: var == "sinw"
+    )
+    assert consumed == {"turning_angle"}
+    assert assignments == {}
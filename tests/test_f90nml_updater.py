@@ -1,7 +1,9 @@
 import math
 import numpy as np
 import pytest
+import experiment_generator.f90nml_updater as f90nml_updater
 from experiment_generator.f90nml_updater import F90NamelistUpdater, format_nml_params
+from experiment_generator.tmp_parser.namelist import index_namelist, patch_namelist, patch_array
 import f90nml
 
 
@@ -112,6 +114,288 @@ def test_format_nml_params_exact_varname_match(tmp_path):
     assert lines[3].strip() == "days_to_increment = 5"
 
 
+def test_format_nml_params_same_varname_in_several_groups(tmp_path):
+    nml_file = tmp_path / "test.nml"
+    nml_file.write_text("&grp1\n" "    days = 1\n" "/\n" "&grp2\n" "    days = 2   ! keep me\n" "/\n")
+
+    format_nml_params(nml_file.as_posix(), {"grp2": {"DAYS": 20}, "missing_grp": {"days": 0}})
+
+    assert nml_file.read_text().splitlines() == [
+        "&grp1",
+        "    days = 1",
+        "/",
+        "&grp2",
+        "    days = 20   ! keep me",
+        "/",
+    ]
+
+
+def test_format_nml_params_replaces_continuation_lines(tmp_path):
+    nml_file = tmp_path / "test.nml"
+    nml_file.write_text(
+        "&grp\n" "    fields = 'a', 'b',\n" "             'c'\n" "    ! trailing note\n" "    flag = .false.\n" "/\n"
+    )
+
+    format_nml_params(nml_file.as_posix(), {"grp": {"fields": "'x', 'y'", "flag": "REMOVE"}})
+
+    assert nml_file.read_text().splitlines() == [
+        "&grp",
+        "    fields = 'x', 'y'",
+        "    ! trailing note",
+        "    flag = .false.",
+        "/",
+    ]
+
+
+def test_index_namelist_spans_and_unpatchable_entries():
+    lines = [
+        "&grp ! comment / with = tokens\n",
+        "    s = 'a / b ! c', 'd = e'\n",
+        "    arr = 1, 2,\n",
+        "          3\n",
+        "    x(2) = 5\n",
+        "    b = 1, c = 2\n",
+        "/\n",
+        "&other k = 1 /\n",
+    ]
+
+    groups = index_namelist(lines)
+
+    grp = groups["grp"]
+    assert (grp.start, grp.end) == (0, 6)
+    assert [(k, e.start, e.stop, e.patchable) for k, e in grp.entries.items()] == [
+        ("s", 1, 2, True),
+        ("arr", 2, 4, True),
+        ("x", 4, 5, False),
+        ("b", 5, 6, False),
+        ("c", 5, 6, False),
+    ]
+    assert not groups["other"].entries["k"].patchable
+
+
+def test_update_nml_params_patches_text_in_place(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    nml_file = repo / "input.nml"
+    nml_file.write_text(
+        "! header comment\n"
+        "&grp\n"
+        "    days = 30   ! calendar\n"
+        "    keep = .true.\n"
+        "    drop = 1\n"
+        "    fields = 'a',\n"
+        "             'b'\n"
+        "/\n"
+        "\n"
+        "&other\n"
+        "    days = 1\n"
+        "/\n"
+    )
+
+    updater = F90NamelistUpdater(repo)
+    params = {
+        "grp": {"days": 31, "keep": "PRESERVE", "drop": "REMOVE", "fields": ["x", "it's"], "flag": False},
+        "new_grp": {"a": 1},
+    }
+    updater.update_nml_params(params, nml_file.name)
+
+    assert nml_file.read_text() == (
+        "! header comment\n"
+        "&grp\n"
+        "    days = 31   ! calendar\n"
+        "    keep = .true.\n"
+        "    fields = 'x', 'it''s'\n"
+        "    flag = .false.\n"
+        "/\n"
+        "\n"
+        "&other\n"
+        "    days = 1\n"
+        "/\n"
+        "\n"
+        "&new_grp\n"
+        "    a = 1\n"
+        "/\n"
+    )
+    # the caller's parameters are left untouched
+    assert params["grp"]["keep"] == "PRESERVE"
+
+
+def test_update_nml_params_unchanged_values_keep_file_identical(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    nml_file = repo / "input.nml"
+    text = "&grp\n    days   =   30\n    arr = 1, 2,\n          3\n/\n"
+    nml_file.write_text(text)
+
+    F90NamelistUpdater(repo).update_nml_params({"grp": {"days": 30, "arr": [1, 2, 3]}}, nml_file.name)
+
+    assert nml_file.read_text() == text
+
+
+def test_update_nml_params_f90nml_fallback_writes_once(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    nml_file = repo / "input.nml"
+    # two assignments on one line cannot be patched in place, so f90nml renders the file
+    nml_file.write_text("&grp\n    a = 1, flag = .false.\n/\n")
+
+    writes = []
+    write_lines_atomic = f90nml_updater._write_lines_atomic
+
+    def _record(path, lines):
+        writes.append(path)
+        write_lines_atomic(path, lines)
+
+    monkeypatch.setattr(f90nml_updater, "_write_lines_atomic", _record)
+
+    F90NamelistUpdater(repo).update_nml_params({"grp": {"flag": True, "fields": "'x', 'y'"}}, nml_file.name)
+
+    assert writes == [nml_file]
+    text = nml_file.read_text()
+    assert "flag = .true." in text
+    assert "fields = 'x', 'y'" in text
+    assert f90nml.read(nml_file)["grp"]["a"] == 1
+    assert not nml_file.with_suffix(".tmp").exists()
+
+
+@pytest.mark.parametrize(
+    "text, edits",
+    [
+        ("&grp\n    a = 1, b = 2\n/\n", {"grp": {"a": "3"}}),  # shared line
+        ("&grp a = 1 /\n", {"grp": {"c": "3"}}),  # group not closed on its own line
+        ("&grp\n    a = 1\n/\n&grp\n    a = 2\n/\n", {"grp": {"a": "3"}}),  # repeated group
+        ("&grp\n    a = 1\n", {"grp": {"a": "3"}}),  # unclosed group
+    ],
+)
+def test_patch_namelist_declines_unpatchable_layouts(text, edits):
+    lines = text.splitlines(True)
+    assert patch_namelist(lines, index_namelist(lines), edits) is None
+
+
+def test_update_nml_params_array_elements_patch_in_place(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    nml_file = repo / "ice_in"
+    nml_file.write_text(
+        "&grp\n"
+        "    rhos = 330.0,  330.0,  330.0  ! per category\n"
+        "    names = 'a', 'b',\n"
+        "            'c'\n"
+        "    short = 1\n"
+        "    whole = 1, 2, 3\n"
+        "/\n"
+    )
+
+    params = {
+        "grp": {
+            "rhos(2)": 300.0,
+            "names(2:3)": ["x", "y"],
+            "short(3:4)": 0,
+            "whole": [4, 5, 6],
+            "WHOLE(3)": 7,
+            "new(2:3)": [True, False],
+            "new(5)": 1,
+        }
+    }
+    F90NamelistUpdater(repo).update_nml_params(params, nml_file.name)
+
+    assert nml_file.read_text() == (
+        "&grp\n"
+        "    rhos = 330.0,  300.0,  330.0  ! per category\n"
+        "    names = 'a', 'x',\n"
+        "            'y'\n"
+        "    short = 1, , 0, 0\n"
+        "    whole = 4, 5, 7\n"
+        "    new(2) = .true., .false.\n"
+        "    new(5) = 1\n"
+        "/\n"
+    )
+
+
+def test_update_nml_params_array_element_keeps_continuation_lines_and_comments(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    nml_file = repo / "input.nml"
+    nml_file.write_text(
+        "&coupler_nml\n"
+        "    fields_in = 'u_flux', 'v_flux',  ! momentum\n"
+        "        ! freshwater\n"
+        "                'lprec', 'evap'   ! last line\n"
+        "    dt = 1800\n"
+        "/\n"
+    )
+
+    params = {"coupler_nml": {"fields_in(3)": "fprec", "fields_in(5)": "runoff"}}
+    F90NamelistUpdater(repo).update_nml_params(params, nml_file.name)
+
+    assert nml_file.read_text() == (
+        "&coupler_nml\n"
+        "    fields_in = 'u_flux', 'v_flux',  ! momentum\n"
+        "        ! freshwater\n"
+        "                'fprec', 'evap', 'runoff'   ! last line\n"
+        "    dt = 1800\n"
+        "/\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "params, match",
+    [
+        ({"grp": {"arr(2)": "REMOVE"}}, "only whole arrays"),
+        ({"grp": {"arr(2:3)": [1, 2, 3]}}, "expects 2 values"),
+        ({"grp": {"arr(0)": 1}}, "Invalid subscript"),
+        ({"grp": {"arr(3:2)": [1]}}, "Invalid subscript"),
+        ({"grp": {"arr": 1, "arr(2)": 1}}, "not set to an array"),
+    ],
+)
+def test_update_nml_params_array_elements_invalid(tmp_path, params, match):
+    nml_file = tmp_path / "input.nml"
+    nml_file.write_text("&grp\n    arr = 1, 2, 3\n/\n")
+
+    with pytest.raises(ValueError, match=match):
+        F90NamelistUpdater(tmp_path).update_nml_params(params, nml_file.name)
+
+
+def test_apply_elements_rebases_f90nml_start_index():
+    class _Group(dict):
+        start_index = {"arr": [2]}
+
+    group = _Group(arr=[5, 6], other=1)
+    elements = f90nml_updater.ArrayElements({1: 0, 4: 9})
+
+    assert f90nml_updater._apply_elements(group, "arr", elements) == [0, 5, 6, 9]
+    assert group.start_index == {}
+    assert f90nml_updater._apply_elements(group, "other", elements) == [0, None, None, 9]
+    assert f90nml_updater._apply_elements(group, "new", f90nml_updater.ArrayElements({2: 1})) == [None, 1]
+
+
+@pytest.mark.parametrize("value, expected", [(3, "arr = 3"), ([3, 4], "arr = 3, 4")])
+def test_update_nml_params_whole_value_replaces_subscripted_array(tmp_path, value, expected):
+    nml_file = tmp_path / "input.nml"
+    nml_file.write_text("&grp\n    arr(2) = 5\n    x = 1\n/\n")
+
+    F90NamelistUpdater(tmp_path).update_nml_params({"grp": {"arr": value}}, nml_file.name)
+
+    assert nml_file.read_text() == f"&grp\n    {expected}\n    x = 1\n/\n"
+
+
+@pytest.mark.parametrize(
+    "text, items, expected",
+    [
+        ("1, 2, 3", {2: "9"}, "1, 9, 3"),
+        ("1 2   3", {1: "0", 3: "0"}, "0 2   0"),
+        ("'a,b', 'c'", {2: "'d'"}, "'a,b', 'd'"),
+        ("1, 2,", {4: "4"}, "1, 2, , 4"),
+        ("", {1: "1"}, "1"),
+        ("3*0.5", {2: "1"}, None),  # repeat count
+        ("1, , 3", {3: "1"}, None),  # null value
+        ("(1.0, 2.0)", {1: "1"}, None),  # complex number
+    ],
+)
+def test_patch_array(text, items, expected):
+    assert patch_array(text, items) == expected
+
+
 def test_turning_angle_compute_and_deletes_key(tmp_path):
     repo = tmp_path / "repo"
     repo.mkdir()
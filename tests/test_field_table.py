@@ -1,5 +1,5 @@
 from experiment_generator.field_table_updater import FieldTableUpdater, prune_empty_field_table_config
-from experiment_generator.tmp_parser.field_table import read_field_table
+from experiment_generator.tmp_parser.field_table import read_field_table, FieldTableDocument
 from experiment_generator.common_var import REMOVED, PRESERVED
 
 
@@ -136,3 +136,132 @@ def test_prune_empty_field_table_config_deletes_empty_entries():
     assert "temp" in config
     assert "ocean_mod" in config["temp"]
     assert "prog_tracers" in config["temp"]["ocean_mod"]
+
+
+FIELD_TABLE = """# added by FRE: sphum must be present in atmos
+ "TRACER", "atmos_mod", "sphum"
+           "longname",     "specific humidity"
+           "units",        "kg/kg"
+       "profile_type", "fixed", "surface_value=3.e-6" /
+
+# ocean tracers
+"prog_tracers","ocean_mod","temp"
+horizontal-advection-scheme = mdppm
+restart_file  = ocean_temp_salt.res.nc
+/
+
+"prog_tracers","ocean_mod","salt"
+"longname","salinity"
+/
+"""
+
+
+def test_update_field_table_params_splices_changed_methods(tmp_path):
+    field_table_file = tmp_path / "field_table"
+    field_table_file.write_text(FIELD_TABLE)
+
+    changes = FieldTableUpdater(tmp_path).update_field_table_params(
+        {
+            "sphum": {
+                "atmos_mod": {
+                    "TRACER": {
+                        "methods": [
+                            PRESERVED,
+                            {"key": "units", "value": "g/kg"},
+                            PRESERVED,
+                            {"key": "convection", "value": "all"},
+                        ]
+                    }
+                }
+            },
+            "temp": {"ocean_mod": {"prog_tracers": {"methods": [PRESERVED, {"key": "restart_file", "value": "t.nc"}]}}},
+            "salt": REMOVED,
+        },
+        field_table_file.name,
+        {},
+    )
+
+    assert changes
+    assert field_table_file.read_text() == (
+        "# added by FRE: sphum must be present in atmos\n"
+        ' "TRACER", "atmos_mod", "sphum"\n'
+        '           "longname",     "specific humidity"\n'
+        '           "units",        "g/kg"\n'
+        '       "profile_type", "fixed", "surface_value=3.e-6"\n'
+        '           "convection",     "all"\n'
+        "/\n"
+        "\n"
+        "# ocean tracers\n"
+        '"prog_tracers","ocean_mod","temp"\n'
+        "horizontal-advection-scheme = mdppm\n"
+        "restart_file  = t.nc\n"
+        "/\n"
+        "\n"
+    )
+
+
+def test_update_field_table_params_reuses_parsed_document(tmp_path, monkeypatch):
+    field_table_file = tmp_path / "field_table"
+    updater = FieldTableUpdater(tmp_path)
+
+    parsed = []
+    init = FieldTableDocument.__init__
+
+    def _record(self, lines, **kwargs):
+        parsed.append(len(lines))
+        init(self, lines, **kwargs)
+
+    monkeypatch.setattr(FieldTableDocument, "__init__", _record)
+
+    # two branches starting from the same field_table
+    for value in ("1.e-6", "2.e-6"):
+        field_table_file.write_text(FIELD_TABLE)
+        methods = [PRESERVED, PRESERVED, {"key": "profile_type", "value": "fixed", "params": {"surface_value": value}}]
+        updater.update_field_table_params(
+            {"sphum": {"atmos_mod": {"TRACER": {"methods": methods}}}}, field_table_file.name, {}
+        )
+        assert field_table_file.read_text() == FIELD_TABLE.replace("3.e-6", value)
+
+    assert len(parsed) == 1
+
+
+def test_update_field_table_params_regenerates_repeated_entries(tmp_path):
+    field_table_file = tmp_path / "field_table"
+    field_table_file.write_text(
+        '"TRACER","atmos_mod","sphum"\n"a","1"\n/\n# again\n"TRACER","atmos_mod","sphum"\n"b","2"\n/\n'
+    )
+
+    FieldTableUpdater(tmp_path).update_field_table_params(
+        {"sphum": {"atmos_mod": {"TRACER": {"methods": [PRESERVED, {"key": "b", "value": "3"}]}}}},
+        field_table_file.name,
+        {},
+    )
+
+    assert field_table_file.read_text() == '"TRACER", "atmos_mod", "sphum"\n"a", "1"\n"b", "3"\n/\n'
+
+
+def test_read_field_table_classifies_lines(tmp_path):
+    field_table_file = tmp_path / "field_table"
+    field_table_file.write_text(
+        '# comment "a","b","c"\n'
+        '"TRACER" , "atmos_mod" , "sphum"\n'
+        '  "longname", "specific humidity"\n'
+        '  "bad_params", "x", "no assignment"\n'
+        "  not a method\n"
+        "  diff_scheme/value = 1.e-3 /\n"
+        '"TRACER","atmos_mod","liq_wat" /\n'
+    )
+
+    assert read_field_table(field_table_file) == {
+        "sphum": {
+            "atmos_mod": {
+                "TRACER": {
+                    "methods": [
+                        {"key": "longname", "value": "specific humidity"},
+                        {"key": "diff_scheme/value", "value": "1.e-3"},
+                    ]
+                }
+            }
+        },
+        "liq_wat": {"atmos_mod": {"TRACER": {"methods": []}}},
+    }
@@ -0,0 +1,89 @@
+import json
+import pytest
+from experiment_generator.tmp_parser.json_parser import read_json, write_json, splice_json
+
+FORCING = """{
+    "description": "JRA55-do forcing",
+    "inputs": [
+        {
+            "filename": "INPUT/tas.nc",
+            "fieldname": "tas", "cname": "tair_ai",
+            "scale": 1.0
+        },
+        {
+            "filename": "INPUT/uas.nc",
+            "fieldname": "uas",
+            "cname": "uwnd_ai"
+        }
+    ]
+}
+"""
+
+
+def test_write_json_splices_changed_values_only(tmp_path):
+    path = tmp_path / "forcing.json"
+    path.write_text(FORCING)
+
+    data = read_json(path)
+    data["inputs"][0]["filename"] = "NEW/tas_{{year}}.nc"
+    data["inputs"][0]["scale"] = 2
+    data["inputs"][1]["perturbations"] = [{"type": "scaling", "value": [1, 2]}]
+    write_json(data, path)
+
+    assert path.read_text() == FORCING.replace('"INPUT/tas.nc"', '"NEW/tas_{{year}}.nc"').replace(
+        '"scale": 1.0', '"scale": 2'
+    ).replace(
+        """        {
+            "filename": "INPUT/uas.nc",
+            "fieldname": "uas",
+            "cname": "uwnd_ai"
+        }""",
+        """        {
+            "filename": "INPUT/uas.nc",
+            "fieldname": "uas",
+            "cname": "uwnd_ai",
+            "perturbations": [
+                {
+                    "type": "scaling",
+                    "value": [
+                        1,
+                        2
+                    ]
+                }
+            ]
+        }""",
+    )
+    assert read_json(path) == data
+
+
+def test_write_json_unchanged_content_is_not_rewritten(tmp_path):
+    path = tmp_path / "forcing.json"
+    path.write_text(FORCING)
+    mtime = path.stat().st_mtime_ns
+
+    write_json(read_json(path), path)
+
+    assert path.read_text() == FORCING
+    assert path.stat().st_mtime_ns == mtime
+
+
+def test_write_json_new_file_uses_indent_2(tmp_path):
+    path = tmp_path / "new.json"
+    write_json({"a": [1]}, path)
+    assert path.read_text() == '{\n  "a": [\n    1\n  ]\n}\n'
+
+
+@pytest.mark.parametrize(
+    "original, obj, expected",
+    [
+        ('{"a": 1, "b": [1, 2]}', {"a": True, "b": [1, 3]}, '{"a": true, "b": [1, 3]}'),
+        ('{"a": 1}', {"a": 1.0}, '{"a": 1.0}'),
+        ('{"a": "x\\u00e9"}', {"a": "xé"}, '{"a": "x\\u00e9"}'),
+        ('[1, {"k": {}}]', [1, {"k": {"n": None}}], '[1, {"k": {\n  "n": null\n}}]'),
+        ("not json", {"a": 1}, '{\n  "a": 1\n}\n'),
+    ],
+)
+def test_splice_json(original, obj, expected):
+    result = splice_json(original, obj)
+    assert result == expected
+    assert json.loads(result) == obj
@@ -1,7 +1,7 @@
 import sys
 import experiment_generator.experiment_generator as exp_gen
 from experiment_generator.experiment_generator import VALID_MODELS
-from experiment_generator.tmp_parser import yaml_config
+from experiment_generator import plan_loader
 import pytest
 import runpy
 
@@ -37,6 +37,34 @@ model_type: {VALID_MODELS[0]}
     assert called["indata"]["model_type"] == VALID_MODELS[0]
 
 
+def test_main_merges_several_input_files(tmp_path, monkeypatch):
+    import experiment_generator.main as main_module
+
+    resources = tmp_path / "resources.yaml"
+    resources.write_text(f"repository_directory: test_repo\nmodel_type: {VALID_MODELS[0]}\n")
+    physics = tmp_path / "physics.yaml"
+    physics.write_text(f"model_type: {VALID_MODELS[1]}\ncontrol_branch_name: ctrl\n")
+
+    called = {}
+
+    class DummyEG:
+        def __init__(self, indata):
+            called["indata"] = indata
+
+        def run(self):
+            called["run"] = True
+
+    monkeypatch.setattr(main_module, "ExperimentGenerator", DummyEG, raising=True)
+
+    monkeypatch.setattr(sys, "argv", ["prog", "-i", resources.as_posix(), physics.as_posix()])
+
+    main_module.main()
+
+    assert called.get("run") is True
+    assert called["indata"]["repository_directory"] == "test_repo"
+    assert called["indata"]["model_type"] == VALID_MODELS[1]
+
+
 def test_main_uses_default_yaml_when_present(tmp_path, monkeypatch):
     import experiment_generator.main as main_module
 
@@ -90,7 +118,7 @@ def test_main_errors_when_no_yaml_provided_and_default_missing(tmp_path, monkeyp
 def test_exec_main(tmp_path, monkeypatch):
     called = {}
 
-    def dummy_read_yaml(file_path):
+    def dummy_load_plan(file_paths):
         return {
             "repository_directory": "test_repo",
             "control_branch_name": "ctrl",
@@ -105,7 +133,7 @@ def test_exec_main(tmp_path, monkeypatch):
         def run(self):
             called["run"] = True
 
-    monkeypatch.setattr(yaml_config, "read_yaml", dummy_read_yaml, raising=True)
+    monkeypatch.setattr(plan_loader, "load_plan", dummy_load_plan, raising=True)
     monkeypatch.setattr(exp_gen, "ExperimentGenerator", DummyEG, raising=True)
 
     monkeypatch.setattr(sys, "argv", ["prog", "-i", "dummy.yaml"])
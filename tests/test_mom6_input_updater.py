@@ -1,5 +1,5 @@
 from experiment_generator.mom6_input_updater import Mom6InputUpdater
-from experiment_generator.tmp_parser.mom6_input import read_mom_input
+from experiment_generator.tmp_parser.mom6_input import read_mom_input, MomInputDocument, ASSIGNMENT, COMMENT, TAG, BLANK
 
 
 def test_update_mom6_params_add_change_remove(tmp_path):
@@ -40,3 +40,136 @@ DT_THERM = 7200.0               !   [s] default = 900.0
     assert params["THERMO_SPANS_COUPLING"] == "True"
 
     assert any("The (baroclinic) dynamics time step." in line for line in raw_lines)
+
+
+MOM_TEXT = """\
+DT = 900.0                      !   [s]
+                                ! The (baroclinic) dynamics time step.
+KPP%
+N_SMOOTH = 2                    ! smoothing passes
+%KPP
+
+USE_IDEAL_AGE_TRACER = False
+"""
+
+
+def test_mom_input_document_tokenizes_once_and_indexes_keys():
+    doc = MomInputDocument(MOM_TEXT.splitlines(True))
+
+    assert [r.kind for r in doc.records] == [ASSIGNMENT, COMMENT, TAG, ASSIGNMENT, TAG, BLANK, ASSIGNMENT]
+    assert doc.index == {"DT": [0], "KPP%N_SMOOTH": [3], "USE_IDEAL_AGE_TRACER": [6]}
+    assert doc.params() == {"DT": "900.0", "KPP%N_SMOOTH": "2", "USE_IDEAL_AGE_TRACER": "False"}
+    assert doc.render() == MOM_TEXT
+
+
+def test_mom_input_document_edits_and_clones_are_independent():
+    doc = MomInputDocument(MOM_TEXT.splitlines(True))
+
+    branch = doc.clone()
+    branch.set("DT", 1800)
+    branch.remove("DT")
+    branch.set("DT", 1800)  # re-adding restores the comments removed with it
+    branch.remove("USE_IDEAL_AGE_TRACER")
+    branch.set("USE_IDEAL_AGE_TRACER", True)
+    branch.set("KPP%N_SMOOTH", "2")
+    branch.remove("DT_THERM")
+    branch.set("NEW_KEY", False)
+
+    assert branch.render() == (
+        MOM_TEXT.replace("DT = 900.0 ", "DT = 1800 ").replace("= False", "= True")
+        + "\n! --- Added parameters ---\nNEW_KEY = False\n"
+    )
+
+    other = doc.clone()
+    other.remove("DT")
+    # the comment lines following DT go with it
+    assert other.render() == "".join(MOM_TEXT.splitlines(True)[2:])
+    assert other.params() == {"KPP%N_SMOOTH": "2", "USE_IDEAL_AGE_TRACER": "False"}
+    assert doc.render() == MOM_TEXT
+
+
+def test_update_mom6_params_reuses_tokenized_document(tmp_path, monkeypatch):
+    mom_file = tmp_path / "MOM_input"
+    mom_file.write_text(MOM_TEXT)
+    updater = Mom6InputUpdater(tmp_path)
+
+    tokenized = []
+    init = MomInputDocument.__init__
+
+    def _record(self, lines, **kwargs):
+        tokenized.append(len(lines))
+        init(self, lines, **kwargs)
+
+    monkeypatch.setattr(MomInputDocument, "__init__", _record)
+
+    # two branches starting from the same MOM_input
+    for dt in (1800, 3600):
+        mom_file.write_text(MOM_TEXT)
+        updater.update_mom6_params({"DT": dt}, mom_file.name, {})
+        assert mom_file.read_text() == MOM_TEXT.replace("DT = 900.0 ", f"DT = {dt} ")
+
+    assert tokenized == [7]
+
+    # unchanged parameters leave the file untouched
+    mom_file.write_text(MOM_TEXT)
+    assert not updater.update_mom6_params({"DT": "900.0"}, mom_file.name, {})
+    assert mom_file.read_text() == MOM_TEXT
+
+
+def test_update_mom6_params_scoped_keys_stay_in_their_block(tmp_path):
+    mom_file = tmp_path / "MOM_input"
+    mom_file.write_text(
+        "N_SMOOTH = 1\n"
+        "KPP%\n"
+        "  N_SMOOTH = 2\n"
+        "  MLE%\n"
+        "    MLE_DENSITY_DIFF = 0.03\n"
+        "  %MLE\n"
+        "%KPP\n"
+        "ENERGYSAVEDAYS = 1.0\n"
+    )
+
+    Mom6InputUpdater(tmp_path).update_mom6_params(
+        {
+            "KPP%N_SMOOTH": 3,
+            "KPP%ENHANCE_DIFFUSION": False,
+            "KPP%MLE%MLE_DENSITY_DIFF": "REMOVE",
+            "EPBL%MSTAR": 0.3,
+            "DT": 900.0,
+        },
+        mom_file.name,
+        {},
+    )
+
+    assert mom_file.read_text() == (
+        "N_SMOOTH = 1\n"
+        "KPP%\n"
+        "  N_SMOOTH = 3\n"
+        "  MLE%\n"
+        "  %MLE\n"
+        "  ENHANCE_DIFFUSION = False\n"
+        "%KPP\n"
+        "ENERGYSAVEDAYS = 1.0\n"
+        "\n! --- Added parameters ---\n"
+        "EPBL%MSTAR = 0.3\n"
+        "DT = 900.0\n"
+    )
+    _, params = read_mom_input(mom_file)
+    assert params["N_SMOOTH"] == "1"
+    assert params["KPP%N_SMOOTH"] == "3"
+    assert params["EPBL%MSTAR"] == "0.3"
+
+
+def test_update_mom6_params_mom_override_overlays_mom_input(tmp_path):
+    (tmp_path / "MOM_input").write_text(MOM_TEXT)
+    override = tmp_path / "MOM_override"
+    updater = Mom6InputUpdater(tmp_path)
+
+    updater.update_mom6_params({"DT": 1800, "KPP%N_SMOOTH": 4, "NEW_KEY": True}, override.name, {})
+
+    assert (tmp_path / "MOM_input").read_text() == MOM_TEXT
+    assert override.read_text() == "#override DT = 1800\n#override KPP%N_SMOOTH = 4\nNEW_KEY = True\n"
+
+    updater.update_mom6_params({"DT": 3600, "NEW_KEY": "REMOVE"}, override.name, {})
+
+    assert override.read_text() == "#override DT = 3600\n#override KPP%N_SMOOTH = 4\n"
@@ -1,5 +1,7 @@
+import pytest
 from experiment_generator.nuopc_runconfig_updater import NuopcRunConfigUpdater
-from experiment_generator.tmp_parser.nuopc_config import read_nuopc_config
+from experiment_generator.tmp_parser.nuopc_config import read_nuopc_config, NuopcConfigDocument
+from experiment_generator.tmp_parser.yaml_config import plan_yaml
 
 
 def test_update_runconfig_params_updates_and_removes(tmp_path):
@@ -39,3 +41,153 @@ PELAYOUT_attributes::
     assert new_nuopc_config["PELAYOUT_attributes"]["atm_nthreads"] == 1
     assert new_nuopc_config["PELAYOUT_attributes"]["atm_pestride"] == 1
     assert new_nuopc_config["PELAYOUT_attributes"]["atm_rootpe"] == 0
+
+
+def test_update_runconfig_params_skips_write_when_unchanged(tmp_path):
+    repo_dir = tmp_path / "test_repo"
+    repo_dir.mkdir()
+
+    runconfig_path = repo_dir / "nuopc.runconfig"
+    original = "# keep this comment\nPELAYOUT_attributes::\n     atm_ntasks = 364\n::\n"
+    runconfig_path.write_text(original)
+
+    updater = NuopcRunConfigUpdater(repo_dir)
+
+    changes = updater.update_runconfig_params(
+        {"PELAYOUT_attributes": {"atm_ntasks": 364}},
+        runconfig_path.name,
+        {},
+    )
+
+    assert not changes
+    assert runconfig_path.read_text() == original
+
+
+RUNCONFIG = """\
+# driver settings
+component_list: MED ATM ICE OCN ROF   # active components
+PELAYOUT_attributes::
+     atm_ntasks = 364     # tasks
+     ocn_ntasks = 48
+::
+
+CLOCK_attributes::
+     stop_n = 5
+     tiny = -1.000000D-08
+::
+
+DRIVER_attributes::
+     Verbosity = off
+::
+"""
+
+
+def test_update_runconfig_params_patches_changed_values_in_place(tmp_path):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    runconfig_path.write_text(RUNCONFIG)
+
+    NuopcRunConfigUpdater(tmp_path).update_runconfig_params(
+        {
+            "component_list": ["MED", "ATM", "ICE", "OCN", "WAV"],
+            "PELAYOUT_attributes": {"atm_ntasks": 150, "ocn_ntasks": "REMOVE", "ice_ntasks": 12},
+            "CLOCK_attributes": {"stop_n": 5, "tiny": -1e-08, "restart": True},
+            "DRIVER_attributes": "REMOVE",
+            "NEW_attributes": {"dt": 0.5},
+        },
+        runconfig_path.name,
+        {},
+    )
+
+    assert runconfig_path.read_text() == (
+        "# driver settings\n"
+        "component_list: MED ATM ICE OCN WAV   # active components\n"
+        "PELAYOUT_attributes::\n"
+        "     atm_ntasks = 150     # tasks\n"
+        "     ice_ntasks = 12\n"
+        "::\n"
+        "\n"
+        "CLOCK_attributes::\n"
+        "     stop_n = 5\n"
+        "     tiny = -1.000000D-08\n"
+        "     restart = .true.\n"
+        "::\n"
+        "\n"
+        "NEW_attributes::\n"
+        "  dt = 5.000000D-01\n"
+        "::\n"
+    )
+
+
+def test_update_runconfig_params_writes_a_change_of_type_alone(tmp_path):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    runconfig_path.write_text("CLOCK_attributes::\n     stop_n = 5\n::\n")
+
+    changes = NuopcRunConfigUpdater(tmp_path).update_runconfig_params(
+        {"CLOCK_attributes": {"stop_n": 5.0}}, runconfig_path.name, {}
+    )
+
+    assert changes
+    assert runconfig_path.read_text() == "CLOCK_attributes::\n     stop_n = 5.000000D+00\n::\n"
+
+
+def test_update_runconfig_params_plan_values_equal_to_file_are_not_rewritten(tmp_path):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    original = "CLOCK_attributes::\n     stop_n = 5\n     dt = 1800.0\n     tiny = 1e-8\n::\n"
+    runconfig_path.write_text(original)
+    # plan floats are ruamel ScalarFloats rather than plain floats
+    params = plan_yaml.load("CLOCK_attributes:\n  stop_n: 6\n  dt: 1800.0\n  tiny: 1.0e-08\n")
+
+    NuopcRunConfigUpdater(tmp_path).update_runconfig_params(params, runconfig_path.name, {})
+
+    assert runconfig_path.read_text() == original.replace("stop_n = 5", "stop_n = 6")
+
+
+def test_update_runconfig_params_reuses_parsed_document(tmp_path, monkeypatch):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    updater = NuopcRunConfigUpdater(tmp_path)
+
+    parsed = []
+    init = NuopcConfigDocument.__init__
+
+    def _record(self, lines, **kwargs):
+        parsed.append(len(lines))
+        init(self, lines, **kwargs)
+
+    monkeypatch.setattr(NuopcConfigDocument, "__init__", _record)
+
+    # two branches starting from the same nuopc.runconfig
+    for ntasks in (100, 200):
+        runconfig_path.write_text(RUNCONFIG)
+        updater.update_runconfig_params({"PELAYOUT_attributes": {"atm_ntasks": ntasks}}, runconfig_path.name, {})
+        assert runconfig_path.read_text() == RUNCONFIG.replace("= 364 ", f"= {ntasks} ")
+
+    assert len(parsed) == 1
+
+
+def test_read_nuopc_config_classifies_literals(tmp_path):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    runconfig_path.write_text(
+        "values: 1 -2.5 1.0D-08 1.0d-08 .TRUE. 1_000 nan 1:10:19  # trailing comment\n"
+        "ALLCOMP_attributes::\n"
+        "  ocn2glc_levels = 1:10:19#no space\n"
+        "  # comment line\n"
+        "  reprosum_diffmax = -1.000000D-08\n"
+        "::\n"
+    )
+
+    config = read_nuopc_config(runconfig_path.as_posix())
+
+    values = config["values"]
+    assert values[:5] == [1, -2.5, 1.0e-08, "1.0d-08", True]
+    assert values[5] == 1000 and isinstance(values[5], int)
+    assert values[6] != values[6]
+    assert values[7] == "1:10:19"
+    assert config["ALLCOMP_attributes"] == {"ocn2glc_levels": "1:10:19", "reprosum_diffmax": -1e-08}
+
+
+def test_read_nuopc_config_rejects_invalid_table_line(tmp_path):
+    runconfig_path = tmp_path / "nuopc.runconfig"
+    runconfig_path.write_text("ALLCOMP_attributes::\n  OCN_model: mom\n::\n")
+
+    with pytest.raises(ValueError, match="is not a valid NUOPC configuration specification"):
+        read_nuopc_config(runconfig_path.as_posix())
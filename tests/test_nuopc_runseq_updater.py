@@ -73,3 +73,102 @@ def test_update_nuopc_runseq_replace_block_only(tmp_path):
 
     assert updated[-2].strip() == "@"
     assert updated[-1].strip() == "::"
+
+
+RUNSEQ = (
+    "runSeq::\n"
+    "@3600\n"
+    "  MED med_phases_prep_ocn_avg\n"
+    "  MED -> OCN :remapMethod=redist\n"
+    "  OCN\n"
+    "  @1800   # fast loop\n"
+    "    MED med_phases_aofluxes_run\n"
+    "    MED med_phases_diag_ocn\n"
+    "    ATM\n"
+    "    ATM -> MED :remapMethod=redist:srcMaskValues=0\n"
+    "  @\n"
+    "  OCN -> MED :remapMethod=redist\n"
+    "@\n"
+    "::\n"
+)
+
+
+def test_update_nuopc_runseq_edits_tree_in_place(tmp_path):
+    runseq_path = tmp_path / "nuopc.runseq"
+    runseq_path.write_text(RUNSEQ)
+
+    changes = NuopcRunseqUpdater(tmp_path).update_nuopc_runseq(
+        {
+            "loop_dt": {1800: 900},
+            "remove": "MED med_phases_diag_ocn",
+            "insert_after": {"ATM": ["ICE", "ICE -> MED :remapMethod=redist"]},
+            "insert_before": {"OCN -> MED": "MED med_phases_post_atm"},
+            "remap": {"ATM -> MED": "bilinear", "MED -> OCN": "redist"},
+        },
+        runseq_path.name,
+        state={},
+    )
+
+    assert runseq_path.read_text() == (
+        "runSeq::\n"
+        "@3600\n"
+        "  MED med_phases_prep_ocn_avg\n"
+        "  MED -> OCN :remapMethod=redist\n"
+        "  OCN\n"
+        "  @900   # fast loop\n"
+        "    MED med_phases_aofluxes_run\n"
+        "    ATM\n"
+        "    ICE\n"
+        "    ICE -> MED :remapMethod=redist\n"
+        "    ATM -> MED :remapMethod=bilinear:srcMaskValues=0\n"
+        "  @\n"
+        "  MED med_phases_post_atm\n"
+        "  OCN -> MED :remapMethod=redist\n"
+        "@\n"
+        "::\n"
+    )
+    assert changes.summary() == "3 added, 2 modified, 1 removed"
+
+
+def test_update_nuopc_runseq_reuses_parsed_tree(tmp_path, monkeypatch):
+    from experiment_generator.tmp_parser import nuopc_seq
+
+    runseq_path = tmp_path / "nuopc.runseq"
+    updater = NuopcRunseqUpdater(tmp_path)
+
+    parsed = []
+    parse_body = nuopc_seq._parse_body
+
+    def _record(lines, **kwargs):
+        parsed.append(len(lines))
+        return parse_body(lines, **kwargs)
+
+    monkeypatch.setattr(nuopc_seq, "_parse_body", _record)
+
+    # two branches starting from the same nuopc.runseq
+    for dt in (1200, 600):
+        runseq_path.write_text(RUNSEQ)
+        updater.update_nuopc_runseq({"loop_dt": {"1800": dt}, "cpl_dt": None}, runseq_path.name)
+        assert runseq_path.read_text() == RUNSEQ.replace("@1800", f"@{dt}")
+
+    assert len(parsed) == 1
+
+
+@pytest.mark.parametrize(
+    "params, message",
+    [
+        ({"remove": "MED med_phases_missing"}, "No call 'MED med_phases_missing'"),
+        ({"insert_after": {"MED -> ICE": "ICE"}}, "No call 'MED -> ICE'"),
+        ({"loop_dt": {7200: 3600}}, "No time loop '@7200'"),
+        ({"remap": {"ATM": "bilinear"}}, "Invalid connector 'ATM'"),
+        ({"remap": "bilinear"}, "`remap` must be a mapping"),
+        ({"dt": 10}, "unsupported key"),
+    ],
+)
+def test_update_nuopc_runseq_rejects_invalid_edits(tmp_path, params, message):
+    runseq_path = tmp_path / "nuopc.runseq"
+    runseq_path.write_text(RUNSEQ)
+
+    with pytest.raises(ValueError, match=message):
+        NuopcRunseqUpdater(tmp_path).update_nuopc_runseq(params, runseq_path.name)
+    assert runseq_path.read_text() == RUNSEQ
@@ -402,3 +402,72 @@ def test_update_forcing_params_no_perturbations_key_skips_branch(tmp_repo_dir, p
 
     # write_json called once
     assert len(patch_json_and_utils["write_json"]) == 1
+
+
+def test_duplicate_fieldname_raises_before_any_update(tmp_repo_dir, patch_json_and_utils, sample_input):
+    sample_input["inputs"].append({"fieldname": "uas", "filename": "INPUT/uas_2.nc", "cname": "uwnd_ai"})
+    updater = Om2ForcingUpdater(tmp_repo_dir)
+    params = {"tas": {"cname": "X"}, "uas": {"cname": "Y"}}
+
+    with pytest.raises(ValueError, match="'uas' appears more than once"):
+        updater.update_forcing_params(params, target_file=Path("atmosphere/forcing.json"), state={})
+
+    assert patch_json_and_utils["update_config_entries"] == []
+    assert patch_json_and_utils["write_json"] == []
+
+    # duplicates that are not perturbed are left alone
+    updater.update_forcing_params({"tas": {"cname": "X"}}, target_file=Path("atmosphere/forcing.json"), state={})
+    assert sample_input["inputs"][0]["cname"] == "X"
+
+
+def test_fieldname_index_maps_first_match_and_flags_duplicates(sample_input):
+    inputs = sample_input["inputs"]
+
+    assert Om2ForcingUpdater._fieldname_index(inputs) == ({"tas": 0, "uas": 1}, set())
+    assert Om2ForcingUpdater._fieldname_index([*inputs, inputs[0]]) == ({"tas": 0, "uas": 1}, {"tas"})
+
+
+def test_perturbation_validator_reports_every_violation_with_path():
+    params = {
+        "tas": {
+            "perturbations": [
+                {"type": "REMOVE", "dimension": "nonsense"},  # removed, not checked
+                {"type": "wrong", "dimension": "space", "value": None, "calendar": "forcing", "comment": 1},
+                {"type": "offset", "dimension": "PRESERVE", "calendar": "PRESERVE", "value": "x.nc"},
+            ]
+        },
+        "uas": {"perturbations": {"type": "scaling", "dimension": ["temporal", "spatial"], "calendar": "forcing"}},
+        "vas": {"perturbations": ["PRESERVE"]},
+        "psl": {"perturbations": [1, 2]},
+    }
+
+    errors = om2_forcing_module.PERTURBATION_VALIDATOR.validate_params(params, "block.forcing.json")
+
+    assert errors == [
+        "block.forcing.json.tas.perturbations[1]: Invalid perturbation type: wrong",
+        "block.forcing.json.tas.perturbations[1]: Invalid perturbation dimension: space",
+        "block.forcing.json.tas.perturbations[1]: Invalid perturbation value: None",
+        "block.forcing.json.tas.perturbations[1]: Invalid perturbation comment: 1",
+        "block.forcing.json.tas.perturbations[2]: missing 'dimension'",
+        "block.forcing.json.tas.perturbations[2]: missing 'calendar'",
+        "block.forcing.json.psl.perturbations: must be a dict or list of dicts",
+    ]
+
+
+def test_update_forcing_params_validated_skips_schema_checks(tmp_repo_dir, patch_json_and_utils):
+    updater = Om2ForcingUpdater(tmp_repo_dir)
+    pert = {"type": "unchecked", "dimension": "temporal", "value": "x.nc", "calendar": "forcing"}
+
+    with pytest.raises(ValueError):
+        updater.update_forcing_params(
+            {"tas": {"perturbations": [dict(pert)]}}, target_file=Path("atmosphere/forcing.json"), state={}
+        )
+
+    updater.update_forcing_params(
+        {"tas": {"perturbations": [dict(pert)]}},
+        target_file=Path("atmosphere/forcing.json"),
+        state={},
+        validated=True,
+    )
+    _, updates, _ = patch_json_and_utils["update_config_entries"][0]
+    assert updates["perturbations"] == [pert]
@@ -1,8 +1,13 @@
+import sys
 import pytest
+from hypothesis import HealthCheck, given, settings, strategies as st
 from conftest import DummyBranch, DummyIndex
 import experiment_generator.perturbation_experiment as pert_exp
 from experiment_generator.perturbation_experiment import ExperimentDefinition as ed
 from experiment_generator.experiment_generator import VALID_MODELS
+from experiment_generator.utils import NormalisedParams
+from experiment_generator.common_var import REMOVED, PRESERVED, REMOVE_MARKER
+from experiment_generator.om2_forcing_updater import PerturbationSchemaError
 
 
 @pytest.fixture
@@ -71,6 +76,55 @@ def test_collect_defs_warns_and_skips_block_without_branches(tmp_repo_dir, indat
     assert patch_git.commits == []
 
 
+def test_collect_defs_normalises_markers_per_branch(tmp_repo_dir, indata, patch_git):
+    perturb_block = {
+        "Parameter_block1": {
+            "branches": ["perturb_1", "perturb_2"],
+            "config.yaml": {"queue": ["normal", "PRESERVE"], "jobname": "REMOVE"},
+        }
+    }
+
+    expt = pert_exp.PerturbationExperiment(
+        directory=tmp_repo_dir, indata={**indata, "Perturbation_Experiment": perturb_block}
+    )
+
+    defs = expt._collect_experiment_definitions(perturb_block)
+
+    assert [d.file_params["config.yaml"] for d in defs] == [
+        {"queue": "normal", "jobname": "REMOVE"},
+        {"jobname": "REMOVE"},
+    ]
+    assert all(isinstance(d.file_params["config.yaml"], NormalisedParams) for d in defs)
+    assert defs[0].file_params["config.yaml"]["jobname"] is REMOVE_MARKER
+
+
+def test_collect_defs_reports_every_forcing_schema_violation(tmp_repo_dir, indata, patch_git):
+    pert = {"type": "scaling", "dimension": "temporal", "value": "a.nc", "calendar": "forcing", "comment": "x"}
+    perturb_block = {
+        "Parameter_block1": {
+            "branches": ["perturb_1", "perturb_2"],
+            "atmosphere/forcing.json": {
+                "tas": {"perturbations": [[{**pert, "calendar": ["forcing", "weird"]}]]},
+                "uas": {"perturbations": [[{**pert, "type": "bogus", "dimension": "space"}]]},
+            },
+        }
+    }
+
+    expt = pert_exp.PerturbationExperiment(
+        directory=tmp_repo_dir, indata={**indata, "Perturbation_Experiment": perturb_block}
+    )
+
+    with pytest.raises(PerturbationSchemaError) as excinfo:
+        expt._collect_experiment_definitions(perturb_block)
+
+    path = "Perturbation_Experiment.Parameter_block1.atmosphere/forcing.json"
+    assert excinfo.value.violations == [
+        f"{path}.uas.perturbations[0]: Invalid perturbation type: bogus (branches: perturb_1, perturb_2)",
+        f"{path}.uas.perturbations[0]: Invalid perturbation dimension: space (branches: perturb_1, perturb_2)",
+        f"{path}.tas.perturbations[0]: Invalid perturbation calendar: weird (branches: perturb_2)",
+    ]
+
+
 def test_apply_updates_with_correct_updaters(tmp_repo_dir, patch_updaters, indata):
     (
         f90_recorder,
@@ -391,6 +445,22 @@ def test_extract_run_specific_params_raises_on_list_of_dicts_inconsistent_outer_
         )
 
 
+def test_extract_run_specific_params_handles_deep_nesting(tmp_repo_dir, indata):
+    expt = pert_exp.PerturbationExperiment(directory=tmp_repo_dir, indata=indata)
+    depth = 3 * sys.getrecursionlimit()
+    plan = leaf = {}
+    for _ in range(depth):
+        leaf["a"] = {}
+        leaf = leaf["a"]
+    leaf["x"] = [1, 2]
+
+    result = expt._extract_run_specific_params(plan, 1, 2)
+
+    for _ in range(depth):
+        result = result["a"]
+    assert result == {"x": 2}
+
+
 def test_apply_updates_strips_preserve_top_level_sets_empty_dict(tmp_repo_dir, indata, patch_updaters):
     # TODO: remove this test when f90nml_updater.update_nml_params uses update_config_entries()
     # after access-parsers implements it.
@@ -443,3 +513,103 @@ def test_manage_control_expt_control_branch_missing_does_not_checkout(
 
     # should not call checkout_branch
     assert checkout_recorder == []
+
+
+# Recursive reference implementation of `_extract_run_specific_params`, used to check the
+# explicit-stack walker on generated plans.
+
+
+def _ref_filter(x):
+    if x in (REMOVED, PRESERVED):
+        return True, x
+    if isinstance(x, dict):
+        res = {}
+        for k, v in x.items():
+            keep_v, filtered = _ref_filter(v)
+            if keep_v:
+                res[k] = filtered
+        return (True, res) if res else (False, None)
+    if isinstance(x, list):
+        if len(x) == 1 and x[0] == PRESERVED:
+            return True, x
+        elements = [_ref_filter(v)[1] for v in x]
+        return (True, elements) if elements else (False, None)
+    return True, x
+
+
+def _ref_extract(nested_dict, indx, total_exps):
+    result = {}
+    for key, value in nested_dict.items():
+        if isinstance(value, dict):
+            keep_v, cleaned = _ref_filter(_ref_extract(value, indx, total_exps))
+            if keep_v:
+                result[key] = cleaned
+            continue
+
+        if not isinstance(value, list):
+            result[key] = value
+            continue
+
+        if value and all(isinstance(i, dict) for i in value):
+            items = [c for keep_v, c in (_ref_filter(_ref_extract(i, indx, total_exps)) for i in value) if keep_v]
+            if not items:
+                continue
+            if len(value) == 1:
+                result[key] = items[0]
+            elif len(value) == total_exps:
+                result[key] = items[indx]
+            else:
+                raise ValueError(key)
+            continue
+
+        if value and all(isinstance(i, list) for i in value):
+            if len(value) == 1:
+                inner = value[0]
+                if not inner:
+                    continue
+                dicts = [_ref_extract(d, indx, total_exps) for d in inner if isinstance(d, dict)]
+                if len(dicts) == len(inner):
+                    result[key] = dicts
+                    continue
+                keep_v, sel = _ref_filter(inner)
+            elif len(value) == total_exps:
+                keep_v, sel = _ref_filter(value[indx])
+            else:
+                raise ValueError(key)
+            if keep_v:
+                result[key] = sel
+            continue
+
+        if len(value) == 1 or (len(value) > 1 and all(i == value[0] for i in value)):
+            keep_v, sel = _ref_filter(value[0])
+            if keep_v:
+                result[key] = [sel]
+            continue
+        if len(value) != total_exps:
+            raise ValueError(key)
+        keep_v, sel = _ref_filter(value[indx])
+        if keep_v and sel != PRESERVED:
+            result[key] = sel
+    return result
+
+
+_plan_trees = st.recursive(
+    st.one_of(st.integers(0, 2), st.sampled_from(["x", "y", REMOVED, PRESERVED]), st.none()),
+    lambda children: st.lists(children, max_size=3) | st.dictionaries(st.sampled_from("abc"), children, max_size=3),
+)
+_runs = st.integers(1, 3).flatmap(lambda total: st.tuples(st.integers(0, total - 1), st.just(total)))
+
+
+@settings(max_examples=300, deadline=None, suppress_health_check=[HealthCheck.function_scoped_fixture])
+@given(st.dictionaries(st.sampled_from("abc"), _plan_trees, max_size=3), _runs)
+def test_extract_run_specific_params_matches_recursive_reference(tmp_repo_dir, indata, param_dict, run):
+    indx, total = run
+    expt = pert_exp.PerturbationExperiment(directory=tmp_repo_dir, indata=indata)
+    try:
+        expected = _ref_extract(param_dict, indx, total)
+    except (ValueError, IndexError) as e:
+        with pytest.raises(type(e)):
+            expt._extract_run_specific_params(param_dict, indx, total)
+        return
+
+    assert expt._extract_run_specific_params(param_dict, indx, total) == expected
@@ -0,0 +1,60 @@
+import pytest
+from experiment_generator.plan_loader import load_plan, merge_plans
+
+
+def test_merge_plans_merges_mappings_and_replaces_other_values():
+    base = {"queue": "normal", "config.yaml": {"walltime": "1:00:00", "mem": "1GB"}, "branches": ["a", "b"]}
+    override = {"config.yaml": {"mem": "2GB"}, "branches": ["c"]}
+
+    merged = merge_plans(base, override)
+
+    assert merged == {"queue": "normal", "config.yaml": {"walltime": "1:00:00", "mem": "2GB"}, "branches": ["c"]}
+    assert base["config.yaml"]["mem"] == "1GB"
+
+
+def test_load_merges_files_and_includes_in_order(tmp_path):
+    (tmp_path / "common").mkdir()
+    (tmp_path / "common" / "resources.yaml").write_text(
+        "model_type: access-om2\nControl_Experiment:\n  config.yaml:\n    queue: normal\n    walltime: 1:00:00\n"
+    )
+    (tmp_path / "plan.yaml").write_text(
+        "include: common/resources.yaml\nControl_Experiment:\n  config.yaml:\n    queue: express\n"
+    )
+    (tmp_path / "physics.yaml").write_text(
+        "Perturbation_Experiment:\n  block1:\n    branches: [p1, p2]\n    ice/cice_in.nml:\n"
+        "      shortwave_nml:\n        albicei: [0.06, 0.07]\n"
+    )
+
+    plan = load_plan([tmp_path / "plan.yaml", tmp_path / "physics.yaml"])
+
+    assert plan["model_type"] == "access-om2"
+    assert plan["Control_Experiment"] == {"config.yaml": {"queue": "express", "walltime": "1:00:00"}}
+    assert plan["Perturbation_Experiment"]["block1"]["branches"] == ["p1", "p2"]
+    assert "include" not in plan
+
+
+def test_block_includes_are_merged_under_the_block_keys(tmp_path):
+    (tmp_path / "sweeps").mkdir()
+    (tmp_path / "plan.yaml").write_text(
+        "Perturbation_Experiment:\n  physics:\n    include: sweeps/physics.yaml\n    branches: [p1]\n"
+    )
+    (tmp_path / "sweeps" / "physics.yaml").write_text("branches: [a, b]\nocean/input.nml:\n  nml:\n    x: 1\n")
+
+    plan = load_plan([tmp_path / "plan.yaml"])
+
+    assert plan["Perturbation_Experiment"] == {"physics": {"branches": ["p1"], "ocean/input.nml": {"nml": {"x": 1}}}}
+
+
+def test_missing_include_raises(tmp_path):
+    (tmp_path / "plan.yaml").write_text("Perturbation_Experiment:\n  diagnostics:\n    include: [missing.yaml]\n")
+
+    with pytest.raises(FileNotFoundError):
+        load_plan([tmp_path / "plan.yaml"])
+
+
+def test_circular_include_raises(tmp_path):
+    (tmp_path / "a.yaml").write_text("include: b.yaml\n")
+    (tmp_path / "b.yaml").write_text("include: a.yaml\n")
+
+    with pytest.raises(ValueError, match="Circular include"):
+        load_plan([tmp_path / "a.yaml"])
@@ -1,11 +1,26 @@
+import copy
+import sys
 import pytest
+from hypothesis import given, settings, strategies as st
 from experiment_generator.utils import (
     update_config_entries,
+    compile_patch,
+    apply_patch,
     _merge_lists_positional,
     _remove_state_key,
+    normalise_markers,
+    NormalisedParams,
     PositionalMergeError,
+    KeyedMergeError,
+    OP_SET,
+    OP_REMOVE,
+    OP_PRESERVE,
+    OP_MERGE,
+    OP_PRUNE,
+    OP_LIST,
+    OP_KEYED,
 )
-from experiment_generator.common_var import REMOVED, PRESERVED
+from experiment_generator.common_var import REMOVED, PRESERVED, MATCH_BY, REMOVE_MARKER, PRESERVE_MARKER
 
 
 def test_update_config_entries_basic_changes_with_pop_key():
@@ -469,3 +484,465 @@ def test_update_config_entries_unwraps_single_item_list_to_scalar_when_base_is_s
 #     changes = {"lst": [{}, {}, {}]}
 #     update_config_entries(base, changes, pop_key=True)
 #     assert base == {"lst": ["only"]}
+
+
+def test_merge_lists_positional_shares_untouched_slots_with_baseline():
+    state = {}
+    base_list = [{"name": "atmosphere", "ncpus": 1}, {"name": "ocean", "ncpus": 2}]
+
+    out = _merge_lists_positional(
+        base_list=base_list,
+        change_list=[PRESERVED, {"ncpus": 4}],
+        path="k",
+        state=state,
+        pop_key=True,
+    )
+
+    base0 = state["k::BASE"]
+    # preserved slot is shared with the baseline snapshot, not copied
+    assert out[0] is base0[0]
+    # merged slot is a new mapping and the snapshot is left untouched
+    assert out[1] is not base0[1]
+    assert out == [{"name": "atmosphere", "ncpus": 1}, {"name": "ocean", "ncpus": 4}]
+    assert base0 == [{"name": "atmosphere", "ncpus": 1}, {"name": "ocean", "ncpus": 2}]
+
+
+def test_merge_lists_positional_baseline_snapshot_unaffected_by_later_edits():
+    doc = {"sub": [{"name": "a", "x": 1, "inner": {"v": 1}}, {"name": "b", "x": 2}]}
+    state = {}
+
+    update_config_entries(doc, {"sub": [{"y": 1}]}, state=state)
+    update_config_entries(doc, {"sub": {MATCH_BY: "name", "b": {"x": 99}}}, state=state)
+    doc["sub"][0]["x"] = 100
+
+    assert state["sub::BASE"] == [{"name": "a", "x": 1, "inner": {"v": 1}}, {"name": "b", "x": 2}]
+
+
+def test_merge_lists_positional_mapping_slot_copies_only_modified_paths():
+    state = {}
+    base_list = [{"a": {"x": 1}, "b": {"y": [1, 2]}, "c": {"z": 3}}]
+
+    out = _merge_lists_positional(
+        base_list=base_list,
+        change_list=[{"a": {"x": 10}, "b": {"y": [PRESERVED, 20]}}],
+        path="k",
+        state=state,
+        pop_key=True,
+    )
+
+    base0 = state["k::BASE"]
+    assert out == [{"a": {"x": 10}, "b": {"y": [1, 20]}, "c": {"z": 3}}]
+    # untouched branch is shared, modified branches are copied
+    assert out[0]["c"] is base0[0]["c"]
+    assert out[0]["a"] is not base0[0]["a"]
+    assert out[0]["b"]["y"] is not base0[0]["b"]["y"]
+    # baseline snapshot is never mutated
+    assert base0 == [{"a": {"x": 1}, "b": {"y": [1, 2]}, "c": {"z": 3}}]
+
+
+def test_merge_lists_positional_unwrapped_singleton_does_not_mutate_baseline():
+    state = {}
+    base_list = [{"a": {"x": 1}}]
+
+    out = _merge_lists_positional(
+        base_list=base_list,
+        change_list=[{"a": [{"y": 2}]}],
+        path="k",
+        state=state,
+        pop_key=True,
+    )
+
+    assert out == [{"a": {"x": 1, "y": 2}}]
+    assert state["k::BASE"] == [{"a": {"x": 1}}]
+
+
+def test_compile_patch_flattens_change_tree_into_ordered_ops():
+    changes = {
+        "a": 1,
+        "b": {"x": REMOVED, "y": PRESERVED},
+        "c": PRESERVED,
+        "d": [PRESERVED, 2],
+    }
+
+    patch = compile_patch(changes)
+
+    assert [(op.kind, op.keys) for op in patch.ops] == [
+        (OP_SET, ("a",)),
+        (OP_MERGE, ("b",)),
+        (OP_REMOVE, ("b", "x")),
+        (OP_PRUNE, ("b",)),
+        (OP_PRESERVE, ("c",)),
+        (OP_LIST, ("d",)),
+    ]
+    # the merge op covers its nested ops and carries the stripped mapping as a fallback
+    merge_op = patch.ops[1]
+    assert merge_op.span == 2
+    assert merge_op.value == {"x": REMOVED}
+
+
+def test_apply_patch_reuses_compiled_patch_across_documents():
+    patch = compile_patch({"outer": {"x": 10, "gone": REMOVED}, "lst": [PRESERVED, {"k": 1}], "new": {"n": [1]}})
+
+    doc1 = {"outer": {"x": 1, "gone": 2}, "lst": [0, {"k": 0, "j": 0}]}
+    doc2 = {"outer": "scalar", "lst": "scalar"}
+
+    apply_patch(doc1, patch, path="one.yaml", state={})
+    apply_patch(doc2, patch, path="two.yaml", state={})
+
+    assert doc1 == {"outer": {"x": 10}, "lst": [0, {"k": 1, "j": 0}], "new": {"n": [1]}}
+    assert doc2 == {"outer": {"x": 10}, "lst": [PRESERVED, {"k": 1}], "new": {"n": [1]}}
+    # each document receives its own copy of compiled container values
+    assert doc1["new"] is not doc2["new"]
+
+
+def test_update_config_entries_accepts_precompiled_patch():
+    changes = {"a": {"b": [REMOVED, 3]}, "c": REMOVED}
+    expected = {"a": {"b": [3]}}
+
+    base_from_dict = {"a": {"b": [1, 2]}, "c": 0}
+    update_config_entries(base_from_dict, changes)
+
+    base_from_patch = {"a": {"b": [1, 2]}, "c": 0}
+    update_config_entries(base_from_patch, compile_patch(changes))
+
+    assert base_from_dict == base_from_patch == expected
+
+
+def test_update_config_entries_returns_change_set():
+    base = {"a": 1, "b": {"x": 2}, "c": 3, "lst": [1, 2], "same": 5}
+    changes = {"a": 10, "b": {"y": 1}, "c": REMOVED, "lst": [PRESERVED, 20], "same": 5, "keep": PRESERVED}
+
+    change_set = update_config_entries(base, changes, path="config.yaml")
+
+    assert [(c.path, c.new) for c in change_set.added] == [("config.yaml.b.y", 1)]
+    assert [(c.path, c.old, c.new) for c in change_set.modified] == [
+        ("config.yaml.a", 1, 10),
+        ("config.yaml.lst", [1, 2], [1, 20]),
+    ]
+    assert [(c.path, c.old) for c in change_set.removed] == [("config.yaml.c", 3)]
+    assert len(change_set) == 4
+    assert change_set.summary() == "1 added, 2 modified, 1 removed"
+
+
+def test_update_config_entries_change_set_empty_when_nothing_changes():
+    base = {"a": 1, "lst": [1, 2], "outer": {"x": 1}}
+    changes = {"a": 1, "lst": [PRESERVED, 2], "outer": {"x": PRESERVED}, "missing": REMOVED}
+
+    change_set = update_config_entries(base, changes)
+
+    assert not change_set
+    assert base == {"a": 1, "lst": [1, 2], "outer": {"x": 1}}
+
+
+@pytest.mark.parametrize(
+    "old, new, path",
+    [(1, True, "k"), (5, 5.0, "k"), (False, 0, "k"), ([1, 2], [True, 2], "k"), ({"a": 1}, {"a": 1.0}, "k.a")],
+)
+def test_update_config_entries_records_a_change_of_type_alone(old, new, path):
+    base = {"k": old}
+
+    changes = update_config_entries(base, {"k": new})
+
+    assert [c.path for c in changes.modified] == [path]
+    assert base["k"] == new and repr(base["k"]) == repr(new)
+
+
+def test_update_config_entries_change_set_records_pruned_mapping():
+    base = {"outer": {"x": 1}}
+
+    change_set = update_config_entries(base, {"outer": {"x": REMOVED}}, path="f")
+
+    assert base == {}
+    assert [c.path for c in change_set.removed] == ["f.outer.x", "f.outer"]
+
+
+def _nested(depth, leaf):
+    root = node = {}
+    for _ in range(depth - 1):
+        node["a"] = {}
+        node = node["a"]
+    node["a"] = leaf
+    return root
+
+
+def _descend(node, depth):
+    for _ in range(depth):
+        node = node["a"]
+    return node
+
+
+def test_update_config_entries_handles_deep_nesting():
+    depth = 3 * sys.getrecursionlimit()
+    base = _nested(depth, {"x": 1, "y": [1, 2]})
+    changes = _nested(depth, {"x": REMOVED, "y": [PRESERVED, 3], "z": {"k": PRESERVED, "v": 4}})
+
+    change_set = update_config_entries(base, changes)
+
+    assert _descend(base, depth) == {"y": [1, 3], "z": {"v": 4}}
+    assert change_set.summary() == "1 added, 1 modified, 1 removed"
+
+
+def test_update_config_entries_prunes_deep_chain_of_removals():
+    depth = 3 * sys.getrecursionlimit()
+    base = {"keep": 1, **_nested(depth, {"x": 1})}
+
+    update_config_entries(base, _nested(depth, {"x": REMOVED}))
+
+    assert base == {"keep": 1}
+
+
+def test_merge_lists_positional_handles_deeply_nested_lists():
+    depth = 3 * sys.getrecursionlimit()
+    base = change = 0
+    for _ in range(depth):
+        base, change = [base, 1], [change, PRESERVED]
+
+    merged = _merge_lists_positional(base, change, path="p", state=None, pop_key=True)
+
+    for _ in range(depth):
+        assert merged[1] == 1
+        merged = merged[0]
+    assert merged == 0
+
+
+def _submodels():
+    return {
+        "submodels": [
+            {"name": "atmosphere", "ncpus": 1},
+            {"name": "ocean", "ncpus": 216, "input": ["a", "b"]},
+            {"name": "ice", "ncpus": 24},
+        ]
+    }
+
+
+def test_update_config_entries_keyed_list_merge():
+    base = _submodels()
+    changes = {
+        "submodels": {
+            MATCH_BY: "name",
+            "ocean": {"ncpus": 240, "input": [PRESERVED, "c"]},
+            "ice": REMOVED,
+            "atmosphere": PRESERVED,
+            "wave": {"ncpus": 4},
+        }
+    }
+
+    change_set = update_config_entries(base, changes, path="config.yaml")
+
+    assert base == {
+        "submodels": [
+            {"name": "atmosphere", "ncpus": 1},
+            {"name": "ocean", "ncpus": 240, "input": ["a", "c"]},
+            {"name": "wave", "ncpus": 4},
+        ]
+    }
+    assert [c.path for c in change_set.modified] == [
+        "config.yaml.submodels[name=ocean].ncpus",
+        "config.yaml.submodels[name=ocean].input",
+    ]
+    assert [c.path for c in change_set.added] == ["config.yaml.submodels[name=wave]"]
+    assert [c.path for c in change_set.removed] == ["config.yaml.submodels[name=ice]"]
+
+
+def test_compile_patch_emits_keyed_op():
+    patch = compile_patch({"submodels": {MATCH_BY: "name", "ocean": {"ncpus": 1, "x": PRESERVED}}})
+
+    assert [op.kind for op in patch.ops] == [OP_KEYED]
+    assert patch.ops[0].value == {MATCH_BY: "name", "ocean": {"ncpus": 1}}
+
+
+def test_update_config_entries_keyed_merge_removing_everything_drops_key():
+    base = {"inputs": [{"fieldname": "u"}, {"fieldname": "v"}], "keep": 1}
+
+    update_config_entries(base, {"inputs": {MATCH_BY: "fieldname", "u": REMOVED, "v": REMOVED, "w": REMOVED}})
+
+    assert base == {"keep": 1}
+
+
+def test_update_config_entries_keyed_merge_under_list_slot_does_not_mutate_baseline():
+    base = {"submodels": [{"name": "a", "inputs": [{"fieldname": "x", "v": 1}]}]}
+    state = {}
+
+    changes = update_config_entries(
+        base, {"submodels": [{"inputs": {MATCH_BY: "fieldname", "x": {"v": 2}}}]}, state=state
+    )
+
+    assert base == {"submodels": [{"name": "a", "inputs": [{"fieldname": "x", "v": 2}]}]}
+    assert state["submodels::BASE"] == [{"name": "a", "inputs": [{"fieldname": "x", "v": 1}]}]
+    assert [c.path for c in changes.modified] == ["submodels"]
+
+
+def test_update_config_entries_keyed_merge_copies_matched_elements():
+    doc = {"sub": [{"name": "a", "x": 1, "inner": {"v": 1}}, {"name": "b", "x": 2}]}
+    held = doc["sub"][0]
+    state = {}
+
+    update_config_entries(doc, {"sub": [{"y": 1}]}, state=state)
+    update_config_entries(doc, {"sub": {MATCH_BY: "name", "a": {"inner": {"v": 99}}}}, state=state)
+
+    assert doc["sub"][0] == {"name": "a", "x": 1, "inner": {"v": 99}, "y": 1}
+    assert state["sub::BASE"] == [{"name": "a", "x": 1, "inner": {"v": 1}}, {"name": "b", "x": 2}]
+    assert held == {"name": "a", "x": 1, "inner": {"v": 1}}
+
+
+def test_update_config_entries_keyed_merge_rejects_duplicate_keys():
+    base = {"submodels": [{"name": "ocean"}, {"name": "ocean"}]}
+
+    with pytest.raises(KeyedMergeError, match="unique name"):
+        update_config_entries(base, {"submodels": {MATCH_BY: "name", "ocean": {"ncpus": 1}}})
+
+
+@pytest.mark.parametrize(
+    "base, element",
+    [
+        ({"submodels": {"name": "ocean"}}, {"ncpus": 1}),
+        ({}, {"ncpus": 1}),
+        (_submodels(), 5),
+    ],
+)
+def test_update_config_entries_keyed_merge_rejects_invalid_input(base, element):
+    with pytest.raises(KeyedMergeError):
+        update_config_entries(base, {"submodels": {MATCH_BY: "name", "ocean": element}})
+
+
+def test_normalise_markers_strips_preserve_and_uses_sentinels():
+    params = {
+        "a": PRESERVED,
+        "b": {"x": PRESERVED, "y": REMOVED},
+        "c": {"x": PRESERVED},
+        "lst": [PRESERVED, {"k": PRESERVED}, REMOVED],
+        "whole": [PRESERVED],
+    }
+
+    result = normalise_markers(params)
+
+    assert result == {"b": {"y": REMOVED}, "lst": [PRESERVED, {"k": PRESERVED}, REMOVED]}
+    assert isinstance(result, NormalisedParams) and isinstance(result["b"], NormalisedParams)
+    assert result["b"]["y"] is REMOVE_MARKER
+    assert result["lst"][0] is PRESERVE_MARKER
+    assert result["lst"][1]["k"] is PRESERVE_MARKER
+    # input is not modified
+    assert params["a"] == PRESERVED and params["c"] == {"x": PRESERVED}
+    assert normalise_markers(result) is result
+
+
+@pytest.mark.parametrize("params", [PRESERVED, [PRESERVED], {"a": PRESERVED}, {}])
+def test_normalise_markers_nothing_to_apply(params):
+    assert normalise_markers(params) == NormalisedParams()
+
+
+def test_update_config_entries_with_normalised_params_writes_plain_values():
+    base = {"a": {"x": 1}, "lst": [1, 2]}
+    params = normalise_markers({"a": {"x": REMOVED, "y": {"z": 1}}, "new": [PRESERVED, 3], "lst": [REMOVED, 5]})
+
+    update_config_entries(base, params)
+
+    assert base == {"a": {"y": {"z": 1}}, "lst": [5], "new": [PRESERVED, 3]}
+    assert type(base["a"]["y"]) is dict
+    assert type(base["new"][0]) is str
+
+
+# Recursive reference implementation of `update_config_entries` (fresh state, pop_key=True),
+# used to check the explicit-stack walkers on generated trees.
+
+
+def _ref_strip(x):
+    if x == PRESERVED:
+        return False, None
+    if isinstance(x, dict):
+        out = {}
+        for k, v in x.items():
+            apply_child, v2 = _ref_strip(v)
+            if apply_child:
+                out[k] = v2
+        return (True, out) if out else (False, None)
+    if isinstance(x, list) and len(x) == 1 and x[0] == PRESERVED:
+        return False, None
+    return True, x
+
+
+def _ref_clean(x):
+    if isinstance(x, dict):
+        return {k: _ref_clean(v) for k, v in x.items() if v != REMOVED}
+    if isinstance(x, list):
+        cleaned = (_ref_clean(v) for v in x if v != REMOVED)
+        return [v for v in cleaned if v != {}]
+    return x
+
+
+def _ref_merge_lists(base_list, change_list, path):
+    if change_list and len(change_list) == len(base_list) and all(c == REMOVED for c in change_list):
+        return None
+    out = []
+    for i in range(max(len(base_list), len(change_list))):
+        if i >= len(change_list):
+            out.append(base_list[i])
+            continue
+        c = change_list[i]
+        if i >= len(base_list) and c in (REMOVED, PRESERVED):
+            raise PositionalMergeError(f"{path}[{i}]")
+        if c == PRESERVED:
+            out.append(base_list[i])
+        elif c == REMOVED:
+            continue
+        elif i < len(base_list) and isinstance(base_list[i], dict) and isinstance(c, dict):
+            merged = copy.deepcopy(base_list[i])
+            _ref_update(merged, c, f"{path}[{i}]")
+            if merged:
+                out.append(merged)
+        elif i < len(base_list) and isinstance(base_list[i], list) and isinstance(c, list):
+            out.append(_ref_merge_lists(base_list[i], c, f"{path}[{i}]"))
+        elif (cleaned := _ref_clean(c)) != {}:
+            out.append(cleaned)
+    return out
+
+
+def _ref_update(base, change, path=""):
+    for k, v in change.items():
+        should_apply, v = _ref_strip(v)
+        if not should_apply:
+            continue
+        key_path = f"{path}.{k}" if path else k
+        if isinstance(v, list) and len(v) == 1 and not isinstance(base.get(k), list):
+            v = v[0]
+        if isinstance(v, dict) and isinstance(base.get(k), dict):
+            _ref_update(base[k], v, key_path)
+            if not base[k]:
+                del base[k]
+        elif isinstance(v, list) and isinstance(base.get(k), list):
+            merged = _ref_merge_lists(base[k], v, key_path)
+            if merged:
+                base[k] = merged
+            else:
+                del base[k]
+        elif v == REMOVED or (cleaned := _ref_clean(v)) in ({}, []):
+            base.pop(k, None)
+        else:
+            base[k] = cleaned
+
+
+_keys = st.sampled_from("abc")
+_values = st.one_of(st.integers(0, 2), st.sampled_from(["x", "y"]), st.none())
+_base_trees = st.recursive(
+    _values, lambda children: st.lists(children, max_size=3) | st.dictionaries(_keys, children, max_size=3)
+)
+_change_trees = st.recursive(
+    st.one_of(_values, st.sampled_from([REMOVED, PRESERVED])),
+    lambda children: st.lists(children, max_size=3) | st.dictionaries(_keys, children, max_size=3),
+)
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.dictionaries(_keys, _base_trees, max_size=3), st.dictionaries(_keys, _change_trees, max_size=3))
+def test_update_config_entries_matches_recursive_reference(base, change):
+    expected = copy.deepcopy(base)
+    try:
+        _ref_update(expected, change)
+    except PositionalMergeError:
+        with pytest.raises(PositionalMergeError):
+            update_config_entries(base, change)
+        return
+
+    update_config_entries(base, change)
+
+    assert base == expected